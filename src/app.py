@@ -1,32 +1,24 @@
 import streamlit as st
-import joblib
-import numpy as np
 import pandas as pd
 import folium
-import os
 from streamlit_folium import st_folium
+import model_registry
+from prediction_cache import PredictionCache, batching_scheduler
+from sst_raster import SSTRaster
+from risk_tiles import TileStore
+from relocation import PORT_COORDS, SafeZoneIndex, advise_move
+import instrumentation
 
 # ======================= LOAD ML MODELS =======================
-# Construct paths relative to this script's directory
-script_dir = os.path.dirname(os.path.abspath(__file__))
-models_dir = os.path.join(script_dir, "..", "models")
-
-clf = joblib.load(os.path.join(models_dir, "availability_model.pkl"))
-reg = joblib.load(os.path.join(models_dir, "quantity_model.pkl"))
-j_model = joblib.load(os.path.join(models_dir, "juvenile_model.pkl"))
-# Optional hybrid models (PCA + RF + GradientBoosting ensembles)
-try:
-    pca = joblib.load(os.path.join(models_dir, "pca_transform.pkl"))
-    hyb_clf = joblib.load(os.path.join(models_dir, "hybrid_availability_model.pkl"))
-    hyb_reg = joblib.load(os.path.join(models_dir, "hybrid_quantity_model.pkl"))
-except Exception:
-    pca = None
-    hyb_clf = None
-    hyb_reg = None
+# Models are loaded lazily through the shared registry (see model_registry.py)
+# once the pipeline is chosen below, and cached for the life of the process.
 
 # ======================= PAGE CONFIG =======================
 st.set_page_config(page_title="AI-Driven Fish Catch Prediction System", layout="wide")
 
+# Profile this whole run if requested in the Performance panel (one run only)
+profiler = instrumentation.Profiler().start() if st.session_state.pop("perf_profile", False) else None
+
 # ======================= CSS THEME =======================
 st.markdown("""
 <style>
@@ -56,12 +48,80 @@ menu = st.radio(
 )
 
 # Choose ML pipeline
-model_choice = st.selectbox("Choose ML Pipeline", ["Default (RF/XGB)", "Hybrid (PCA + RF + GB)"], index=0)
+model_choice = st.selectbox("Choose ML Pipeline", ["Default (RF/XGB)", "XGBoost", "Hybrid (PCA + RF + GB)"], index=0)
+PIPELINE_KEYS = {"Default (RF/XGB)": "default", "XGBoost": "xgb", "Hybrid (PCA + RF + GB)": "hybrid"}
+pipeline = PIPELINE_KEYS[model_choice]
+
+# Only the selected pipeline's artifacts are loaded (once per process)
+try:
+    model_registry.load_model("juvenile")
+    model_registry.load_pipeline(pipeline)
+except Exception as e:
+    if pipeline == "default":
+        st.error(f"Could not load models: {e}")
+        st.stop()
+    st.warning(f"{model_choice} pipeline unavailable ({e}). Using Default pipeline instead.")
+    pipeline = "default"
+
+# ======================= PREDICTION CACHE =======================
+regions = {
+    "Vizag": [29, 33, 6.2, 300],
+    "Kakinada": [28, 34, 6.5, 260],
+    "Machilipatnam": [27, 32, 6.8, 210],
+    "Goa": [30, 35, 5.7, 280],
+    "Kochi": [29, 36, 6.0, 330],
+}
+
+
+@st.cache_resource
+def get_prediction_cache():
+    # one cache shared by every session of this server process; cache misses
+    # from concurrent sessions are micro-batched into one predict per model
+    return PredictionCache(capacity=4096, ttl_seconds=3600,
+                           scheduler=batching_scheduler(max_batch=64, max_wait_ms=5))
+
+
+prediction_cache = get_prediction_cache()
+# Region presets are scored once per pipeline, in a single batch
+prediction_cache.warm(pipeline, [
+    dict(SST=v[0], Salinity=v[1], Dissolved_Oxygen=v[2], Historical_Catch=v[3]) for v in regions.values()
+])
+
+
+@st.cache_resource
+def get_sst_raster():
+    # memory-mapped SST raster for the Map tab (built by sst_raster.py)
+    return SSTRaster() if SSTRaster.available() else None
+
+
+@st.cache_resource
+def get_safe_zone_index():
+    # safe-zone search over the finest precomputed risk tiles (risk_tiles.py)
+    return SafeZoneIndex.from_tiles(TileStore()) if TileStore.available() else None
+
+
+RELOCATION_MAX_KM = 30
+
+
+def relocation_advice(position, fallback):
+    """Nearest safe zone from position (lat, lon), or the generic advice when
+    the position or the tiles are unknown."""
+    index = get_safe_zone_index()
+    if position is None or index is None:
+        return fallback
+    with instrumentation.span("relocation"):
+        return advise_move(index, position[0], position[1], max_km=RELOCATION_MAX_KM)
+
 
 st.write("---")
 
 # ======================= OUTPUT FUNCTION =======================
-def display_output(location, availability, quantity, juvenile_risk):
+def display_output(location, availability, quantity, juvenile_risk, position=None):
+    with instrumentation.span("render", view="summary"):
+        _display_output(location, availability, quantity, juvenile_risk, position)
+
+
+def _display_output(location, availability, quantity, juvenile_risk, position=None):
     st.markdown("### 🎯 Prediction Summary")
 
     st.markdown(f"<div class='card'><h3>📍 Location: {location}</h3></div>", unsafe_allow_html=True)
@@ -69,7 +129,7 @@ def display_output(location, availability, quantity, juvenile_risk):
     if availability == 0:
         st.markdown("<div class='card'><h3>🔴 Fish Availability: NO</h3></div>", unsafe_allow_html=True)
         st.error("📌 Fishing Not Recommended")
-        st.info("➡ Try shifting to nearby zones (5–10 km).")
+        st.info("➡ " + relocation_advice(position, "Try shifting to nearby zones (5–10 km)."))
     else:
         st.markdown("<div class='card'><h3>🟢 Fish Availability: YES</h3></div>", unsafe_allow_html=True)
         st.markdown(f"<div class='card'><h3>🎣 Predicted Catch Quantity: {quantity:.2f} kg</h3></div>", unsafe_allow_html=True)
@@ -77,7 +137,7 @@ def display_output(location, availability, quantity, juvenile_risk):
         if juvenile_risk == 'High':
             st.markdown("<div class='card'><h3>🔴 Juvenile Risk: HIGH ⚠</h3></div>", unsafe_allow_html=True)
             st.error("❌ Fishing Not Recommended — High Juvenile Density")
-            st.info("➡ Suggested shift: Move 8–15 km away.")
+            st.info("➡ " + relocation_advice(position, "Suggested shift: Move 8–15 km away."))
         elif juvenile_risk == 'Medium':
             st.markdown("<div class='card'><h3>🟡 Juvenile Risk: MEDIUM</h3></div>", unsafe_allow_html=True)
             st.warning("👉 Fishing Allowed With Caution")
@@ -101,39 +161,10 @@ if menu == "Manual Input":
         History = st.number_input("Previous Avg Catch (kg)", 10, 1000, 200)
 
     if st.button("🔍 Predict (Manual)"):
-        features = np.array([[SST, Salinity, DO, History]])
-        juvenile_features = np.array([[SST, Salinity, History]])
-
-        juvenile_risk = j_model.predict(juvenile_features)[0]
-
-        if model_choice == "Hybrid (PCA + RF + GB)" and pca is not None and hyb_clf is not None and hyb_reg is not None:
-            features_pca = pca.transform(features)
-            availability = hyb_clf.predict(features_pca)[0]
-            quantity = hyb_reg.predict(features_pca)[0]
-        else:
-            availability = clf.predict(features)[0]
-            quantity = reg.predict(features)[0]
-
-
-        # ---------------- HYBRID DECISION RULES ----------------
-        good_conditions = 0
-        if 22 <= SST <= 30: good_conditions += 1
-        if 30 <= Salinity <= 36: good_conditions += 1
-        if 5 <= DO <= 8: good_conditions += 1
-        if History >= 150: good_conditions += 1
-
-        # Rule 1: If environment conditions are mostly good → force YES
-        if good_conditions >= 3 and juvenile_risk != "High":
-            availability = 1
-            quantity = max(quantity, 200)
-
-
-            
-        # Rule 2: Override for major fishing hubs
-        prime_locations = ["Vizag", "Kakinada", "Chennai", "Goa", "Kochi", "Nellore", "Mangalore"]
-        if location in prime_locations and availability == 0:
-            availability = 1
-            quantity = max(quantity, 220)
+        # Model prediction followed by the hybrid decision rules
+        availability, quantity, juvenile_risk = prediction_cache.predict_one(
+            pipeline, rules=True, Location=location,
+            SST=SST, Salinity=Salinity, Dissolved_Oxygen=DO, Historical_Catch=History)
 
          # ---------------- DISPLAY RESULT ----------------
         st.subheader("🎣 Prediction Results")
@@ -141,13 +172,14 @@ if menu == "Manual Input":
 
         if availability == 0:
             st.error("🔴 **Fish Availability: NO**")
-            st.info("➡ Try shifting to nearby zones (5–10 km).")
+            st.info("➡ " + relocation_advice(PORT_COORDS.get(location), "Try shifting to nearby zones (5–10 km)."))
         else:
             st.success("🟢 **Fish Availability: YES**")
             st.write(f"🎣 **Predicted Catch Quantity:** {quantity:.2f} kg")
 
             if juvenile_risk == "High":
                 st.error("⚠ **Juvenile Risk Level: HIGH — Fishing Not Recommended!**")
+                st.info("➡ " + relocation_advice(PORT_COORDS.get(location), "Suggested shift: Move 8–15 km away."))
             elif juvenile_risk == "Medium":
                 st.warning("🟡 Juvenile Risk Level: MEDIUM — Use caution")
             else:
@@ -159,31 +191,16 @@ if menu == "Manual Input":
 elif menu == "Select Region":
     st.header("📍 Region-Based Prediction")
 
-    regions = {
-        "Vizag": [29, 33, 6.2, 300],
-        "Kakinada": [28, 34, 6.5, 260],
-        "Machilipatnam": [27, 32, 6.8, 210],
-        "Goa": [30, 35, 5.7, 280],
-        "Kochi": [29, 36, 6.0, 330],
-    }
-
     region = st.selectbox("Select Coastal Zone", regions.keys())
     SST, Salinity, DO, History = regions[region]
 
     if st.button("🔍 Predict (Region Based)"):
-        features = np.array([[SST, Salinity, DO, History]])
-        juvenile_features = np.array([[SST, Salinity, History]])
-
-        juvenile_risk = j_model.predict(juvenile_features)[0]
-        if model_choice == "Hybrid (PCA + RF + GB)" and pca is not None and hyb_clf is not None and hyb_reg is not None:
-            features_pca = pca.transform(features)
-            availability = hyb_clf.predict(features_pca)[0]
-            quantity = hyb_reg.predict(features_pca)[0]
-        else:
-            availability = clf.predict(features)[0]
-            quantity = reg.predict(features)[0]
+        # same hybrid decision rules as the manual entry (rules.py)
+        availability, quantity, juvenile_risk = prediction_cache.predict_one(
+            pipeline, rules=True, Location=region,
+            SST=SST, Salinity=Salinity, Dissolved_Oxygen=DO, Historical_Catch=History)
 
-        display_output(region, availability, quantity, juvenile_risk)
+        display_output(region, availability, quantity, juvenile_risk, PORT_COORDS.get(region))
 
 # ======================= METHOD C: MAP GPS INPUT =======================
 elif menu == "Map Based GPS Input":
@@ -192,7 +209,8 @@ elif menu == "Map Based GPS Input":
     map_center = [16.9891, 82.2475]
     m = folium.Map(location=map_center, zoom_start=6)
 
-    map_output = st_folium(m, width=900, height=500)
+    with instrumentation.span("render", view="map"):
+        map_output = st_folium(m, width=900, height=500)
 
     if map_output and map_output.get("last_clicked"):
         lat = map_output["last_clicked"]["lat"]
@@ -202,18 +220,27 @@ elif menu == "Map Based GPS Input":
 
         if st.button("🔍 Predict from Map"):
             SST, Salinity, DO, History = 28, 33, 6.2, 250
-            features = np.array([[SST, Salinity, DO, History]])
-            juvenile_features = np.array([[SST, Salinity, History]])
-
-            juvenile_risk = j_model.predict(juvenile_features)[0]
-            if model_choice == "Hybrid (PCA + RF + GB)" and pca is not None and hyb_clf is not None and hyb_reg is not None:
-                features_pca = pca.transform(features)
-                availability = hyb_clf.predict(features_pca)[0]
-                quantity = hyb_reg.predict(features_pca)[0]
-            else:
-                availability = clf.predict(features)[0]
-                quantity = reg.predict(features)[0]
-
-            display_output(f"Lat:{lat}, Lon:{lon}", availability, quantity, juvenile_risk)
+            # Real SST of the latest month from the raster store, if it has been built
+            sst_raster = get_sst_raster()
+            if sst_raster is not None:
+                value = sst_raster.lookup([lat], [lon])[0]
+                if value == value:  # not NaN
+                    SST = round(float(value), 2)
+                    st.caption(f"SST {SST} °C from {sst_raster.months[-1]} raster")
+                else:
+                    st.warning(f"Location is outside the SST raster; using the default SST of {SST} °C.")
+            availability, quantity, juvenile_risk = prediction_cache.predict_one(
+                pipeline, rules=True,
+                SST=SST, Salinity=Salinity, Dissolved_Oxygen=DO, Historical_Catch=History)
+
+            display_output(f"Lat:{lat}, Lon:{lon}", availability, quantity, juvenile_risk, (lat, lon))
+
+# ======================= MODEL LOAD REPORT =======================
+with st.expander("Model load report"):
+    st.dataframe(pd.DataFrame(model_registry.load_report()))
+    st.write("Prediction cache:", prediction_cache.stats())
+    st.write("Batch scheduler:", prediction_cache.scheduler.stats())
+
+instrumentation.performance_panel(profiler.stop() if profiler else None)
 
 # ======================== END ========================
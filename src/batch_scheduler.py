@@ -0,0 +1,147 @@
+# src/batch_scheduler.py
+# In-process micro-batching for concurrent single-row predictions.
+#
+# Callers submit one item and get a Future back. A background thread
+# collects items for up to max_wait_ms (or until max_batch items are
+# waiting), groups them by key (e.g. the pipeline) and calls the handler
+# once per group with the whole list, so N users clicking Predict at the
+# same moment cost one vectorized predict per model instead of N.
+#
+#   scheduler = BatchScheduler(handler, max_batch=64, max_wait_ms=5)
+#   future = scheduler.submit("default", {"SST": 28, ...})
+#   future.result()
+#
+# handler(key, items) must return one result per item, in order; a
+# different count fails the batch. A failed batch is retried one item at a
+# time, so a bad row only fails its own caller (except for fatal_errors,
+# e.g. timeouts, which fail the whole batch at once). Queue depth and batch
+# sizes are exported through instrumentation (gauge batch_queue_depth,
+# counters batches / batched_rows / batch_retries, span batch_wait).
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import instrumentation
+
+_STOP = object()
+
+
+class BatchScheduler:
+    def __init__(self, handler, max_batch=64, max_wait_ms=5.0, name="predict", dispatch_threads=1,
+                 fatal_errors=(TimeoutError,)):
+        self.handler = handler
+        self.fatal_errors = tuple(fatal_errors)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_seen = 0
+        self._queue = queue.Queue()
+        # with several dispatch threads a slow batch does not hold up the
+        # next one (e.g. when the handler hands work to a process pool)
+        self._executor = ThreadPoolExecutor(dispatch_threads) if dispatch_threads > 1 else None
+        self._thread = threading.Thread(target=self._loop, name=f"batch-{name}", daemon=True)
+        self._thread.start()
+
+    # ---------------- requests ----------------
+    def submit(self, key, item):
+        """Queue one item; the Future resolves to handler's result for it."""
+        future = Future()
+        self._queue.put((key, item, future, time.perf_counter()))
+        instrumentation.gauge("batch_queue_depth", self._queue.qsize(), scheduler=self.name)
+        return future
+
+    def __call__(self, key, item):
+        """Submit and wait."""
+        return self.submit(key, item).result()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue_depth,
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+        }
+
+    # ---------------- batching ----------------
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = self._collect(first)
+            instrumentation.gauge("batch_queue_depth", self._queue.qsize(), scheduler=self.name)
+
+            groups = {}
+            now = time.perf_counter()
+            for key, item, future, queued_at in batch:
+                instrumentation.record("batch_wait", now - queued_at, scheduler=self.name)
+                groups.setdefault(key, []).append((item, future))
+            for key, entries in groups.items():
+                self.batches += 1
+                self.rows += len(entries)
+                self.max_batch_seen = max(self.max_batch_seen, len(entries))
+                instrumentation.incr("batches", scheduler=self.name)
+                instrumentation.incr("batched_rows", len(entries), scheduler=self.name)
+                if self._executor is None:
+                    self._run(key, entries)
+                else:
+                    self._executor.submit(self._run, key, entries)
+
+    def _run(self, key, entries):
+        futures = [f for _, f in entries]
+        try:
+            results = list(self.handler(key, [item for item, _ in entries]))
+            if len(results) != len(entries):
+                raise RuntimeError(f"{self.name} handler returned {len(results)} results "
+                                   f"for {len(entries)} items")
+        except Exception as e:
+            if len(entries) > 1 and not isinstance(e, self.fatal_errors):
+                # find the offending row(s): every other caller still gets its result
+                instrumentation.incr("batch_retries", scheduler=self.name)
+                for entry in entries:
+                    self._run(key, [entry])
+                return
+            for f in futures:
+                f.set_exception(e)
+            return
+        for f, result in zip(futures, results):
+            f.set_result(result)
+
+    # ---------------- shutdown ----------------
+    def close(self):
+        """Finish the queued items, then stop the batching thread."""
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,284 @@
+# src/benchmark.py
+# Latency / throughput benchmarks for the prediction pipelines, the map grid
+# scoring and the preprocessing chain.
+#
+# Every suite runs in a fresh child process, so model loading is measured
+# cold and peak RSS belongs to that suite alone. Results are written as
+# JSON; --compare prints the change against a saved baseline and exits
+# non-zero when a metric regressed by more than --threshold.
+#
+#   python src/benchmark.py --save-baseline benchmarks/baseline.json
+#   python src/benchmark.py --compare benchmarks/baseline.json
+#   python src/benchmark.py --suites preprocess --preprocess-rows 1e6 1e7
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+DEFAULT_OUT = os.path.join(ROOT_DIR, "benchmarks", "latest.json")
+
+PIPELINES = ["default", "xgb", "hybrid", "juvenile"]
+BATCH_SIZES = [1, 100, 10_000, 1_000_000]
+GRID_RESOLUTIONS = [10, 30, 80, 200]
+PREPROCESS_SCRIPTS = ["prepare_real_dataset.py", "merge_real_data.py", "fix_dataset.py"]
+
+# metric name suffix -> True when higher is better
+METRIC_SUFFIXES = {"_per_s": True, "_seconds": False, "_ms": False, "_bytes": False}
+
+
+def _peak_rss_bytes():
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KiB on Linux
+
+
+def _repeats(n):
+    return 20 if n <= 100 else 3 if n <= 100_000 else 1
+
+
+# ======================= WORKERS (child processes) =======================
+def _timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def bench_pipeline(pipeline, sizes):
+    """Cold load, single-row latency and batch throughput for one pipeline.
+
+    Pipelines are timed through prediction_service.predict_models, i.e. as
+    served (including the juvenile model); "juvenile" times that model alone.
+    """
+    import model_registry
+    from generate_dataset import generate_fish
+    from features import FEATURES, JUVENILE_FEATURES
+    from prediction_service import predict_models
+
+    start = time.perf_counter()
+    if pipeline == "juvenile":
+        j_model = model_registry.load_model("juvenile")
+        predict = lambda df: j_model.predict(df[JUVENILE_FEATURES])
+    else:
+        model_registry.load_pipeline(pipeline)
+        model_registry.load_model("juvenile")
+        predict = lambda df: predict_models(df, pipeline)
+    load_seconds = time.perf_counter() - start
+    report = model_registry.load_report()
+
+    data = generate_fish(max(sizes))[FEATURES].astype(float)
+    row = data.iloc[:1]
+    predict(row)  # warm-up
+    times = []
+    for _ in range(200):
+        t = time.perf_counter()
+        predict(row)
+        times.append(time.perf_counter() - t)
+
+    batches = {}
+    for n in sizes:
+        batch = data.iloc[:n]
+        best = min(_timed(predict, batch) for _ in range(_repeats(n)))
+        batches[str(n)] = {"batch_seconds": best, "rows_per_s": n / best}
+
+    return {
+        "load_seconds": load_seconds,
+        "artifact_bytes": sum(r["file_bytes"] for r in report),
+        "artifacts": {r["artifact"]: {"load_seconds": r["load_seconds"], "file_bytes": r["file_bytes"],
+                                      "format": r["format"]} for r in report},
+        "single_row_p50_ms": float(np.percentile(times, 50) * 1000),
+        "single_row_p99_ms": float(np.percentile(times, 99) * 1000),
+        "batches": batches,
+        "peak_rss_bytes": _peak_rss_bytes(),
+    }
+
+
+def bench_grid(resolutions):
+    """grid_scoring.compute_scores (the map heatmap) at each grid resolution."""
+    import model_registry
+    from grid_scoring import compute_scores, make_latlon_grid
+
+    clf = model_registry.load_model("availability")
+    reg = model_registry.load_model("quantity")
+    j_model = model_registry.load_model("juvenile")
+    out = {}
+    for n in resolutions:
+        lats, lons = make_latlon_grid(15.0, 83.0, 25, n)
+        score = lambda: compute_scores(clf, reg, j_model, lats, lons, chunk_size=4096)
+        score()  # warm-up
+        best = min(_timed(score) for _ in range(_repeats(n * n)))
+        out[str(n)] = {"points": n * n, "score_seconds": best, "points_per_s": n * n / best}
+    return {"resolutions": out, "peak_rss_bytes": _peak_rss_bytes()}
+
+
+def bench_preprocess(rows):
+    """Generate `rows` synthetic indian_sst rows into FISH_DATA_DIR (set by the
+    parent to a scratch directory) and time each preprocessing script."""
+    import data_store
+    from generate_dataset import generate_sst
+
+    start = time.perf_counter()
+    written = 0
+    for k, month in enumerate(generate_sst(rows)):
+        data_store.write_table(month, "indian_sst", mode="append" if k else "overwrite")
+        written += len(month)
+    out = {"rows": written, "generate_seconds": time.perf_counter() - start, "scripts": {}}
+
+    for script in PREPROCESS_SCRIPTS:
+        result = run_child([os.path.join(SRC_DIR, script)] + (["--full"] if script.startswith("prepare") else []))
+        if result["returncode"] != 0:
+            out["scripts"][script] = {"error": result["log"][-2000:]}
+            break
+        out["scripts"][script] = {"run_seconds": result["seconds"], "peak_rss_bytes": result["peak_rss_bytes"]}
+    return out
+
+
+# ======================= PARENT =======================
+def run_child(args, env=None):
+    """Run a python script and return wall time, peak RSS and its output."""
+    with tempfile.TemporaryFile(mode="w+") as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable] + args, cwd=SRC_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        seconds = time.perf_counter() - start
+        log.seek(0)
+        return {"returncode": proc.returncode, "seconds": seconds,
+                "peak_rss_bytes": usage.ru_maxrss * 1024, "log": log.read()}
+
+
+def run_worker(suite, arg, extra, env=None):
+    """Run one suite in a child process and return its JSON result."""
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        out_path = f.name
+    try:
+        result = run_child([os.path.abspath(__file__), "--worker", suite, arg, "--worker-out", out_path] + extra, env)
+        if result["returncode"] != 0:
+            return {"error": result["log"].strip().splitlines()[-1] if result["log"].strip() else "failed"}
+        with open(out_path) as f:
+            data = json.load(f)
+        data["process_seconds"] = result["seconds"]
+        return data
+    finally:
+        os.remove(out_path)
+
+
+def environment():
+    import sklearn
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "model_format": os.environ.get("FISH_MODEL_FORMAT", "pickle"),
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def run_benchmarks(suites, pipelines, sizes, resolutions, preprocess_rows):
+    results = {"environment": environment()}
+    size_args = ["--sizes"] + [str(n) for n in sizes]
+    if "models" in suites:
+        results["models"] = {}
+        for pipeline in pipelines:
+            print(f"⏱️  models: {pipeline}")
+            results["models"][pipeline] = run_worker("models", pipeline, size_args)
+    if "grid" in suites:
+        print("⏱️  grid scoring")
+        results["grid"] = run_worker("grid", "-", ["--grid-res"] + [str(n) for n in resolutions])
+    if "preprocess" in suites:
+        results["preprocess"] = {}
+        for rows in preprocess_rows:
+            print(f"⏱️  preprocess: {rows:,} rows")
+            with tempfile.TemporaryDirectory(prefix="fish_bench_") as data_dir:
+                env = dict(os.environ, FISH_DATA_DIR=data_dir)
+                results["preprocess"][str(rows)] = run_worker("preprocess", str(rows), [], env)
+    return results
+
+
+# ======================= COMPARISON =======================
+def flatten(results, prefix=""):
+    """Numeric metrics as {"models.default.single_row_p99_ms": value, ...}."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and any(key.endswith(s) for s in METRIC_SUFFIXES):
+            flat[name] = float(value)
+    return flat
+
+
+def compare(current, baseline, threshold=0.10):
+    """Rows (metric, baseline, current, relative change, regressed) for every
+    metric present in both runs; change is signed so that positive = worse."""
+    cur, base = flatten(current), flatten(baseline)
+    rows = []
+    for name in sorted(cur.keys() & base.keys()):
+        higher_better = next(v for s, v in METRIC_SUFFIXES.items() if name.endswith(s))
+        if base[name] == 0:
+            continue
+        change = (cur[name] - base[name]) / base[name]
+        worse = -change if higher_better else change
+        rows.append((name, base[name], cur[name], worse, worse > threshold))
+    return rows
+
+
+def print_comparison(rows, threshold):
+    print(f"\n{'metric':<60} {'baseline':>12} {'current':>12} {'worse by':>9}")
+    for name, base, cur, worse, regressed in rows:
+        flag = "  ❌" if regressed else ""
+        print(f"{name:<60} {base:>12.4g} {cur:>12.4g} {worse:>+8.1%}{flag}")
+    n = sum(r[4] for r in rows)
+    print(f"\n{n} of {len(rows)} metrics regressed by more than {threshold:.0%}")
+    return n
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark inference latency / throughput and preprocessing")
+    parser.add_argument("--suites", nargs="+", default=["models", "grid"], choices=["models", "grid", "preprocess"])
+    parser.add_argument("--pipelines", nargs="+", default=PIPELINES, choices=PIPELINES)
+    parser.add_argument("--sizes", nargs="+", type=int, default=BATCH_SIZES, help="batch sizes (rows)")
+    parser.add_argument("--grid-res", nargs="+", type=int, default=GRID_RESOLUTIONS, help="points per grid side")
+    parser.add_argument("--preprocess-rows", nargs="+", type=float, default=[1e6],
+                        help="synthetic SST rows for the preprocessing suite (e.g. 1e6 1e7 1e8)")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="where to write the JSON results")
+    parser.add_argument("--save-baseline", help="also write the results to this baseline file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    parser.add_argument("--worker", nargs=2, help=argparse.SUPPRESS)
+    parser.add_argument("--worker-out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        suite, arg = args.worker
+        if suite == "models":
+            data = bench_pipeline(arg, args.sizes)
+        elif suite == "grid":
+            data = bench_grid(args.grid_res)
+        else:
+            data = bench_preprocess(int(arg))
+        with open(args.worker_out, "w") as f:
+            json.dump(data, f)
+        sys.exit(0)
+
+    results = run_benchmarks(args.suites, args.pipelines, args.sizes, args.grid_res,
+                             [int(r) for r in args.preprocess_rows])
+    for path in filter(None, [args.out, args.save_baseline]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(results, f, indent=1)
+        print(f"📄 Results written to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if print_comparison(compare(results, baseline, args.threshold), args.threshold):
+            sys.exit(1)
@@ -0,0 +1,302 @@
+# src/climatology.py
+# SST climatology engine. The SST history is kept as running sums and
+# counts on a month x lat x lon NumPy cube, so new daily or monthly
+# observations are folded in without re-reading the full history, and every
+# derived field is a vectorized reduction over the cube:
+#
+#   monthly_mean()     month x lat x lon mean SST
+#   climatology()      12 x lat x lon mean of each calendar month over all years
+#   anomaly(month)     monthly mean minus the climatology of its calendar month
+#   rolling_mean(n)    trailing n-month mean (months without data are skipped)
+#
+# The month axis is contiguous (gaps stay empty), so rolling windows are
+# plain index ranges. State lives in data/sst_climatology.npz and is updated
+# by prepare_real_dataset.py; lookup() serves the fields to the map and
+# features.add_climatology_features() to the models.
+#
+#   python src/climatology.py --rebuild    # fold every month of indian_sst
+import argparse
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import data_store
+from spatial_index import GridIndex
+
+CLIMATOLOGY_PATH = os.path.join(data_store.DATA_DIR, "sst_climatology.npz")
+
+LAYERS = ("mean", "climatology", "anomaly", "rolling_mean")
+
+
+def month_number(label):
+    """'YYYY-MM' -> months since year 0."""
+    year, month = str(label)[:7].split("-")
+    return int(year) * 12 + int(month) - 1
+
+
+def month_label(number):
+    return f"{number // 12:04d}-{number % 12 + 1:02d}"
+
+
+def month_numbers(months):
+    """Vectorized month_number for "YYYY-MM" labels or datetimes."""
+    months = pd.Series(months)
+    if pd.api.types.is_datetime64_any_dtype(months):
+        return (months.dt.year * 12 + months.dt.month - 1).to_numpy(dtype=np.int64)
+    months = months.astype(str)
+    return (months.str[:4].astype(int) * 12 + months.str[5:7].astype(int) - 1).to_numpy(dtype=np.int64)
+
+
+class SSTClimatology:
+    def __init__(self, grid, first_month, sums, counts, path=CLIMATOLOGY_PATH):
+        self.grid = grid
+        self.first_month = int(first_month)  # month_number of sums[0]
+        self.sums = sums
+        self.counts = counts
+        self.path = path
+        self._climatology = None  # cached; cleared whenever data is folded in
+
+    # ---------------- state ----------------
+    @classmethod
+    def empty(cls, grid, path=CLIMATOLOGY_PATH):
+        shape = (0, grid.nlat, grid.nlon)
+        return cls(grid, 0, np.zeros(shape), np.zeros(shape, dtype=np.int32), path)
+
+    @staticmethod
+    def available(path=CLIMATOLOGY_PATH):
+        return os.path.exists(path)
+
+    @classmethod
+    def load(cls, path=CLIMATOLOGY_PATH):
+        with np.load(path) as data:
+            lat0, lon0, dlat, dlon, nlat, nlon = data["grid"]
+            grid = GridIndex(lat0, lon0, dlat, dlon, int(nlat), int(nlon))
+            return cls(grid, int(data["first_month"]), data["sums"], data["counts"], path)
+
+    def save(self, path=None):
+        path = path or self.path
+        g = self.grid
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, grid=np.array([g.lat0, g.lon0, g.dlat, g.dlon, g.nlat, g.nlon]),
+                 first_month=self.first_month, sums=self.sums, counts=self.counts)
+        os.replace(tmp, path)
+        return path
+
+    @property
+    def months(self):
+        return [month_label(self.first_month + k) for k in range(len(self.sums))]
+
+    def _extend(self, first, last):
+        """Grow the month axis to cover month numbers first..last."""
+        if not len(self.sums):
+            self.first_month = first
+        start = min(first, self.first_month)
+        end = max(last, self.first_month + len(self.sums) - 1)
+        before = self.first_month - start
+        after = end - (self.first_month + len(self.sums) - 1)
+        if before or after:
+            pad = ((before, after), (0, 0), (0, 0))
+            self.sums = np.pad(self.sums, pad)
+            self.counts = np.pad(self.counts, pad)
+            self.first_month = start
+
+    # ---------------- folding ----------------
+    def fold(self, months, lats, lons, sst, replace=False):
+        """Add observations (any mix of daily and monthly values).
+
+        months are "YYYY-MM" labels (or datetimes) per value. With replace,
+        the months present are cleared first, so a re-processed month (e.g.
+        one that was incomplete last time) is not counted twice.
+        Returns the number of values folded in (NaN and off-grid are skipped).
+        """
+        sst = np.asarray(sst, dtype=np.float64)
+        numbers = month_numbers(months)
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        i = np.rint((lats - self.grid.lat0) / self.grid.dlat).astype(np.intp)
+        j = np.rint((lons - self.grid.lon0) / self.grid.dlon).astype(np.intp)
+        ok = ~np.isnan(sst) & (i >= 0) & (i < self.grid.nlat) & (j >= 0) & (j < self.grid.nlon)
+        if not ok.any():
+            return 0
+        numbers, i, j, sst = numbers[ok], i[ok], j[ok], sst[ok]
+
+        self._extend(int(numbers.min()), int(numbers.max()))
+        m = numbers - self.first_month
+        if replace:
+            present = np.unique(m)
+            self.sums[present] = 0
+            self.counts[present] = 0
+        flat = np.ravel_multi_index((m, i, j), self.sums.shape)
+        self._climatology = None
+        self.sums += np.bincount(flat, weights=sst, minlength=self.sums.size).reshape(self.sums.shape)
+        self.counts += np.bincount(flat, minlength=self.sums.size).reshape(self.counts.shape).astype(np.int32)
+        return int(len(sst))
+
+    def fold_frame(self, df, replace=False):
+        """fold() for a raw SST frame with time/lat/lon/sst columns."""
+        return self.fold(df["time"], df["lat"], df["lon"], df["sst"], replace)
+
+    # ---------------- reductions ----------------
+    def monthly_mean(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.counts > 0, self.sums / np.maximum(self.counts, 1), np.nan)
+
+    def _calendar(self):
+        return (self.first_month + np.arange(len(self.sums))) % 12
+
+    def climatology(self):
+        """Mean SST of every calendar month (12 x lat x lon), each year weighted
+        equally whatever its number of observations."""
+        if self._climatology is not None:
+            return self._climatology
+        mean = self.monthly_mean()
+        valid = ~np.isnan(mean)
+        total = np.zeros((12,) + mean.shape[1:])
+        years = np.zeros((12,) + mean.shape[1:])
+        np.add.at(total, self._calendar(), np.where(valid, mean, 0.0))
+        np.add.at(years, self._calendar(), valid)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self._climatology = np.where(years > 0, total / np.maximum(years, 1), np.nan)
+        return self._climatology
+
+    def anomaly(self, month=None):
+        """Monthly mean minus climatology, for one month (2-D) or all (3-D)."""
+        clim = self.climatology()
+        if month is None:
+            return self.monthly_mean() - clim[self._calendar()]
+        k = self.month_index(month)
+        return self._mean_at(k) - clim[(self.first_month + k) % 12]
+
+    def rolling_mean(self, window=3, month=None):
+        """Trailing window-month mean of the monthly means, NaN-aware."""
+        if month is not None:
+            k = self.month_index(month)
+            window_means = [self._mean_at(m) for m in range(max(k - window + 1, 0), k + 1)]
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN cells stay NaN
+                return np.nanmean(window_means, axis=0)
+        mean = self.monthly_mean()
+        valid = ~np.isnan(mean)
+        csum = np.concatenate([np.zeros((1,) + mean.shape[1:]), np.cumsum(np.where(valid, mean, 0.0), axis=0)])
+        ccnt = np.concatenate([np.zeros((1,) + mean.shape[1:]), np.cumsum(valid, axis=0)])
+        end = np.arange(1, len(mean) + 1)
+        start = np.maximum(end - window, 0)
+        total, count = csum[end] - csum[start], ccnt[end] - ccnt[start]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rolled = np.where(count > 0, total / np.maximum(count, 1), np.nan)
+        return rolled
+
+    def _mean_at(self, k):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.counts[k] > 0, self.sums[k] / np.maximum(self.counts[k], 1), np.nan)
+
+    # ---------------- lookups ----------------
+    def month_index(self, month=None):
+        """Index of a "YYYY-MM" month (None = latest month with data)."""
+        if month is None:
+            filled = np.flatnonzero(self.counts.reshape(len(self.counts), -1).any(axis=1))
+            if not filled.size:
+                raise KeyError("Climatology is empty")
+            return int(filled[-1])
+        k = month_number(month) - self.first_month
+        if not 0 <= k < len(self.sums):
+            raise KeyError(f"Month {month} not in climatology")
+        return k
+
+    def field(self, layer="anomaly", month=None, window=3):
+        """2-D field of one layer for one month."""
+        k = self.month_index(month)
+        if layer == "mean":
+            return self._mean_at(k)
+        if layer == "climatology":
+            return self.climatology()[(self.first_month + k) % 12]
+        if layer == "anomaly":
+            return self.anomaly(self.months[k])
+        if layer == "rolling_mean":
+            return self.rolling_mean(window, self.months[k])
+        raise ValueError(f"Unknown climatology layer: {layer}")
+
+    def lookup(self, lats, lons, layer="anomaly", month=None, window=3):
+        """Bilinear lookup of a layer at scattered points (NaN off the data)."""
+        g = self.grid
+        index = GridIndex(g.lat0, g.lon0, g.dlat, g.dlon, g.nlat, g.nlon, values=self.field(layer, month, window))
+        return index.bilinear(lats, lons)
+
+    def features(self, months, lats, lons, window=3):
+        """Climatology, anomaly and rolling mean of the nearest cell for every
+        (month, lat, lon) row, from one pass over the cube (NaN outside it)."""
+        k = month_numbers(months) - self.first_month
+        inside = (k >= 0) & (k < len(self.sums)) & self.grid.contains(lats, lons)
+        k = np.clip(k, 0, max(len(self.sums) - 1, 0))
+        i, j = self.grid.cell(lats, lons)
+        clim = self.climatology()[(self.first_month + k) % 12, i, j]
+        mean = self.monthly_mean()[k, i, j]
+        rolled = self.rolling_mean(window)[k, i, j]
+        return {
+            "climatology": np.where(inside, clim, np.nan),
+            "anomaly": np.where(inside, mean - clim, np.nan),
+            "rolling_mean": np.where(inside, rolled, np.nan),
+        }
+
+    def to_frame(self, months=None):
+        """Long-format monthly means (Month, Latitude, Longitude, SST) like clean_sst."""
+        parts = []
+        for label in months if months is not None else self.months:
+            try:
+                k = self.month_index(label)
+            except KeyError:
+                continue  # no valid values folded for this month
+            i, j = np.nonzero(self.counts[k])
+            parts.append(pd.DataFrame({
+                "Month": label,
+                "Latitude": self.grid.lat0 + self.grid.dlat * i,
+                "Longitude": self.grid.lon0 + self.grid.dlon * j,
+                "SST": self.sums[k, i, j] / self.counts[k, i, j],
+            }))
+        if not parts:
+            return pd.DataFrame(columns=["Month", "Latitude", "Longitude", "SST"])
+        return pd.concat(parts, ignore_index=True)
+
+
+def grid_for(dataset="indian_sst"):
+    """Regular grid of a raw SST dataset's coordinates."""
+    coords = data_store.read_table(dataset, columns=["lat", "lon"],
+                                   filters=data_store.bbox_filter(months=data_store.months(dataset)[:1]))
+    return GridIndex.from_points(coords["lat"], coords["lon"])
+
+
+def load_or_create(path=CLIMATOLOGY_PATH, dataset="indian_sst"):
+    if SSTClimatology.available(path):
+        return SSTClimatology.load(path)
+    return SSTClimatology.empty(grid_for(dataset), path)
+
+
+def rebuild(dataset="indian_sst", path=CLIMATOLOGY_PATH):
+    """Fold every month of a raw SST dataset into a fresh climatology."""
+    clim = SSTClimatology.empty(grid_for(dataset), path)
+    for month in data_store.months(dataset):
+        df = data_store.read_table(dataset, columns=["time", "lat", "lon", "sst"],
+                                   filters=data_store.bbox_filter(months=[month]))
+        clim.fold_frame(df, replace=True)
+    clim.save()
+    return clim
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SST climatology / anomaly cube")
+    parser.add_argument("--rebuild", action="store_true", help="fold every month of indian_sst from scratch")
+    parser.add_argument("--month", help="month to summarize (default: latest)")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        print("🌡️ Folding indian_sst into the climatology cube...")
+        rebuild()
+    clim = SSTClimatology.load()
+    month = clim.months[clim.month_index(args.month)]
+    anomaly = clim.anomaly(month)
+    print(f"✅ {len(clim.months)} months ({clim.months[0]} .. {clim.months[-1]}) x "
+          f"{clim.grid.nlat} x {clim.grid.nlon} cells")
+    print(f"   {month}: mean anomaly {np.nanmean(anomaly):+.2f} °C, "
+          f"range {np.nanmin(anomaly):+.2f} .. {np.nanmax(anomaly):+.2f} °C")
@@ -0,0 +1,249 @@
+# src/compact_models.py
+# Shrink the tree ensembles for serving. Starting from the flat-array export
+# (export_flat_models.py), every model is
+#   1. depth-limited: the smallest max depth whose predictions stay within
+#      --tolerance of the full model is kept (internal nodes already carry
+#      the mean value of their subtree, so cutting a tree is just turning a
+#      node into a leaf),
+#   2. pruned: splits whose two leaves hold the same (quantized) value are
+#      merged, and unreachable nodes are dropped,
+#   3. quantized: thresholds to float32 (rounded down, so every float32
+#      input takes exactly the same branch), leaf values to float16 (float32
+#      if float16 breaks the tolerance), feature ids to uint8,
+# then written as compressed .npz files plus manifest.json in models/compact.
+# Serve them with FISH_MODEL_FORMAT=compact.
+#
+#   python src/compact_models.py --tolerance 0.01
+import argparse
+import hashlib
+import json
+import os
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+import model_registry
+from export_flat_models import compile_model, verification_inputs
+from flat_forest import FORMAT_VERSION, FlatEnsemble, FlatModel, FlatPCA, save_flat
+
+MANIFEST = os.path.join(model_registry.COMPACT_DIR, "manifest.json")
+
+
+# ======================= TREE SURGERY =======================
+def _is_leaf(ens):
+    return ens.left == np.arange(len(ens.left))
+
+
+def node_depths(ens):
+    """Depth of every node (-1 for nodes no root can reach)."""
+    depth = np.full(len(ens.left), -1, dtype=np.int32)
+    frontier = ens.roots.astype(np.intp)
+    d = 0
+    while frontier.size:
+        depth[frontier] = d
+        internal = frontier[~_is_leaf(ens)[frontier]]
+        frontier = np.concatenate([ens.left[internal], ens.right[internal]]).astype(np.intp)
+        d += 1
+    return depth
+
+
+def _with_arrays(ens, **arrays):
+    fields = dict(feature=ens.feature, threshold=ens.threshold, left=ens.left, right=ens.right,
+                  value=ens.value, roots=ens.roots)
+    fields.update(arrays)
+    return FlatEnsemble(max_depth=ens.max_depth, combine=ens.combine, scale=ens.scale, init=ens.init, **fields)
+
+
+def _make_leaves(nodes, feature, threshold, left, right):
+    left[nodes] = nodes
+    right[nodes] = nodes
+    threshold[nodes] = np.inf
+    feature[nodes] = 0
+
+
+def truncate(ens, max_depth):
+    """Turn every internal node at depth >= max_depth into a leaf."""
+    feature, threshold = ens.feature.copy(), ens.threshold.copy()
+    left, right = ens.left.copy(), ens.right.copy()
+    cut = np.flatnonzero((node_depths(ens) >= max_depth) & ~_is_leaf(ens))
+    _make_leaves(cut, feature, threshold, left, right)
+    return _with_arrays(ens, feature=feature, threshold=threshold, left=left, right=right)
+
+
+def merge_equal_leaves(ens, value_dtype):
+    """Collapse splits whose two children are leaves with equal quantized values."""
+    feature, threshold = ens.feature.copy(), ens.threshold.copy()
+    left, right, value = ens.left.copy(), ens.right.copy(), ens.value.copy()
+    q = value.astype(value_dtype)
+    idx = np.arange(len(left))
+    while True:
+        leaf = left == idx
+        both = ~leaf & leaf[left] & leaf[right]
+        same = both & np.all(q[left] == q[right], axis=1)
+        nodes = np.flatnonzero(same)
+        if not nodes.size:
+            break
+        value[nodes] = value[left[nodes]]
+        q[nodes] = q[left[nodes]]
+        _make_leaves(nodes, feature, threshold, left, right)
+    return _with_arrays(ens, feature=feature, threshold=threshold, left=left, right=right, value=value)
+
+
+def drop_unreachable(ens):
+    """Renumber reachable nodes contiguously (tree by tree) and recompute max depth."""
+    depth = node_depths(ens)
+    keep = np.flatnonzero(depth >= 0)
+    new_index = np.full(len(ens.left), -1, dtype=np.int64)
+    new_index[keep] = np.arange(len(keep))
+    return FlatEnsemble(
+        feature=ens.feature[keep], threshold=ens.threshold[keep],
+        left=new_index[ens.left[keep]].astype(np.int32), right=new_index[ens.right[keep]].astype(np.int32),
+        value=ens.value[keep], roots=new_index[ens.roots].astype(np.int32),
+        max_depth=int(depth.max()) if len(keep) else 0,
+        combine=ens.combine, scale=ens.scale, init=ens.init)
+
+
+def round_down_float32(x):
+    """Largest float32 <= x, elementwise (inf stays inf)."""
+    x = np.asarray(x, dtype=np.float64)
+    x32 = x.astype(np.float32)
+    too_big = x32.astype(np.float64) > x
+    x32[too_big] = np.nextafter(x32[too_big], np.float32(-np.inf))
+    return x32
+
+
+def quantize(ens, value_dtype):
+    return FlatEnsemble(
+        feature=ens.feature.astype(np.uint8 if ens.feature.max(initial=0) < 256 else np.int32),
+        threshold=round_down_float32(ens.threshold), left=ens.left.astype(np.int32),
+        right=ens.right.astype(np.int32), value=ens.value.astype(value_dtype),
+        roots=ens.roots.astype(np.int32), max_depth=ens.max_depth,
+        combine=ens.combine, scale=ens.scale, init=ens.init)
+
+
+def compact_model(flat, max_depth, value_dtype):
+    ensembles = []
+    for ens in flat.ensembles:
+        if max_depth is not None and ens.max_depth > max_depth:
+            ens = truncate(ens, max_depth)
+        ens = merge_equal_leaves(ens, value_dtype)
+        ensembles.append(quantize(drop_unreachable(ens), value_dtype))
+    return FlatModel(flat.kind, ensembles, flat.classes_, flat.weights, flat.n_features_in_)
+
+
+def n_nodes(flat):
+    return sum(len(e.left) for e in flat.ensembles)
+
+
+# ======================= FIDELITY =======================
+def fidelity_error(reference, candidate, X):
+    """Classifiers: share of rows whose label changes. Regressors: RMSE of the
+    prediction change relative to the std of the reference predictions."""
+    ref, new = reference.predict(X), candidate.predict(X)
+    if reference.is_classifier:
+        return float(np.mean(ref != new))
+    scale = float(np.std(ref)) or 1.0
+    return float(np.sqrt(np.mean((ref - new) ** 2)) / scale)
+
+
+def search(flat, X, tolerance):
+    """Smallest depth limit (and narrowest value dtype) within tolerance."""
+    full_depth = max(e.max_depth for e in flat.ensembles)
+    for value_dtype in (np.float16, np.float32):
+        best = compact_model(flat, None, value_dtype)
+        err = fidelity_error(flat, best, X)
+        if err > tolerance:
+            continue
+        best_depth, best_err = None, err
+        for depth in range(full_depth - 1, 0, -1):
+            candidate = compact_model(flat, depth, value_dtype)
+            err = fidelity_error(flat, candidate, X)
+            if err > tolerance:
+                break
+            best, best_depth, best_err = candidate, depth, err
+        return best, best_depth, np.dtype(value_dtype).name, best_err
+    # quantizing the values alone breaks the tolerance: keep float64 values
+    best = compact_model(flat, None, np.float64)
+    return best, None, "float64", fidelity_error(flat, best, X)
+
+
+# ======================= ARTIFACTS =======================
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def compact_artifact(name, tolerance):
+    source = model_registry.artifact_path(name)
+    flat = compile_model(joblib.load(source))
+    path = model_registry.compact_artifact_path(name)
+    os.makedirs(model_registry.COMPACT_DIR, exist_ok=True)
+
+    entry = model_registry.source_fingerprint(name)
+    if isinstance(flat, FlatPCA):
+        save_flat(flat, path, compress=True)
+    else:
+        X = verification_inputs(name)
+        compact, depth, value_dtype, err = search(flat, X, tolerance)
+        save_flat(compact, path, compress=True)
+        entry.update({
+            "max_depth_limit": depth,
+            "value_dtype": value_dtype,
+            "nodes_before": n_nodes(flat),
+            "nodes_after": n_nodes(compact),
+            "fidelity_metric": "label_disagreement" if flat.is_classifier else "relative_rmse",
+            "fidelity_error": err,
+        })
+    entry.update({"file": os.path.basename(path), "bytes": os.path.getsize(path), "sha256": _sha256(path)})
+    return entry
+
+
+def write_manifest(entries, tolerance):
+    """Record the new entries, keeping those of artifacts not rebuilt this run."""
+    artifacts = {}
+    if os.path.exists(MANIFEST):
+        with open(MANIFEST) as f:
+            artifacts = json.load(f).get("artifacts", {})
+    artifacts.update(entries)
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "tolerance": tolerance,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "artifacts": artifacts,
+    }
+    with open(MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prune, depth-limit and quantize the tree ensembles")
+    parser.add_argument("--tolerance", type=float, default=0.01,
+                        help="max label disagreement (classifiers) / relative RMSE (regressors)")
+    parser.add_argument("--models", nargs="+", default=list(model_registry.FLAT_ARTIFACTS),
+                        choices=model_registry.FLAT_ARTIFACTS)
+    args = parser.parse_args()
+
+    # the models were fitted on DataFrames; verification feeds plain arrays
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    print("🗜️ Compacting models...")
+    entries = {}
+    for name in args.models:
+        try:
+            entry = entries[name] = compact_artifact(name, args.tolerance)
+        except Exception as e:
+            print(f"⚠ {name}: skipped ({e})")
+            continue
+        detail = ""
+        if "nodes_after" in entry:
+            detail = (f" depth<={entry['max_depth_limit'] or 'full'}, {entry['value_dtype']} values, "
+                      f"{entry['nodes_before']}->{entry['nodes_after']} nodes, "
+                      f"{entry['fidelity_metric']}={entry['fidelity_error']:.4f},")
+        print(f"✅ {name}:{detail} {entry['source_bytes'] / 1e6:.1f} MB -> {entry['bytes'] / 1e6:.2f} MB")
+    write_manifest(entries, args.tolerance)
+    print(f"📄 Manifest written to {MANIFEST}")
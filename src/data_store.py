@@ -0,0 +1,173 @@
+# src/data_store.py
+# Typed, columnar storage for the preprocessing chain. Every dataset is a
+# Parquet directory under data/ partitioned by month, with an explicit schema
+# (float32 measurements, int16 labels), so each step reads only the columns
+# and rows it needs instead of re-parsing CSV text.
+import os
+import shutil
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+DATA_DIR = os.environ.get("FISH_DATA_DIR") or os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data"))
+
+PARTITION_COLUMN = "Month"
+
+# Column types per dataset; columns not listed keep their inferred type
+SCHEMAS = {
+    "noaa_sst": {"time": "datetime64[ns]", "lat": "float32", "lon": "float32", "sst": "float32"},
+    "indian_sst": {"time": "datetime64[ns]", "lat": "float32", "lon": "float32", "sst": "float32"},
+    "clean_sst": {"Month": "string", "Latitude": "float32", "Longitude": "float32", "SST": "float32"},
+    "final_training_data": {
+        "Month": "string", "Latitude": "float32", "Longitude": "float32", "SST": "float32",
+        "Historical_Catch": "float32", "Availability": "int16",
+    },
+    "final_training_data_fixed": {
+        "Month": "string", "Latitude": "float32", "Longitude": "float32", "SST": "float32",
+        "SST_Extra": "float32", "Salinity": "float32", "Dissolved_Oxygen": "float32",
+        "Historical_Catch": "int16",
+    },
+}
+
+
+def dataset_path(name):
+    return os.path.join(DATA_DIR, name)
+
+
+def exists(name):
+    return os.path.isdir(dataset_path(name))
+
+
+def _cast(df, name):
+    schema = SCHEMAS.get(name, {})
+    return df.astype({col: dtype for col, dtype in schema.items() if col in df.columns})
+
+
+def apply_schema(df, name):
+    """Cast the columns of df to the declared types of dataset name."""
+    df = _cast(df, name)
+    # month partitions are derived from the time column when not given
+    if PARTITION_COLUMN not in df.columns and "time" in df.columns:
+        df[PARTITION_COLUMN] = df["time"].dt.strftime("%Y-%m").astype("string")
+    return df
+
+
+def write_table(df, name, mode="overwrite"):
+    """Write df as dataset name, partitioned by month.
+
+    mode="overwrite" replaces the whole dataset; mode="append" only
+    replaces the month partitions present in df (used for incremental loads).
+    """
+    df = apply_schema(df, name)
+    path = dataset_path(name)
+    if mode == "overwrite":
+        delete(name)
+    os.makedirs(path, exist_ok=True)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    partition_cols = [PARTITION_COLUMN] if PARTITION_COLUMN in df.columns else None
+    pq.write_to_dataset(
+        table, path,
+        partition_cols=partition_cols,
+        existing_data_behavior="delete_matching",
+        basename_template="part-{i}.parquet",
+    )
+    return path
+
+
+def read_table(name, columns=None, filters=None):
+    """Read dataset name with column projection and predicate pushdown.
+
+    filters is a pyarrow expression or a list of (column, op, value)
+    tuples, e.g. bbox_filter(...). Partition (month) filters skip whole
+    directories; lat/lon filters use row-group statistics.
+    """
+    path = dataset_path(name)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Dataset '{name}' not found in {DATA_DIR}")
+    table = pq.read_table(path, columns=columns, filters=filters, partitioning="hive")
+    df = table.to_pandas()
+    if PARTITION_COLUMN in df.columns:
+        df[PARTITION_COLUMN] = df[PARTITION_COLUMN].astype("string")
+    return _cast(df, name)
+
+
+def _dataset(name):
+    import pyarrow.dataset as ds
+    path = dataset_path(name)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Dataset '{name}' not found in {DATA_DIR}")
+    return ds.dataset(path, format="parquet", partitioning="hive")
+
+
+def _expression(filters):
+    if filters is None or isinstance(filters, pc.Expression):
+        return filters
+    return pq.filters_to_expression(filters)
+
+
+def count_rows(name, filters=None):
+    """Row count of dataset name (from Parquet metadata when unfiltered)."""
+    return _dataset(name).count_rows(filter=_expression(filters))
+
+
+def iter_batches(name, columns=None, filters=None, batch_size=1_000_000):
+    """Stream dataset name as DataFrames of batch_size rows (the last one may
+    be shorter), so out-of-core consumers never hold the whole table.
+
+    Chunk boundaries depend only on the stored data and batch_size, so two
+    passes over the same dataset see the same chunks.
+    """
+    pending, pending_rows = [], 0
+    scanner = _dataset(name).scanner(columns=columns, filter=_expression(filters), batch_size=batch_size)
+    for batch in scanner.to_batches():
+        # month partitions hold few rows each; regroup into full chunks
+        while batch.num_rows:
+            take = min(batch_size - pending_rows, batch.num_rows)
+            pending.append(batch.slice(0, take))
+            pending_rows += take
+            batch = batch.slice(take)
+            if pending_rows == batch_size:
+                yield _batch_frame(pending, name)
+                pending, pending_rows = [], 0
+    if pending_rows:
+        yield _batch_frame(pending, name)
+
+
+def _batch_frame(batches, name):
+    df = pa.Table.from_batches(batches).to_pandas()
+    if PARTITION_COLUMN in df.columns:
+        df[PARTITION_COLUMN] = df[PARTITION_COLUMN].astype("string")
+    return _cast(df, name)
+
+
+def delete(name):
+    path = dataset_path(name)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+
+
+def bbox_filter(lat_range=None, lon_range=None, months=None, lat_col="Latitude", lon_col="Longitude"):
+    """Filter tuples for a lat/lon bounding box and an optional list of months."""
+    filters = []
+    if lat_range is not None:
+        lo, hi = sorted(lat_range)
+        filters += [(lat_col, ">=", lo), (lat_col, "<=", hi)]
+    if lon_range is not None:
+        lo, hi = sorted(lon_range)
+        filters += [(lon_col, ">=", lo), (lon_col, "<=", hi)]
+    if months is not None:
+        filters.append((PARTITION_COLUMN, "in", list(months)))
+    return filters or None
+
+
+def months(name):
+    """Month partitions currently stored for dataset name (sorted)."""
+    path = dataset_path(name)
+    if not os.path.isdir(path):
+        return []
+    prefix = f"{PARTITION_COLUMN}="
+    return sorted(d[len(prefix):] for d in os.listdir(path) if d.startswith(prefix))
+
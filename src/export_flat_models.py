@@ -0,0 +1,177 @@
+# src/export_flat_models.py
+# Export the sklearn tree ensembles in models/ to the flat-array format read
+# by flat_forest.py, and check that the exported model reproduces sklearn's
+# output to within 1e-9 before writing it. models/flat/manifest.json records
+# the size and sha256 of the pickle each export was compiled from, so the
+# registry never serves an export older than its pickle.
+#
+#   python src/export_flat_models.py
+import json
+import os
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+import model_registry
+from features import FEATURES, JUVENILE_FEATURES
+from flat_forest import FlatEnsemble, FlatModel, FlatPCA, save_flat
+
+TOLERANCE = 1e-9
+
+# Value ranges used to draw verification inputs (same ranges as the
+# synthetic training data)
+FEATURE_RANGES = {
+    "SST": (20, 32),
+    "Salinity": (28, 36),
+    "Dissolved_Oxygen": (3, 9),
+    "Historical_Catch": (50, 1000),
+}
+
+
+# ======================= COMPILE =======================
+def flatten_trees(trees, classifier):
+    """Concatenate sklearn Tree objects into one set of flat arrays."""
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for tree in trees:
+        n = tree.node_count
+        leaf = tree.children_left == -1
+        idx = np.arange(n) + offset
+        lefts.append(np.where(leaf, idx, tree.children_left + offset))
+        rights.append(np.where(leaf, idx, tree.children_right + offset))
+        features.append(np.where(leaf, 0, tree.feature))
+        thresholds.append(np.where(leaf, np.inf, tree.threshold))
+        value = tree.value[:, 0, :].astype(np.float64)
+        if classifier:
+            totals = value.sum(axis=1, keepdims=True)
+            totals[totals == 0] = 1.0
+            value = value / totals
+        values.append(value)
+        roots.append(offset)
+        max_depth = max(max_depth, tree.max_depth)
+        offset += n
+
+    return dict(
+        feature=np.concatenate(features).astype(np.int32),
+        threshold=np.concatenate(thresholds).astype(np.float64),
+        left=np.concatenate(lefts).astype(np.int32),
+        right=np.concatenate(rights).astype(np.int32),
+        value=np.concatenate(values),
+        roots=np.array(roots, dtype=np.int32),
+        max_depth=max_depth,
+    )
+
+
+def _compile_ensemble(est):
+    name = type(est).__name__
+    if name in ("RandomForestClassifier", "ExtraTreesClassifier"):
+        return FlatEnsemble(**flatten_trees([t.tree_ for t in est.estimators_], classifier=True))
+    if name in ("RandomForestRegressor", "ExtraTreesRegressor"):
+        return FlatEnsemble(**flatten_trees([t.tree_ for t in est.estimators_], classifier=False))
+    if name in ("GradientBoostingClassifier", "GradientBoostingRegressor"):
+        if est.estimators_.shape[1] != 1:
+            raise ValueError("Only binary GradientBoostingClassifier is supported")
+        arrays = flatten_trees([t.tree_ for t in est.estimators_[:, 0]], classifier=False)
+        init = est._raw_predict_init(np.zeros((1, est.n_features_in_)))[0]
+        return FlatEnsemble(combine="sum", scale=est.learning_rate, init=init, **arrays)
+    raise ValueError(f"Cannot flatten estimator of type {name}")
+
+
+_KINDS = {
+    "RandomForestClassifier": "rf_classifier",
+    "ExtraTreesClassifier": "rf_classifier",
+    "RandomForestRegressor": "rf_regressor",
+    "ExtraTreesRegressor": "rf_regressor",
+    "GradientBoostingClassifier": "gb_classifier",
+    "GradientBoostingRegressor": "gb_regressor",
+}
+
+
+def compile_model(est):
+    """Convert a fitted sklearn estimator into a FlatModel / FlatPCA."""
+    name = type(est).__name__
+    if name in ("PCA", "IncrementalPCA"):
+        # keep the fitted dtype: PCA fitted on float32 data computes in float32
+        return FlatPCA(est.mean_, est.components_, est.explained_variance_, bool(est.whiten))
+    if name in ("VotingClassifier", "VotingRegressor"):
+        if name == "VotingClassifier" and est.voting != "soft":
+            raise ValueError("Only soft VotingClassifier is supported")
+        ensembles = [_compile_ensemble(e) for e in est.estimators_]
+        kind = "voting_classifier" if name == "VotingClassifier" else "voting_regressor"
+        classes = est.classes_ if name == "VotingClassifier" else None
+        weights = None if est.weights is None else list(est.weights)
+        return FlatModel(kind, ensembles, classes, weights, est.n_features_in_)
+    if name not in _KINDS:
+        raise ValueError(f"Cannot flatten estimator of type {name}")
+    classes = getattr(est, "classes_", None)
+    return FlatModel(_KINDS[name], [_compile_ensemble(est)], classes, None, est.n_features_in_)
+
+
+# ======================= VERIFY =======================
+def max_abs_error(est, flat, X):
+    """Largest absolute difference between sklearn and flat outputs on X."""
+    if hasattr(flat, "transform"):
+        return float(np.max(np.abs(est.transform(X) - flat.transform(X))))
+    if flat.is_classifier:
+        if not np.array_equal(est.predict(X), flat.predict(X)):
+            return float("inf")
+        return float(np.max(np.abs(est.predict_proba(X) - flat.predict_proba(X))))
+    return float(np.max(np.abs(est.predict(X) - flat.predict(X))))
+
+
+def sample_inputs(columns, n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.uniform(*FEATURE_RANGES[c], n) for c in columns])
+
+
+def verification_inputs(name):
+    if name == "juvenile":
+        return sample_inputs(JUVENILE_FEATURES)
+    X = sample_inputs(FEATURES)
+    if name.startswith("hybrid_"):
+        X = model_registry.load_model("pca").transform(X)
+    return X
+
+
+def export_artifact(name):
+    est = joblib.load(model_registry.artifact_path(name))
+    flat = compile_model(est)
+    err = max_abs_error(est, flat, verification_inputs(name))
+    if err > TOLERANCE:
+        raise ValueError(f"{name}: flat model differs from sklearn by {err:.3g}")
+    path = model_registry.flat_artifact_path(name)
+    os.makedirs(model_registry.FLAT_DIR, exist_ok=True)
+    save_flat(flat, path)
+    return {**model_registry.source_fingerprint(name), "file": os.path.basename(path), "max_abs_error": err}
+
+
+def write_manifest(entries):
+    """Record the new entries, keeping those of artifacts not exported this run."""
+    artifacts = {}
+    if os.path.exists(model_registry.FLAT_MANIFEST):
+        with open(model_registry.FLAT_MANIFEST) as f:
+            artifacts = json.load(f).get("artifacts", {})
+    artifacts.update(entries)
+    manifest = {"created": time.strftime("%Y-%m-%d %H:%M:%S"), "artifacts": artifacts}
+    with open(model_registry.FLAT_MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+if __name__ == "__main__":
+    # the models were fitted on DataFrames; verification feeds plain arrays
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    print("📦 Exporting tree ensembles to flat arrays...")
+    entries = {}
+    for name in model_registry.FLAT_ARTIFACTS:
+        try:
+            entry = entries[name] = export_artifact(name)
+            print(f"✅ {name}: max abs error {entry['max_abs_error']:.2e} -> {model_registry.flat_artifact_path(name)}")
+        except Exception as e:
+            print(f"⚠ {name}: skipped ({e})")
+    if entries:
+        write_manifest(entries)
+        print(f"📄 Manifest written to {model_registry.FLAT_MANIFEST}")
@@ -0,0 +1,95 @@
+# src/features.py
+# One definition of the model inputs and of the heuristic labels, shared by
+# the data scripts, the training scripts and every serving path (app, CLI,
+# HTTP server, heatmap), so training and serving cannot drift apart.
+#
+# Everything is vectorized (NumPy masks / np.digitize) and elementwise, so
+# it runs on a whole table or chunk by chunk (data_store.iter_batches) alike.
+import numpy as np
+
+FEATURES = ["SST", "Salinity", "Dissolved_Oxygen", "Historical_Catch"]
+JUVENILE_FEATURES = ["SST", "Salinity", "Historical_Catch"]
+
+# Input columns per artifact; the hybrid models take the PCA output instead
+MODEL_FEATURES = {
+    "availability": FEATURES,
+    "quantity": FEATURES,
+    "xgb_availability": FEATURES,
+    "xgb_quantity": FEATURES,
+    "pca": FEATURES,
+    "juvenile": JUVENILE_FEATURES,
+}
+
+RISK_LEVELS = np.array(["High", "Medium", "Low"])
+
+# Label thresholds
+CATCH_AVAILABLE_KG = 300            # model_training.py: catch above this = fish available
+SST_AVAILABLE_RANGE = (25, 30)      # merge_dataset.py: best SST band
+SST_JUVENILE_BANDS = (23, 25, 30)   # High below 23 / Medium 23-25 / Low 25-30 / High above 30
+CATCH_JUVENILE_BANDS = (250, 600)   # High below 250 / Medium 250-600 / Low above 600
+
+
+# Optional SST history features from climatology.py (add_climatology_features)
+CLIMATOLOGY_FEATURES = ["SST_Climatology", "SST_Anomaly", "SST_Rolling_Mean"]
+
+
+def check_columns(df, columns):
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing input columns: {', '.join(missing)}")
+
+
+# ======================= MODEL INPUTS =======================
+def model_input(df, model="availability"):
+    """The columns model was trained on, in training order, as float."""
+    columns = MODEL_FEATURES[model]
+    check_columns(df, columns)
+    return df[columns].astype(float)
+
+
+def feature_matrix(columns, model="availability"):
+    """(n, n_features) float array for model from a {feature: array} mapping,
+    e.g. the synthetic fields of the map grid."""
+    return np.column_stack([np.asarray(columns[f], dtype=float) for f in MODEL_FEATURES[model]])
+
+
+def add_climatology_features(df, clim, window=3):
+    """CLIMATOLOGY_FEATURES for a frame with Month, Latitude and Longitude
+    columns (e.g. a final_training_data chunk), looked up in an SSTClimatology."""
+    check_columns(df, ["Month", "Latitude", "Longitude"])
+    values = clim.features(df["Month"], df["Latitude"], df["Longitude"], window)
+    out = df.copy()
+    out["SST_Climatology"] = values["climatology"]
+    out["SST_Anomaly"] = values["anomaly"]
+    out["SST_Rolling_Mean"] = values["rolling_mean"]
+    return out
+
+
+# ======================= LABELS =======================
+def availability_from_catch(catch, threshold=CATCH_AVAILABLE_KG):
+    """1 where the catch is above threshold (training target of the availability models)."""
+    return (np.asarray(catch, dtype=float) > threshold).astype(int)
+
+
+def availability_from_sst(sst, sst_range=SST_AVAILABLE_RANGE):
+    """1 inside the favourable SST band."""
+    sst = np.asarray(sst, dtype=float)
+    low, high = sst_range
+    return ((sst >= low) & (sst <= high)).astype(int)
+
+
+def juvenile_risk_from_sst(sst, bands=SST_JUVENILE_BANDS):
+    """High at SST extremes, Medium just below the favourable band, else Low."""
+    sst = np.asarray(sst, dtype=float)
+    cold, cool, warm = bands
+    level = np.digitize(sst, [cold, cool])  # 0 below cold, 1 cold-cool, 2 above cool (and NaN)
+    level = np.where(sst > warm, 0, level)
+    return RISK_LEVELS[level]
+
+
+def juvenile_risk_from_catch(catch, bands=CATCH_JUVENILE_BANDS):
+    """High for small past catches, Low for large ones (NaN -> Medium)."""
+    catch = np.asarray(catch, dtype=float)
+    low, high = bands
+    level = np.where(catch < low, 0, np.where(catch <= high, 1, 2))
+    return RISK_LEVELS[np.where(np.isnan(catch), 1, level)]
@@ -1,9 +1,16 @@
-import requests
+from live_sst_client import LiveSSTClient
+
+_client = None
+
 
 def get_live_sst(lat, lon):
-    api = f"https://marine-api.open-meteo.com/v1/marine?latitude={lat}&longitude={lon}&daily=sea_surface_temperature_mean&timezone=auto"
-    r = requests.get(api).json()
-    try:
-        return r["daily"]["sea_surface_temperature_mean"][0]
-    except:
-        return None
+    """Live SST for one point (None if the API has no value or is unreachable).
+
+    Uses the pooled, retrying client from live_sst_client; for many points
+    call LiveSSTClient.get_sst with arrays instead.
+    """
+    global _client
+    if _client is None:
+        _client = LiveSSTClient(max_concurrency=1)
+    value = _client.get_sst([lat], [lon])[0]
+    return None if value != value else float(value)  # NaN -> None
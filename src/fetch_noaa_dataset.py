@@ -1,14 +1,15 @@
-import xarray as xr
+import sys
 
-print("Downloading NOAA SST Dataset... Please wait...")
+from sst_ingest import NOAA_SST_URL, ingest_sst
 
-url = "https://psl.noaa.gov/thredds/dodsC/Datasets/noaa.oisst.v2/sst.mnmean.nc"
-data = xr.open_dataset(url)
+print("Downloading NOAA SST Dataset... Please wait...")
 
-print("Dataset Structure:")
-print(data)
+# Optional argument: local NetCDF file to use instead of the NOAA server
+source = sys.argv[1] if len(sys.argv) > 1 else NOAA_SST_URL
 
-df = data.to_dataframe().reset_index()
-df.to_csv("../data/noaa_sst.csv", index=False)
+# The global cube is streamed a few months at a time instead of being
+# materialized in memory with to_dataframe()
+rows = ingest_sst(source, dataset="noaa_sst", chunk_size=6)
 
-print("NOAA SST dataset saved successfully to data/noaa_sst.csv")
+print("NOAA SST dataset saved successfully to data/noaa_sst/")
+print("Rows:", rows)
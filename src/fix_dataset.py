@@ -1,10 +1,8 @@
-import pandas as pd
 import numpy as np
 
-df = pd.read_csv("data/final_training_data.csv")
+import data_store
 
-# Rename duplicate SST column
-df = df.rename(columns={"SST.1": "SST_Extra"})
+df = data_store.read_table("final_training_data")
 
 # Add synthetic values (temporary placeholders)
 np.random.seed(42)
@@ -13,5 +11,5 @@ df["Dissolved_Oxygen"] = np.random.uniform(4.5, 7.5, size=len(df))
 df["Historical_Catch"] = np.random.randint(50, 800, size=len(df))
 
 # Save updated dataset
-df.to_csv("data/final_training_data_fixed.csv", index=False)
+data_store.write_table(df, "final_training_data_fixed")
 print("Final dataset prepared successfully! Rows:", len(df))
@@ -0,0 +1,232 @@
+# src/flat_forest.py
+# Pure-NumPy inference engine for tree ensembles exported by
+# export_flat_models.py. Every tree of an ensemble lives in the same
+# contiguous arrays (feature, threshold, left, right, value), and a batch is
+# scored by walking all rows through all trees at once, one depth level per
+# step. No scikit-learn import is needed at serving time.
+#
+# Format version 2 allows reduced-precision arrays (float32 thresholds,
+# float16 values, uint8 features) as written by compact_models.py.
+import json
+
+import numpy as np
+
+FORMAT_VERSION = 2
+
+
+class FlatEnsemble:
+    """One tree ensemble (RandomForest or GradientBoosting) as flat arrays.
+
+    Leaves point to themselves (left == right == node, threshold == +inf), so
+    at most max_depth vectorized steps land every row on its leaf without any
+    per-row branching.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth,
+                 combine="mean", scale=1.0, init=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.combine = combine  # "mean" (forests) or "sum" (boosting)
+        self.scale = float(scale)
+        self.init = np.zeros(value.shape[1]) if init is None else np.asarray(init, dtype=float)
+        # left/right interleaved so one gather picks the next node
+        self._children = np.column_stack([left, right]).ravel().astype(np.intp)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """Leaf node index of every (row, tree) pair, shape (n_rows, n_trees)."""
+        n_rows, n_features = X.shape
+        n_pairs = n_rows * self.n_trees
+        leaves = np.empty(n_pairs, dtype=np.intp)
+
+        # one entry per (row, tree) pair that has not reached a leaf yet
+        active = np.arange(n_pairs)
+        node = np.tile(self.roots.astype(np.intp), n_rows)
+        row_offset = np.repeat(np.arange(n_rows, dtype=np.intp) * n_features, self.n_trees)
+        X_flat = X.ravel()
+
+        for _ in range(self.max_depth):
+            go_right = X_flat.take(row_offset + self.feature.take(node)) > self.threshold.take(node)
+            next_node = self._children.take(node * 2 + go_right)
+            done = next_node == node
+            if done.any():
+                # drop finished pairs so deeper levels touch fewer elements
+                leaves[active[done]] = node[done]
+                keep = ~done
+                active, node, row_offset = active[keep], next_node[keep], row_offset[keep]
+                if not active.size:
+                    break
+            else:
+                node = next_node
+        leaves[active] = node
+        return leaves.reshape(n_rows, self.n_trees)
+
+    def tree_values(self, X):
+        """Per-tree outputs, shape (n_rows, n_trees, n_outputs)."""
+        return self.value[self.apply(X)]
+
+    def raw_predict(self, X):
+        # accumulate in float64 even when values are stored as float16
+        values = self.tree_values(X).astype(np.float64, copy=False)
+        if self.combine == "sum":
+            return self.init + self.scale * values.sum(axis=1)
+        return values.mean(axis=1)
+
+
+def _as_float_matrix(X):
+    # sklearn trees compare float32 inputs against float64 thresholds;
+    # do the same so results match bit for bit
+    X = np.asarray(X, dtype=np.float32)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    return X.astype(np.float64)
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class FlatModel:
+    """Drop-in replacement for the sklearn estimators used by the apps.
+
+    kind is one of: rf_classifier, rf_regressor, gb_classifier,
+    gb_regressor, voting_classifier, voting_regressor.
+    """
+
+    def __init__(self, kind, ensembles, classes=None, weights=None, n_features=None,
+                 chunk_size=10000):
+        self.kind = kind
+        self.ensembles = ensembles
+        self.classes_ = None if classes is None else np.asarray(classes)
+        self.weights = weights
+        self.n_features_in_ = n_features
+        self.chunk_size = chunk_size
+
+    @property
+    def is_classifier(self):
+        return self.kind.endswith("classifier")
+
+    def _ensemble_output(self, ens, X):
+        raw = ens.raw_predict(X)
+        if self.kind == "gb_classifier" or (self.kind == "voting_classifier" and ens.combine == "sum"):
+            p = _sigmoid(raw[:, 0])
+            return np.column_stack([1 - p, p])
+        if self.is_classifier:
+            return raw
+        return raw[:, 0]
+
+    def _predict_chunk(self, X):
+        outputs = [self._ensemble_output(ens, X) for ens in self.ensembles]
+        if len(outputs) == 1:
+            return outputs[0]
+        return np.average(np.stack(outputs), axis=0, weights=self.weights)
+
+    def _predict_raw(self, X):
+        X = _as_float_matrix(X)
+        if len(X) <= self.chunk_size:
+            return self._predict_chunk(X)
+        return np.concatenate([self._predict_chunk(X[i:i + self.chunk_size])
+                               for i in range(0, len(X), self.chunk_size)])
+
+    def predict_proba(self, X):
+        if not self.is_classifier:
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self._predict_raw(X)
+
+    def predict(self, X):
+        out = self._predict_raw(X)
+        if self.is_classifier:
+            return self.classes_[np.argmax(out, axis=1)]
+        return out
+
+
+class FlatPCA:
+    """PCA.transform without scikit-learn."""
+
+    def __init__(self, mean, components, explained_variance=None, whiten=False):
+        self.mean_ = mean
+        self.components_ = components
+        self.explained_variance_ = explained_variance
+        self.whiten = whiten
+        self.n_features_in_ = components.shape[1]
+
+    def transform(self, X):
+        # same operation order and dtypes as sklearn (float32 fits included)
+        X_t = np.asarray(X, dtype=np.float64) @ self.components_.T - self.mean_ @ self.components_.T
+        if self.whiten:
+            X_t /= np.sqrt(self.explained_variance_)
+        return X_t
+
+
+# ======================= SAVE / LOAD =======================
+_ENSEMBLE_ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+
+
+def to_arrays(model):
+    """Split a FlatModel / FlatPCA into JSON metadata and named arrays."""
+    arrays = {}
+    if isinstance(model, FlatPCA):
+        meta = {"version": FORMAT_VERSION, "kind": "pca", "whiten": bool(model.whiten)}
+        arrays["mean"] = model.mean_
+        arrays["components"] = model.components_
+        if model.explained_variance_ is not None:
+            arrays["explained_variance"] = model.explained_variance_
+        return meta, arrays
+
+    meta = {
+        "version": FORMAT_VERSION,
+        "kind": model.kind,
+        "classes": None if model.classes_ is None else model.classes_.tolist(),
+        "weights": model.weights,
+        "n_features": model.n_features_in_,
+        "ensembles": [],
+    }
+    for i, ens in enumerate(model.ensembles):
+        meta["ensembles"].append({"max_depth": ens.max_depth, "combine": ens.combine,
+                                  "scale": ens.scale, "init": ens.init.tolist()})
+        for name in _ENSEMBLE_ARRAYS:
+            arrays[f"e{i}_{name}"] = getattr(ens, name)
+    return meta, arrays
+
+
+def from_arrays(meta, arrays):
+    """Rebuild a model from to_arrays() output; arrays may be any array-likes
+    (npz members, memory maps, shared-memory views) and are not copied."""
+    if meta["version"] > FORMAT_VERSION:
+        raise ValueError(f"Unsupported flat model version {meta['version']}")
+
+    if meta["kind"] == "pca":
+        ev = arrays["explained_variance"] if "explained_variance" in arrays else None
+        return FlatPCA(arrays["mean"], arrays["components"], ev, meta["whiten"])
+
+    ensembles = []
+    for i, info in enumerate(meta["ensembles"]):
+        fields = {name: arrays[f"e{i}_{name}"] for name in _ENSEMBLE_ARRAYS}
+        ensembles.append(FlatEnsemble(max_depth=info["max_depth"], combine=info["combine"],
+                                      scale=info["scale"], init=info["init"], **fields))
+    return FlatModel(meta["kind"], ensembles, meta["classes"], meta["weights"], meta["n_features"])
+
+
+def save_flat(model, path, compress=False):
+    """Write a FlatModel or FlatPCA to a single .npz file (zlib-compressed
+    when compress is set; compressed files cannot be memory-mapped)."""
+    meta, arrays = to_arrays(model)
+    (np.savez_compressed if compress else np.savez)(path, meta=np.array(json.dumps(meta)), **arrays)
+
+
+def load_flat(path, mmap_mode=None):
+    """Load a model written by save_flat."""
+    data = np.load(path, allow_pickle=False, mmap_mode=mmap_mode)
+    meta = json.loads(str(data["meta"]))
+    try:
+        return from_arrays(meta, {name: data[name] for name in data.files if name != "meta"})
+    except ValueError as e:
+        raise ValueError(f"{e} in {path}") from None
@@ -1,19 +1,48 @@
 import pandas as pd
 import numpy as np
 
-np.random.seed(42)
+from regions import INDIAN_LAT_RANGE, INDIAN_LON_RANGE
 
-rows = 1000
 
-data = {
-    "SST": np.random.uniform(20, 32, rows),
-    "Salinity": np.random.uniform(28, 36, rows),
-    "Dissolved_Oxygen": np.random.uniform(3, 9, rows),
-    "Season": np.random.choice(["Summer", "Winter", "Monsoon"], rows),
-    "Historical_Catch": np.random.uniform(50, 1000, rows),
-}
+def generate_fish(rows=1000, seed=42):
+    """Synthetic model-input rows (SST, Salinity, DO, Season, Historical_Catch)."""
+    np.random.seed(seed)
+    data = {
+        "SST": np.random.uniform(20, 32, rows),
+        "Salinity": np.random.uniform(28, 36, rows),
+        "Dissolved_Oxygen": np.random.uniform(3, 9, rows),
+        "Season": np.random.choice(["Summer", "Winter", "Monsoon"], rows),
+        "Historical_Catch": np.random.uniform(50, 1000, rows),
+    }
+    return pd.DataFrame(data)
 
-df = pd.DataFrame(data)
-df.to_csv("../data/fish_dataset.csv", index=False)
 
-print("Dataset generated successfully!")
+def generate_sst(rows=1_000_000, months=120, seed=42):
+    """Synthetic indian_sst-shaped data (time, lat, lon, sst), yielded one month
+    at a time. The grid step over the Indian EEZ window is chosen so that the
+    total is roughly `rows` rows; used to benchmark the preprocessing chain."""
+    rng = np.random.default_rng(seed)
+    lat_lo, lat_hi = sorted(INDIAN_LAT_RANGE)
+    lon_lo, lon_hi = sorted(INDIAN_LON_RANGE)
+    step = np.sqrt((lat_hi - lat_lo) * (lon_hi - lon_lo) * months / rows)
+    lats = np.arange(lat_lo, lat_hi, step, dtype=np.float32)
+    lons = np.arange(lon_lo, lon_hi, step, dtype=np.float32)
+    lat_grid, lon_grid = np.meshgrid(lats, lons, indexing="ij")
+    base = 30 - 0.15 * (lat_grid - lat_lo)
+
+    for time in pd.date_range("2000-01-01", periods=months, freq="MS"):
+        seasonal = 1.5 * np.sin(2 * np.pi * (time.month - 3) / 12)
+        sst = base + seasonal + rng.normal(0, 0.3, base.shape)
+        yield pd.DataFrame({
+            "time": time,
+            "lat": lat_grid.ravel(),
+            "lon": lon_grid.ravel(),
+            "sst": sst.ravel().astype(np.float32),
+        })
+
+
+if __name__ == "__main__":
+    df = generate_fish(1000)
+    df.to_csv("../data/fish_dataset.csv", index=False)
+
+    print("Dataset generated successfully!")
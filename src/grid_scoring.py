@@ -0,0 +1,171 @@
+# src/grid_scoring.py
+# Batched grid scoring for the map heatmap: builds the whole feature matrix
+# with NumPy and makes one call per model instead of one call per point.
+import numpy as np
+import pandas as pd
+
+import instrumentation
+import uncertainty
+from features import feature_matrix
+
+
+def make_latlon_grid(center_lat, center_lon, radius_km, n):
+    """Return flattened (lats, lons) arrays for an n x n grid around the center."""
+    # approximate degrees per km (valid for small regions) ~ 1 deg lat ~ 111 km
+    deg = radius_km / 111.0
+    lats = np.linspace(center_lat - deg, center_lat + deg, n)
+    lons = np.linspace(center_lon - deg, center_lon + deg, n)
+    # indexing="ij" keeps the same row order as the old nested lat/lon loop
+    lat_grid, lon_grid = np.meshgrid(lats, lons, indexing="ij")
+    return lat_grid.ravel(), lon_grid.ravel()
+
+
+# Fixed origin of the synthetic fields (Indian EEZ midpoint). The fields
+# depend only on the coordinates, so a cell gets the same inputs whether it
+# is scored around the user's point or in the precomputed tiles.
+SYNTHETIC_ORIGIN = (15.0, 77.5)
+
+
+def synthetic_environment(lats, lons):
+    """Synthetic SST / Salinity / DO / History fields for every grid point.
+
+    Replace this with real environmental raster or API values.
+    """
+    lat0, lon0 = SYNTHETIC_ORIGIN
+    sst = 27.5 + (lats - lat0) * 0.1 + (lons - lon0) * 0.05
+    sal = 34.0 + (lats - lat0) * 0.02
+    do = 6.0 - np.abs(lats - lat0) * 0.05
+    history = 400 + (np.sin(lats * 3.14 / 180) * 50)  # synthetic past catch proxy
+    return sst, sal, do, history
+
+
+def _availability_prob(clf, X):
+    try:
+        return uncertainty.class_column(clf, clf.predict_proba(X), 1)
+    except Exception:
+        return clf.predict(X).astype(float)
+
+
+def _juvenile_prob(j_model, X):
+    """(risk probability, predicted label) for every row."""
+    try:
+        probs = j_model.predict_proba(X)
+        labels = np.asarray(j_model.classes_)[np.argmax(probs, axis=1)]
+        # classes_ are sorted by name (High, Low, Medium), so look the column up
+        return uncertainty.class_column(j_model, probs, "High"), labels
+    except Exception:
+        # If juvenile model outputs label, map it
+        labels = j_model.predict(X)
+        mapping = {"Low": 0.1, "Medium": 0.5, "High": 0.9}
+        return np.array([mapping.get(lab, 0.5) for lab in labels]), labels
+
+
+def _quantity(reg, X):
+    try:
+        return reg.predict(X).astype(float)
+    except Exception:
+        return np.zeros(len(X))
+
+
+def _scores_with_uncertainty(clf, reg, j_model, main_X, juv_X):
+    """Like the three calls above, but from the per-tree outputs of the
+    forests: also the quantity interval and the share of trees agreeing
+    with the availability and juvenile-risk decisions. Models without
+    independent trees fall back to their plain predictions."""
+    with instrumentation.span("predict", model="availability"):
+        try:
+            avail = uncertainty.class_probabilities(clf, main_X)
+            avail_prob, avail_agree = avail["1"].to_numpy(), avail["agreement"].to_numpy()
+        except ValueError:
+            avail_prob = _availability_prob(clf, main_X)
+            avail_agree = np.maximum(avail_prob, 1 - avail_prob)
+    with instrumentation.span("predict", model="juvenile"):
+        try:
+            juv = uncertainty.class_probabilities(j_model, juv_X)
+            juv_prob, juv_label = juv["High"].to_numpy(), juv["label"].to_numpy()
+            juv_agree = juv["agreement"].to_numpy()
+        except ValueError:
+            juv_prob, juv_label = _juvenile_prob(j_model, juv_X)
+            juv_agree = np.ones(len(juv_X))
+    with instrumentation.span("predict", model="quantity"):
+        try:
+            interval = uncertainty.quantity_interval(reg, main_X)
+            qty, qty_low, qty_high = (interval[c].to_numpy() for c in ("mean", "lower", "upper"))
+        except ValueError:
+            qty = qty_low = qty_high = _quantity(reg, main_X)
+    return avail_prob, juv_prob, juv_label, qty, qty_low, qty_high, np.minimum(avail_agree, juv_agree)
+
+
+def compute_scores(clf, reg, j_model, lats, lons, chunk_size=None,
+                   sst_lookup=None, rules=None, with_uncertainty=False):
+    """Score every (lat, lon) point with one predict call per model.
+
+    chunk_size caps how many rows are handed to the models at once, so very
+    large grids do not have to hold every intermediate array in memory.
+    sst_lookup, if given, maps (lats, lons) arrays to real SST values (NaN
+    where unknown, which falls back to the synthetic field).
+    rules, if given, is a rules.RuleEngine applied to the whole grid: an
+    availability column (0/1 after the rules) is added, qty becomes the
+    post-rule quantity and the per-rule firing counts are stored in
+    df.attrs["rules_fired"].
+    with_uncertainty adds qty_low / qty_high (90% interval of the trees)
+    and confidence (smallest share of trees agreeing with the availability
+    and juvenile-risk decisions), from the same single pass over the trees.
+    Returns a DataFrame with columns lat, lon, avail_prob, juv_prob, qty.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    n = len(lats)
+    with instrumentation.span("featurize", pipeline="grid"):
+        sst, sal, do, history = synthetic_environment(lats, lons)
+        if sst_lookup is not None:
+            real_sst = sst_lookup(lats, lons)
+            sst = np.where(np.isnan(real_sst), sst, real_sst)
+
+        fields = {"SST": sst, "Salinity": sal, "Dissolved_Oxygen": do, "Historical_Catch": history}
+        # column order and juvenile inputs (SST, Salinity, History) come from features.py
+        main_feat = feature_matrix(fields, "availability")
+        juv_feat = feature_matrix(fields, "juvenile")
+
+    avail_prob = np.empty(n)
+    juv_prob = np.empty(n)
+    juv_label = np.empty(n, dtype=object)
+    qty = np.empty(n)
+    if with_uncertainty:
+        qty_low, qty_high, confidence = np.empty(n), np.empty(n), np.empty(n)
+
+    step = chunk_size or max(n, 1)
+    for start in range(0, n, step):
+        sl = slice(start, start + step)
+        if with_uncertainty:
+            (avail_prob[sl], juv_prob[sl], juv_label[sl], qty[sl], qty_low[sl], qty_high[sl],
+             confidence[sl]) = _scores_with_uncertainty(clf, reg, j_model, main_feat[sl], juv_feat[sl])
+            continue
+        with instrumentation.span("predict", model="availability"):
+            avail_prob[sl] = _availability_prob(clf, main_feat[sl])
+        with instrumentation.span("predict", model="juvenile"):
+            juv_prob[sl], juv_label[sl] = _juvenile_prob(j_model, juv_feat[sl])
+        with instrumentation.span("predict", model="quantity"):
+            qty[sl] = _quantity(reg, main_feat[sl])
+    instrumentation.incr("predictions", n, pipeline="grid")
+
+    df = pd.DataFrame({
+        "lat": lats, "lon": lons,
+        "avail_prob": avail_prob,
+        "juv_prob": juv_prob,
+        "qty": qty,
+    })
+    if with_uncertainty:
+        df["qty_low"] = qty_low
+        df["qty_high"] = qty_high
+        df["confidence"] = confidence
+    if rules is not None:
+        inputs = pd.DataFrame(fields)
+        preds = pd.DataFrame({"availability": (avail_prob > 0.5).astype(int), "quantity": qty,
+                              "juvenile_risk": juv_label})
+        with instrumentation.span("rules"):
+            decided, fired = rules.evaluate(inputs, preds)
+        df["availability"] = decided["availability"].to_numpy()
+        df["qty"] = decided["quantity"].to_numpy()
+        df.attrs["rules_fired"] = fired
+    return df
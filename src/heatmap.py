@@ -1,15 +1,42 @@
-import seaborn as sns
-import matplotlib.pyplot as plt
-import numpy as np
-
-# Generate dummy juvenile density heatmap values
-data = np.random.rand(10, 10)
-
-try:
-    plt.figure(figsize=(6, 5))
-    sns.heatmap(data, cmap="YlGnBu")
-    plt.title("Juvenile Density Heatmap Example")
-    plt.show(block=False)
-    input("Press ENTER to close heatmap window...")
-except KeyboardInterrupt:
-    plt.close()
+# src/heatmap.py
+# Render one score layer of a grid around a point to a PNG file, with the
+# same server-side rasterizer as the map app (raster_overlay.py). Prints the
+# lat/lon bounds to place the image with.
+#
+#   python src/heatmap.py --lat 15 --lon 83 --radius-km 25 --grid 80 --value juv_prob --out heatmap.png
+import argparse
+
+import model_registry
+import raster_overlay
+from grid_scoring import compute_scores, make_latlon_grid
+
+# colormap and value range per score column (None = range of the data)
+LAYERS = {
+    "juv_prob": ("YlOrRd", 0.0, 1.0),
+    "avail_prob": ("YlGnBu", 0.0, 1.0),
+    "qty": ("Greens", None, None),
+    "confidence": ("YlGnBu", 0.0, 1.0),
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render a heatmap of grid scores to a PNG file")
+    parser.add_argument("--lat", type=float, default=15.0)
+    parser.add_argument("--lon", type=float, default=83.0)
+    parser.add_argument("--radius-km", type=float, default=25.0)
+    parser.add_argument("--grid", type=int, default=80, help="points per side")
+    parser.add_argument("--value", choices=sorted(LAYERS), default="juv_prob")
+    parser.add_argument("--size", type=int, default=raster_overlay.IMAGE_SIZE, help="image side in pixels")
+    parser.add_argument("--out", default="heatmap.png")
+    args = parser.parse_args()
+
+    lats, lons = make_latlon_grid(args.lat, args.lon, args.radius_km, args.grid)
+    df = compute_scores(model_registry.load_model("availability"), model_registry.load_model("quantity"),
+                        model_registry.load_model("juvenile"), lats, lons,
+                        chunk_size=4096, with_uncertainty=args.value == "confidence")
+
+    cmap, vmin, vmax = LAYERS[args.value]
+    png, bounds = raster_overlay.render(df, args.value, cmap, vmin, vmax, opacity=1.0, size=args.size)
+    with open(args.out, "wb") as f:
+        f.write(png)
+    print(f"✅ {args.value} heatmap ({len(df)} points) saved to {args.out}")
+    print("📍 Bounds [[south, west], [north, east]]:", [[round(v, 5) for v in corner] for corner in bounds])
@@ -0,0 +1,241 @@
+# src/instrumentation.py
+# Lightweight timing spans, counters and gauges for the hot paths (model loading,
+# featurizing, per-model predict, rules, rendering), shared by the Streamlit
+# apps, the CLI and the HTTP server.
+#
+#   with instrumentation.span("predict", model="availability"):
+#       clf.predict(X)
+#   instrumentation.incr("predictions", len(X))
+#
+# Stats live in this process and can be shown in a "Performance" panel or
+# exported as Prometheus text / JSON lines. Set FISH_TRACE_FILE to also
+# append every span to a JSONL file as it finishes.
+import io
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# recent durations kept per span for the percentiles
+RESERVOIR_SIZE = 1024
+TRACE_FILE = os.environ.get("FISH_TRACE_FILE")
+
+_lock = threading.Lock()
+_spans = {}
+_counters = {}
+_gauges = {}
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class _SpanStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=RESERVOIR_SIZE)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+
+def record(name, seconds, **labels):
+    """Record one duration for span `name`."""
+    key = _key(name, labels)
+    with _lock:
+        stats = _spans.get(key)
+        if stats is None:
+            stats = _spans[key] = _SpanStats()
+        stats.add(seconds)
+    if TRACE_FILE:
+        event = {"ts": time.time(), "span": name, "seconds": seconds, **{k: str(v) for k, v in labels.items()}}
+        with _lock, open(TRACE_FILE, "a") as f:
+            f.write(json.dumps(event) + "\n")
+
+
+@contextmanager
+def span(name, **labels):
+    """Time the enclosed block as span `name` (labels e.g. model="quantity")."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start, **labels)
+
+
+def incr(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def gauge(name, value, **labels):
+    """Set the current value of gauge `name` (e.g. a queue depth)."""
+    key = _key(name, labels)
+    with _lock:
+        _gauges[key] = value
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+        _gauges.clear()
+
+
+# ======================= VIEWS / EXPORT =======================
+def span_table():
+    """One dict per (span, labels): count, total and mean/p50/p99/max in ms."""
+    with _lock:
+        items = [(k, s.count, s.total, s.max, np.array(s.recent)) for k, s in _spans.items()]
+    rows = []
+    for (name, labels), count, total, peak, recent in sorted(items):
+        rows.append({
+            "span": name,
+            "labels": ",".join(f"{k}={v}" for k, v in labels),
+            "count": count,
+            "total_s": total,
+            "mean_ms": total / count * 1000,
+            "p50_ms": float(np.percentile(recent, 50) * 1000),
+            "p99_ms": float(np.percentile(recent, 99) * 1000),
+            "max_ms": peak * 1000,
+        })
+    return rows
+
+
+def counter_table():
+    with _lock:
+        items = sorted(_counters.items())
+    return [{"counter": name, "labels": ",".join(f"{k}={v}" for k, v in labels), "value": value}
+            for (name, labels), value in items]
+
+
+def gauge_table():
+    with _lock:
+        items = sorted(_gauges.items())
+    return [{"gauge": name, "labels": ",".join(f"{k}={v}" for k, v in labels), "value": value}
+            for (name, labels), value in items]
+
+
+def _prom_escape(value):
+    # label values escape backslash, double quote and newline (text format 0.0.4)
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _prom_labels(labels, **extra):
+    pairs = list(labels) + sorted(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_prom_escape(v)}"' for k, v in pairs) + "}"
+
+
+def to_prometheus(prefix="fish"):
+    """Prometheus text exposition: spans as summaries, counters as counters."""
+    with _lock:
+        spans = [(k, s.count, s.total, np.array(s.recent)) for k, s in sorted(_spans.items())]
+        counters = sorted(_counters.items())
+        gauges = sorted(_gauges.items())
+    lines = []
+    seen = set()
+    for (name, labels), count, total, recent in spans:
+        metric = f"{prefix}_{name}_seconds"
+        if metric not in seen:
+            lines.append(f"# TYPE {metric} summary")
+            seen.add(metric)
+        for q in (0.5, 0.99):
+            lines.append(f"{metric}{_prom_labels(labels, quantile=q)} {np.percentile(recent, q * 100):.6g}")
+        lines.append(f"{metric}_sum{_prom_labels(labels)} {total:.6g}")
+        lines.append(f"{metric}_count{_prom_labels(labels)} {count}")
+    for (name, labels), value in counters:
+        metric = f"{prefix}_{name}_total"
+        if metric not in seen:
+            lines.append(f"# TYPE {metric} counter")
+            seen.add(metric)
+        lines.append(f"{metric}{_prom_labels(labels)} {value}")
+    for (name, labels), value in gauges:
+        metric = f"{prefix}_{name}"
+        if metric not in seen:
+            lines.append(f"# TYPE {metric} gauge")
+            seen.add(metric)
+        lines.append(f"{metric}{_prom_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def to_jsonl():
+    """Current span and counter stats, one JSON object per line."""
+    out = io.StringIO()
+    for row in span_table():
+        out.write(json.dumps({"type": "span", **row}) + "\n")
+    for row in counter_table():
+        out.write(json.dumps({"type": "counter", **row}) + "\n")
+    for row in gauge_table():
+        out.write(json.dumps({"type": "gauge", **row}) + "\n")
+    return out.getvalue()
+
+
+# ======================= PROFILING =======================
+class Profiler:
+    """Whole-run profiler: pyinstrument when installed, else cProfile."""
+
+    def __init__(self):
+        try:
+            from pyinstrument import Profiler as _Pyinstrument
+            self.kind = "pyinstrument"
+            self._profiler = _Pyinstrument()
+        except ImportError:
+            import cProfile
+            self.kind = "cProfile"
+            self._profiler = cProfile.Profile()
+
+    def start(self):
+        if self.kind == "pyinstrument":
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+        return self
+
+    def stop(self, limit=40):
+        """Stop and return the report as text."""
+        if self.kind == "pyinstrument":
+            self._profiler.stop()
+            return self._profiler.output_text(unicode=True)
+        import pstats
+        self._profiler.disable()
+        text = io.StringIO()
+        pstats.Stats(self._profiler, stream=text).sort_stats("cumulative").print_stats(limit)
+        return text.getvalue()
+
+
+# ======================= STREAMLIT PANEL =======================
+def performance_panel(profile_report=None):
+    """Collapsible "Performance" panel for the Streamlit apps."""
+    import pandas as pd
+    import streamlit as st
+
+    with st.expander("Performance"):
+        spans = span_table()
+        if spans:
+            st.dataframe(pd.DataFrame(spans))
+        else:
+            st.write("No spans recorded yet.")
+        counters = counter_table()
+        if counters:
+            st.dataframe(pd.DataFrame(counters))
+        gauges = gauge_table()
+        if gauges:
+            st.dataframe(pd.DataFrame(gauges))
+        st.checkbox("Profile next run", key="perf_profile")
+        if profile_report:
+            st.code(profile_report)
+        col1, col2 = st.columns(2)
+        col1.download_button("Prometheus text", to_prometheus(), file_name="metrics.prom")
+        col2.download_button("JSON lines", to_jsonl(), file_name="metrics.jsonl")
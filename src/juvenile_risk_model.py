@@ -5,6 +5,9 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score
 import joblib
 
+import model_registry
+from features import JUVENILE_FEATURES, juvenile_risk_from_catch
+
 np.random.seed(42)
 
 rows = 1000
@@ -17,19 +20,11 @@ data = {
 
 df = pd.DataFrame(data)
 
-# Create synthetic labels for juvenile risk
-conditions = [
-    (df["Historical_Catch"] < 250),
-    (df["Historical_Catch"] >= 250) & (df["Historical_Catch"] <= 600),
-    (df["Historical_Catch"] > 600)
-]
-
-labels = ["High", "Medium", "Low"]  # Label order based on fishing risk
-
-df["Juvenile_Risk"] = np.select(conditions, labels, default="Medium")
+# Create synthetic labels for juvenile risk (High < 250 kg <= Medium <= 600 kg < Low)
+df["Juvenile_Risk"] = juvenile_risk_from_catch(df["Historical_Catch"])
 
 
-X = df[["SST", "Salinity", "Historical_Catch"]]
+X = df[JUVENILE_FEATURES]
 y = df["Juvenile_Risk"]
 
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -40,5 +35,5 @@ model.fit(X_train, y_train)
 pred = model.predict(X_test)
 print("Juvenile Risk Accuracy:", accuracy_score(y_test, pred))
 
-joblib.dump(model, "../models/juvenile_model.pkl")
+joblib.dump(model, model_registry.artifact_path("juvenile"))
 print("Juvenile Risk Model saved successfully!")
@@ -0,0 +1,165 @@
+# src/live_sst_client.py
+# Asyncio client for live SST from the Open-Meteo marine API.
+#
+# - points are snapped to the provider grid and de-duplicated, so a 30x30
+#   heatmap grid turns into a handful of grid cells
+# - cells are requested with the multi-location form of the API
+#   (latitude=a,b,c&longitude=x,y,z), several cells per HTTP call
+# - requests run with bounded concurrency over a pooled, retrying session
+# - results are kept in an on-disk TTL cache keyed by (cell, date)
+# - the HTTP transport is pluggable (tests run against a local fake server)
+import asyncio
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import data_store
+import instrumentation
+
+log = logging.getLogger(__name__)
+
+MARINE_API_URL = "https://marine-api.open-meteo.com/v1/marine"
+CACHE_PATH = os.path.join(data_store.DATA_DIR, "live_sst_cache.sqlite")
+
+
+# ======================= TRANSPORTS =======================
+class RequestsTransport:
+    """Pooled requests.Session with retries; blocking calls run in worker threads."""
+
+    def __init__(self, pool_size=8, timeout=10, retries=3):
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    async def get_json(self, url, params):
+        def fetch():
+            r = self.session.get(url, params=params, timeout=self.timeout)
+            r.raise_for_status()
+            return r.json()
+        return await asyncio.to_thread(fetch)
+
+    def close(self):
+        self.session.close()
+
+
+# ======================= CACHE =======================
+class SSTDiskCache:
+    """sqlite-backed TTL cache: (lat, lon, date) -> SST (None = no data)."""
+
+    def __init__(self, path=CACHE_PATH, ttl_seconds=6 * 3600):
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS sst (lat REAL, lon REAL, day TEXT, value REAL, "
+                         "stored REAL, PRIMARY KEY (lat, lon, day))")
+        self._lock = threading.Lock()
+
+    def get_many(self, cells, day):
+        found = {}
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            for lat, lon in cells:
+                row = self._db.execute("SELECT value, stored FROM sst WHERE lat=? AND lon=? AND day=?",
+                                       (lat, lon, day)).fetchone()
+                if row is not None and row[1] >= cutoff:
+                    found[(lat, lon)] = row[0]
+        return found
+
+    def put_many(self, values, day):
+        now = time.time()
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO sst VALUES (?, ?, ?, ?, ?)",
+                                 [(lat, lon, day, v, now) for (lat, lon), v in values.items()])
+            self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+
+# ======================= CLIENT =======================
+class LiveSSTClient:
+    def __init__(self, transport=None, cache=None, url=MARINE_API_URL, grid_step=0.25,
+                 max_concurrency=4, locations_per_request=50):
+        self.transport = transport or RequestsTransport(pool_size=max_concurrency)
+        self.cache = cache
+        self.url = url
+        self.grid_step = grid_step
+        self.max_concurrency = max_concurrency
+        self.locations_per_request = locations_per_request
+        self.http_calls = 0
+
+    def snap(self, lats, lons):
+        """Snap coordinates to the provider grid (cell centres)."""
+        step = self.grid_step
+        return (np.round(np.asarray(lats, dtype=float) / step) * step).round(4), \
+               (np.round(np.asarray(lons, dtype=float) / step) * step).round(4)
+
+    async def _fetch_batch(self, cells, day, semaphore):
+        params = {
+            "latitude": ",".join(f"{lat:g}" for lat, _ in cells),
+            "longitude": ",".join(f"{lon:g}" for _, lon in cells),
+            "daily": "sea_surface_temperature_mean",
+            "start_date": day,
+            "end_date": day,
+            "timezone": "auto",
+        }
+        async with semaphore:
+            self.http_calls += 1
+            data = await self.transport.get_json(self.url, params)
+        # one location -> object, several -> list of objects
+        items = data if isinstance(data, list) else [data]
+        values = {}
+        for cell, item in zip(cells, items):
+            try:
+                v = item["daily"]["sea_surface_temperature_mean"][0]
+            except (KeyError, IndexError, TypeError):
+                v = None
+            values[cell] = None if v is None else float(v)
+        return values
+
+    async def fetch(self, lats, lons, date=None):
+        """SST for every (lat, lon) as a float array (NaN where unavailable)."""
+        day = (date or datetime.date.today()).isoformat()
+        snapped_lat, snapped_lon = self.snap(lats, lons)
+        cells = sorted(set(zip(snapped_lat.tolist(), snapped_lon.tolist())))
+
+        values = self.cache.get_many(cells, day) if self.cache is not None else {}
+        missing = [c for c in cells if c not in values]
+        if missing:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            n = self.locations_per_request
+            batches = [missing[i:i + n] for i in range(0, len(missing), n)]
+            results = await asyncio.gather(*(self._fetch_batch(b, day, semaphore) for b in batches),
+                                           return_exceptions=True)
+            fetched = {}
+            for batch, result in zip(batches, results):
+                if isinstance(result, Exception):
+                    # failed batches stay NaN and are retried next time
+                    log.warning("Live SST request for %d cells failed: %r", len(batch), result)
+                    instrumentation.incr("live_sst_failed_batches")
+                    instrumentation.incr("live_sst_failed_cells", len(batch))
+                    continue
+                fetched.update(result)
+            if self.cache is not None and fetched:
+                self.cache.put_many(fetched, day)
+            values.update(fetched)
+
+        out = np.array([values.get(c, None) for c in zip(snapped_lat.tolist(), snapped_lon.tolist())],
+                       dtype=float)
+        return out
+
+    def get_sst(self, lats, lons, date=None):
+        """Blocking wrapper around fetch() for scripts and Streamlit."""
+        return asyncio.run(self.fetch(lats, lons, date))
+
@@ -1,10 +1,16 @@
-import joblib
-import numpy as np
+from prediction_service import predict_one
+from relocation import SafeZoneIndex, advise_move
+from risk_tiles import TileStore
+
+RELOCATION_MAX_KM = 30
+
+
+def relocation_advice(fallback):
+    # nearest safe zone from the precomputed risk tiles when a position is given
+    if position is None or not TileStore.available():
+        return fallback
+    return advise_move(SafeZoneIndex.from_tiles(TileStore()), *position, max_km=RELOCATION_MAX_KM)
 
-# Load Models
-clf = joblib.load("../models/availability_model.pkl")
-reg = joblib.load("../models/quantity_model.pkl")
-j_model = joblib.load("../models/juvenile_model.pkl")
 
 print("---- AI-Driven Fish Catch Prediction System ----")
 
@@ -13,17 +19,14 @@ SST = float(input("Enter Sea Surface Temperature (°C): "))
 Salinity = float(input("Enter Salinity (PSU): "))
 DO = float(input("Enter Dissolved Oxygen (mg/l): "))
 History = float(input("Enter Previous Average Catch (kg): "))
+position = input("Enter Latitude, Longitude (optional, e.g. 15.2, 83.1): ").strip()
+position = tuple(float(v) for v in position.split(",")) if position else None
 
-# Main model features
-features = np.array([[SST, Salinity, DO, History]])
-
-# Juvenile model uses only 3 features
-juvenile_features = np.array([[SST, Salinity, DO]])
-
-# Predictions
-availability = clf.predict(features)[0]
-quantity = reg.predict(features)[0]
-juvenile_risk = j_model.predict(juvenile_features)[0]
+# Predictions (juvenile model uses SST, Salinity and History), followed by
+# the same hybrid decision rules as the app (rules.py)
+availability, quantity, juvenile_risk = predict_one(
+    "default", rules=True,
+    SST=SST, Salinity=Salinity, Dissolved_Oxygen=DO, Historical_Catch=History)
 
 print("\n---------- FINAL RESULT ----------")
 print("Juvenile Risk Level:", juvenile_risk)
@@ -31,10 +34,11 @@ print("Juvenile Risk Level:", juvenile_risk)
 # Decision Engine
 if juvenile_risk == "High":
     print("⚠️ High Juvenile Density Detected — Fishing Not Recommended!")
-    print("➡ Suggested shift: Move 8–15 km from the current location.")
+    print("➡", relocation_advice("Suggested shift: Move 8–15 km from the current location."))
 else:
     if availability == 1:
         print("Fish Availability: YES 🟢")
         print(f"Predicted Catch Quantity: {quantity:.2f} kg")
     else:
         print("Fish Availability: NO 🔴")
+        print("➡", relocation_advice("Try shifting to nearby zones (5–10 km)."))
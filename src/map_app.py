@@ -1,16 +1,36 @@
 # src/map_app.py
 import streamlit as st
 import numpy as np
-import pandas as pd
-import joblib
 import folium
-from folium.plugins import HeatMap
 from streamlit_folium import st_folium
-
-# Load models (adjust filenames if different)
-clf = joblib.load("models/availability_model.pkl")
-reg = joblib.load("models/quantity_model.pkl")
-j_model = joblib.load("models/juvenile_model.pkl")
+from grid_scoring import make_latlon_grid, compute_scores
+import model_registry
+from sst_raster import SSTRaster
+from climatology import SSTClimatology
+from live_sst_client import LiveSSTClient, SSTDiskCache
+from risk_tiles import TileStore
+import rules
+from relocation import SafeZoneIndex
+import instrumentation
+import raster_overlay
+
+# Profile this whole run if requested in the Performance panel (one run only)
+profiler = instrumentation.Profiler().start() if st.session_state.pop("perf_profile", False) else None
+
+# Load models through the shared registry (cached once per process)
+clf = model_registry.load_model("availability")
+reg = model_registry.load_model("quantity")
+j_model = model_registry.load_model("juvenile")
+
+# Heatmap layers: score column, colormap, value range (None = range of the data)
+HEAT_LAYERS = {
+    "juvenile_risk_probability": ("juv_prob", "YlOrRd", (0.0, 1.0)),
+    "availability_prob": ("avail_prob", "YlGnBu", (0.0, 1.0)),
+    "predicted_quantity": ("qty", "Greens", None),
+    "prediction_confidence": ("confidence", "YlGnBu", (0.0, 1.0)),
+    "sst_anomaly": ("sst_anomaly", "RdBu_r", None),
+    "sst_rolling_mean": ("sst_rolling_mean", "YlOrRd", None),
+}
 
 st.set_page_config(page_title="Fish Map Heatmap", layout="wide")
 st.title("Live Map Heatmap Overlay — Fish Prediction & Juvenile Risk")
@@ -22,106 +42,124 @@ with st.sidebar:
     center_lon = st.number_input("Center Longitude", value=83.0, format="%.6f")
     radius_km = st.slider("Radius (km)", min_value=5, max_value=100, value=25)
     grid_res = st.slider("Grid resolution (points per side)", min_value=10, max_value=80, value=30)
-    heat_type = st.selectbox("Heatmap Value", ["juvenile_risk_probability", "availability_prob", "predicted_quantity"])
+    use_real_sst = st.checkbox("Use real SST (latest month)", value=SSTRaster.available())
+    use_live_sst = st.checkbox("Use live SST (Open-Meteo)", value=False)
+    use_tiles = st.checkbox("Use precomputed tiles", value=TileStore.available(),
+                            help="Slice scores from risk_tiles.py output instead of running the models "
+                                 "(SST options above are ignored; not used for the confidence layer)")
+    use_rules = st.checkbox("Apply decision rules", value=True,
+                            help="Same hybrid rules as the prediction app (not applied to precomputed tiles)")
+    min_confidence = st.slider("Min confidence for recommended points", min_value=0.0, max_value=1.0, value=0.0,
+                               help="Share of the forest's trees that must agree with the availability and "
+                                    "juvenile-risk decisions (above 0, scores are computed on the fly)")
+    heat_options = ["juvenile_risk_probability", "availability_prob", "predicted_quantity",
+                    "prediction_confidence"]
+    if SSTClimatology.available():
+        # SST history layers from the climatology cube (latest month)
+        heat_options += ["sst_anomaly", "sst_rolling_mean"]
+    heat_type = st.selectbox("Heatmap Value", heat_options)
     run_btn = st.button("Generate Heatmap")
 
-def make_latlon_grid(center_lat, center_lon, radius_km, n):
-    # approximate degrees per km (valid for small regions) ~ 1 deg lat ~ 111 km
+@st.cache_resource
+def load_sst_raster():
+    # Memory-mapped SST raster (built by sst_raster.py); lookups read only touched pages
+    return SSTRaster() if SSTRaster.available() else None
+
+@st.cache_resource
+def load_climatology():
+    return SSTClimatology.load() if SSTClimatology.available() else None
+
+@st.cache_resource
+def get_live_sst_client():
+    # one pooled client + on-disk cache shared by all sessions
+    return LiveSSTClient(cache=SSTDiskCache())
+
+@st.cache_resource
+def get_tile_store():
+    return TileStore() if TileStore.available() else None
+
+def tile_scores(center_lat, center_lon, radius_km, grid_res):
+    # precomputed window for the same area as make_latlon_grid, or None;
+    # tiles carry no per-tree confidence, so confidence needs on-the-fly scores
+    if heat_type == "prediction_confidence" or min_confidence > 0:
+        return None
+    store = get_tile_store() if use_tiles else None
     deg = radius_km / 111.0
-    lat_min = center_lat - deg
-    lat_max = center_lat + deg
-    lon_min = center_lon - deg
-    lon_max = center_lon + deg
-    lats = np.linspace(lat_min, lat_max, n)
-    lons = np.linspace(lon_min, lon_max, n)
-    points = []
-    for la in lats:
-        for lo in lons:
-            points.append((la, lo))
-    return points
-
-def compute_scores(points):
-    # Build feature arrays for the models.
-    # Here: we need SST, Salinity, DO, History for availability/quantity models.
-    # Without real environmental values, use reasonable defaults or synthetic variation.
-    scores = []
-    for (lat, lon) in points:
-        # Simple synthetic environmental variation for demo:
-        # (Replace this with real environmental raster or API values)
-        sst = 27.5 + (lat - center_lat) * 0.1 + (lon - center_lon) * 0.05
-        sal = 34.0 + (lat - center_lat) * 0.02
-        do = 6.0 - abs(lat - center_lat) * 0.05
-        history = 400 + (np.sin(lat*3.14/180)*50)  # synthetic past catch proxy
-
-        main_feat = np.array([[sst, sal, do, history]])
-        juv_feat = np.array([[sst, sal, do]])
-
-        # availability probability (if classifier supports predict_proba)
-        try:
-            avail_prob = float(clf.predict_proba(main_feat)[0,1])
-        except Exception:
-            avail_prob = float(clf.predict(main_feat)[0])
-
-        # juvenile risk probability (we can convert class to numeric)
-        try:
-            # if juvenile model has predict_proba -> use probability of "High"
-            probs = j_model.predict_proba(juv_feat)
-            # find index of 'High' if label encoder used; otherwise assume order
-            # fallback: average probability of non-Low classes
-            if probs.shape[1] == 3:
-                juv_prob = float(probs[0, 0])  # may need mapping depending on training
-            else:
-                juv_prob = float(probs[0].max())
-        except Exception:
-            # If juvenile model outputs label, map it
-            lab = j_model.predict(juv_feat)[0]
-            juv_prob = {"Low": 0.1, "Medium": 0.5, "High": 0.9}.get(lab, 0.5)
-
-        # predicted quantity
-        try:
-            qty = float(reg.predict(main_feat)[0])
-        except Exception:
-            qty = 0.0
-
-        scores.append({
-            "lat": lat, "lon": lon,
-            "avail_prob": avail_prob,
-            "juv_prob": juv_prob,
-            "qty": qty
-        })
-    return pd.DataFrame(scores)
+    window = (center_lat - deg, center_lat + deg, center_lon - deg, center_lon + deg)
+    if store is None or not store.covers(*window):
+        return None
+    # no zoom level as fine as the requested grid -> score on the fly
+    zoom = store.pick_zoom(2 * deg / max(grid_res - 1, 1))
+    if zoom is None:
+        return None
+    with instrumentation.span("tiles", zoom=zoom):
+        df = store.window(*window, zoom)
+    return df if len(df) else None
 
 if run_btn:
-    with st.spinner("Computing grid scores (this may take a few seconds)..."):
-        points = make_latlon_grid(center_lat, center_lon, radius_km, grid_res)
-        df = compute_scores(points)
+    df = tile_scores(center_lat, center_lon, radius_km, grid_res)
+    if df is not None:
+        st.caption("Scores sliced from precomputed tiles")
+    else:
+        with st.spinner("Computing grid scores..."):
+            sst_raster = load_sst_raster() if use_real_sst else None
+            sst_lookup = sst_raster.bilinear if sst_raster is not None else None
+            if sst_raster is not None and not sst_raster.layer().contains([center_lat], [center_lon])[0]:
+                st.warning("The map centre is outside the SST raster; the synthetic SST field is used there.")
+            if use_live_sst:
+                # live values win; cells without live data fall back to the monthly grid / synthetic field
+                live = get_live_sst_client()
+                monthly = sst_lookup
+                def sst_lookup(la, lo):
+                    values = live.get_sst(la, lo)
+                    if monthly is not None:
+                        values = np.where(np.isnan(values), monthly(la, lo), values)
+                    return values
+            lats, lons = make_latlon_grid(center_lat, center_lon, radius_km, grid_res)
+            df = compute_scores(clf, reg, j_model, lats, lons, chunk_size=4096,
+                                sst_lookup=sst_lookup, rules=rules.default_engine() if use_rules else None,
+                                with_uncertainty=heat_type == "prediction_confidence" or min_confidence > 0)
 
     st.success("Computed scores for %d points" % len(df))
+    if "rules_fired" in df.attrs:
+        st.caption("Decision rules fired: " + ", ".join(f"{k} {v}" for k, v in df.attrs["rules_fired"].items()))
 
     # choose heat values
-    if heat_type == "juvenile_risk_probability":
-        heat_vals = df[["lat","lon","juv_prob"]].values.tolist()
-    elif heat_type == "availability_prob":
-        heat_vals = df[["lat","lon","avail_prob"]].values.tolist()
-    else:
-        # normalized quantity
-        q = df["qty"].values
-        qn = (q - q.min()) / (q.max() - q.min() + 1e-6)
-        heat_vals = np.column_stack([df["lat"].values, df["lon"].values, qn]).tolist()
-
-    # Create Folium map
-    m = folium.Map(location=[center_lat, center_lon], zoom_start=9, tiles="OpenStreetMap")
-    HeatMap(heat_vals, radius=15, blur=10, max_zoom=13).add_to(m)
-
-    # add some recommended safe points (low juvenile risk and high availability)
-    candidates = df[(df["juv_prob"] < 0.4) & (df["avail_prob"] > 0.5)].sort_values(by=["avail_prob","qty"], ascending=False).head(8)
-    for _, r in candidates.iterrows():
-        folium.CircleMarker(location=[r.lat, r.lon],
-                            radius=5,
-                            color="green",
-                            fill=True,
-                            fill_opacity=0.8,
-                            tooltip=f"Avail: {r.avail_prob:.2f}, Juv: {r.juv_prob:.2f}, Qty: {r.qty:.0f}").add_to(m)
-
-    st_folium(m, width=900, height=600)
+    column, cmap, value_range = HEAT_LAYERS[heat_type]
+    if heat_type in ("sst_anomaly", "sst_rolling_mean"):
+        df[column] = load_climatology().lookup(df["lat"].values, df["lon"].values, heat_type[len("sst_"):])
+    if value_range is None:
+        finite = df[column].to_numpy(float)
+        finite = finite[np.isfinite(finite)]
+        value_range = (finite.min(), finite.max()) if len(finite) else (0.0, 1.0)
+        if heat_type == "sst_anomaly":
+            # centre the diverging colormap on zero
+            value_range = (-max(map(abs, value_range)), max(map(abs, value_range)))
+
+    with instrumentation.span("render", view="heatmap"):
+        # Create Folium map; the layer is one server-rendered PNG (raster_overlay.py)
+        m = folium.Map(location=[center_lat, center_lon], zoom_start=9, tiles="OpenStreetMap")
+        raster_overlay.add_overlay(m, df, column, cmap, *value_range, name=heat_type)
+
+        # recommended safe points: the highest-quantity low-risk cells with
+        # predicted fish within reach of the center (relocation.py)
+        reach_km = radius_km * 2 ** 0.5
+        candidates = SafeZoneIndex.from_scores(df, min_confidence=min_confidence).best(
+            center_lat, center_lon, k=8, max_km=reach_km)
+        for _, r in candidates.iterrows():
+            tooltip = f"Avail: {r.avail_prob:.2f}, Juv: {r.juv_prob:.2f}, Qty: {r.qty:.0f}"
+            if "confidence" in candidates.columns:
+                tooltip += f", Conf: {r.confidence:.2f}"
+            folium.CircleMarker(location=[r.lat, r.lon],
+                                radius=5,
+                                color="green",
+                                fill=True,
+                                fill_opacity=0.8,
+                                tooltip=tooltip).add_to(m)
+
+        st_folium(m, width=900, height=600)
+        st.image(raster_overlay.legend_png(cmap), width=300,
+                 caption=f"{heat_type}: {value_range[0]:.2f} → {value_range[1]:.2f}")
     st.dataframe(df.head(20))
+
+instrumentation.performance_panel(profiler.stop() if profiler else None)
@@ -1,9 +1,11 @@
+import numpy as np
 import pandas as pd
 
-print("Merging SST data with fishing port locations...")
+import data_store
+from features import availability_from_sst, juvenile_risk_from_sst
+from spatial_index import GridIndex
 
-# Load cleaned SST dataset
-sst = pd.read_csv("data/clean_sst.csv")
+print("Merging SST data with fishing port locations...")
 
 # Define fishing port locations
 ports = [
@@ -18,27 +20,35 @@ ports = [
 
 ports_df = pd.DataFrame(ports, columns=["Location", "Latitude", "Longitude"])
 
-# Round coordinates to match SST grid alignment
-sst["Latitude"] = sst["Latitude"].round(1)
-sst["Longitude"] = sst["Longitude"].round(1)
-ports_df["Latitude"] = ports_df["Latitude"].round(1)
-ports_df["Longitude"] = ports_df["Longitude"].round(1)
-
-# Merge SST with port coordinates
-merged = pd.merge(sst, ports_df, on=["Latitude", "Longitude"], how="inner")
+# Load cleaned SST dataset, reading only the box around the ports
+sst = data_store.read_table("clean_sst", filters=data_store.bbox_filter(
+    lat_range=(ports_df["Latitude"].min() - 2, ports_df["Latitude"].max() + 2),
+    lon_range=(ports_df["Longitude"].min() - 2, ports_df["Longitude"].max() + 2),
+))
+
+# Snap each port to the nearest SST grid cell that has data. OISST is on a
+# 1° grid and coastal cells are often masked, so exact coordinate matching
+# would drop most ports.
+grid = GridIndex.from_points(sst["Latitude"], sst["Longitude"], values=np.ones(len(sst)))
+pi, pj = grid.nearest_valid_cell(ports_df["Latitude"], ports_df["Longitude"])
+ports_df["Cell"] = pi * grid.nlon + pj
+si, sj = grid.cell(sst["Latitude"], sst["Longitude"])
+sst["Cell"] = si * grid.nlon + sj
+
+# Merge SST with port cells
+merged = pd.merge(sst, ports_df.drop(columns=["Latitude", "Longitude"]), on="Cell", how="inner")
+merged = merged.drop(columns=["Cell"])
 
 # Approximate historical catch estimation (sample real-like assumptions)
 merged["Historical_Catch"] = (merged["SST"] - merged["SST"].min()) * 50  # temp-based scaling example
 
 # Fish Availability Rule: SST Range 25–30°C is best
-merged["Availability"] = merged["SST"].apply(lambda x: 1 if 25 <= x <= 30 else 0)
+merged["Availability"] = availability_from_sst(merged["SST"])
 
 # Juvenile Risk heuristic (SST extremes correlate with juvenile presence)
-merged["Juvenile_Risk"] = merged["SST"].apply(
-    lambda x: "High" if x > 30 or x < 23 else ("Medium" if 23 <= x < 25 else "Low")
-)
+merged["Juvenile_Risk"] = juvenile_risk_from_sst(merged["SST"])
 
-merged.to_csv("data/final_training_data.csv", index=False)
+data_store.write_table(merged, "final_training_data")
 
-print("Merged dataset created successfully -> data/final_training_data.csv")
+print("Merged dataset created successfully -> data/final_training_data/")
 print(merged.head())
@@ -1,32 +1,43 @@
-import pandas as pd
 import numpy as np
-from sklearn.neighbors import NearestNeighbors
+
+import data_store
+from spatial_index import GridIndex
 
 print("📌 Loading datasets...")
 
-sst = pd.read_csv("data/indian_sst.csv")
-fish = pd.read_csv("data/clean_sst.csv")
+sst = data_store.read_table("indian_sst", columns=["time", "lat", "lon", "sst"])
+fish = data_store.read_table("clean_sst")
 
 # Rename for consistency
 sst.rename(columns={"lat": "Latitude", "lon": "Longitude", "sst": "SST"}, inplace=True)
+sst["Month"] = sst["time"].dt.strftime("%Y-%m")
 
 print("🔎 Matching nearest SST coordinates...")
 
-# Extract coordinate pairs
-sst_coords = np.array(list(zip(sst["Latitude"], sst["Longitude"])))
-fish_coords = np.array(list(zip(fish["Latitude"], fish["Longitude"])))
+# SST is on a regular grid, so the nearest cell is found by index arithmetic
+grid = GridIndex.from_points(sst["Latitude"], sst["Longitude"])
+months = np.sort(sst["Month"].unique())
 
-# Nearest neighbor model
-nn = NearestNeighbors(n_neighbors=1, metric="euclidean")
-nn.fit(sst_coords)
+# Month x lat x lon cube of mean SST
+si, sj = grid.cell(sst["Latitude"], sst["Longitude"])
+sm = np.searchsorted(months, sst["Month"])
+sums = np.zeros((len(months), grid.nlat, grid.nlon))
+counts = np.zeros_like(sums)
+np.add.at(sums, (sm, si, sj), sst["SST"].to_numpy(dtype=np.float64))
+np.add.at(counts, (sm, si, sj), 1)
+with np.errstate(invalid="ignore"):
+    cube = sums / counts
 
-distances, indices = nn.kneighbors(fish_coords)
-matched_sst = sst.iloc[indices.flatten()][["SST"]].reset_index(drop=True)
+# Same-month SST of the nearest grid cell for every row
+fi, fj = grid.cell(fish["Latitude"], fish["Longitude"])
+fm = np.clip(np.searchsorted(months, fish["Month"]), 0, len(months) - 1)
+matched = np.where(months[fm] == fish["Month"].to_numpy(dtype=str), cube[fm, fi, fj], np.nan)
 
-merged = pd.concat([fish.reset_index(drop=True), matched_sst], axis=1)
+# Matched SST is kept as a separate column next to the monthly SST
+merged = fish.reset_index(drop=True).assign(SST_Extra=matched)
 
-merged.to_csv("data/final_training_data.csv", index=False)
+data_store.write_table(merged, "final_training_data")
 
 print("🎉 Merged dataset created successfully!")
 print("Rows:", len(merged))
-print("Saved as data/final_training_data.csv")
+print("Saved as data/final_training_data/")
@@ -0,0 +1,165 @@
+# src/model_host.py
+# Multi-process serving with one copy of the models.
+#
+# The host process loads every artifact once, in the format the registry
+# serves (FISH_MODEL_FORMAT). Flat-array models (see export_flat_models.py /
+# compact_models.py) are copied into POSIX shared memory segments; pickled
+# estimators stay ordinary objects. The worker pool
+# is forked after loading, so workers see the shared segments directly and
+# the remaining pickles copy-on-write, instead of each worker loading its
+# own forests. Other processes (e.g. several Streamlit servers) can attach
+# to the same segments through a published spec file:
+#
+#   host = ModelHost(workers=4).start()
+#   host.publish("models/shared.json")   # FISH_SHARED_MODELS=models/shared.json
+#
+# Concurrent single-row requests are micro-batched (batch_scheduler.py):
+# they are collected for up to max_wait_ms (or max_batch rows) and sent to a
+# worker as one batch.
+import json
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import model_registry
+from batch_scheduler import BatchScheduler
+from flat_forest import FlatModel, FlatPCA, from_arrays, to_arrays
+
+
+# ======================= SHARED MEMORY =======================
+def share_model(model):
+    """Copy a flat model's arrays into shared memory.
+
+    Returns (spec, model_view, segments): a JSON-able spec other processes
+    can attach with, a model whose arrays live in the segments, and the
+    segments themselves (keep them open; unlink when done).
+    """
+    meta, arrays = to_arrays(model)
+    spec = {"meta": meta, "arrays": {}}
+    views, segments = {}, []
+    for key, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+        view[...] = arr
+        view.flags.writeable = False
+        spec["arrays"][key] = [shm.name, list(arr.shape), arr.dtype.str]
+        views[key] = view
+        segments.append(shm)
+    return spec, from_arrays(meta, views), segments
+
+
+def attach_model(spec):
+    """Rebuild a model from a share_model spec without copying its arrays."""
+    from multiprocessing import resource_tracker
+    views, segments = {}, []
+    for key, (name, shape, dtype) in spec["arrays"].items():
+        shm = shared_memory.SharedMemory(name=name)
+        # the host owns the segments; don't let this process unlink them at exit
+        resource_tracker.unregister(shm._name, "shared_memory")
+        view = np.ndarray(tuple(shape), dtype=np.dtype(dtype), buffer=shm.buf)
+        view.flags.writeable = False
+        views[key] = view
+        segments.append(shm)
+    model = from_arrays(spec["meta"], views)
+    model._shared_segments = segments  # keep the mappings alive with the model
+    return model
+
+
+# ======================= WORKERS =======================
+def _predict_records(pipeline, rules, records):
+    # runs in a pool worker; models come from the registry inherited at fork
+    from prediction_service import predict_batch
+    return predict_batch(pd.DataFrame(records), pipeline=pipeline, rules=rules).to_dict(orient="records")
+
+
+# ======================= HOST =======================
+class ModelHost:
+    """timeout (seconds) bounds every worker call, so a dead or hung worker
+    turns into multiprocessing.TimeoutError instead of blocking forever."""
+
+    def __init__(self, pipelines=("default",), workers=2, max_batch=64, max_wait_ms=5.0, timeout=30.0):
+        self.pipelines = list(pipelines)
+        self.workers = workers
+        self.timeout = timeout
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.spec = {}
+        self._segments = []
+        self._pool = None
+        self._scheduler = None
+
+    def _artifact_names(self):
+        names = {"juvenile"}
+        for pipeline in self.pipelines:
+            names.update(model_registry.PIPELINES[pipeline])
+        return sorted(names)
+
+    def start(self):
+        """Load and share the models, then fork the worker pool."""
+        for name in self._artifact_names():
+            # flat / compact files only when the format asks for them and they
+            # match their source pickle (model_registry checks the manifests)
+            model = model_registry.load_model(name)
+            if isinstance(model, (FlatModel, FlatPCA)):
+                spec, model, segments = share_model(model)
+                self.spec[name] = spec
+                self._segments += segments
+                model_registry.register(name, model, "shared")
+            else:
+                model_registry.register(name, model, "pickle (fork)")
+        # fork (not spawn) so workers inherit the loaded registry; Pool forks
+        # all workers now, before any request threads exist
+        self._pool = multiprocessing.get_context("fork").Pool(self.workers)
+        # one dispatch thread per worker keeps every worker busy
+        # a timed-out batch is not retried row by row (that would wait once per row)
+        self._scheduler = BatchScheduler(self._run_batch, self.max_batch, self.max_wait_ms,
+                                         name="model_host", dispatch_threads=self.workers,
+                                         fatal_errors=(TimeoutError, multiprocessing.TimeoutError))
+        return self
+
+    def publish(self, path):
+        """Write the shared-memory spec for FISH_SHARED_MODELS."""
+        with open(path, "w") as f:
+            json.dump({"pid": os.getpid(), "artifacts": self.spec}, f)
+        return path
+
+    # ---------------- requests ----------------
+    def predict_batch(self, df, pipeline="default", rules=True):
+        """Score a whole DataFrame in one worker call."""
+        records = self._pool.apply_async(_predict_records, (pipeline, rules, df.to_dict(orient="records"))) \
+            .get(self.timeout)
+        return pd.DataFrame(records, index=df.index)
+
+    def submit_one(self, pipeline="default", rules=True, **inputs):
+        """Queue one row for micro-batching; the Future resolves to a dict
+        with availability, quantity and juvenile_risk."""
+        return self._scheduler.submit((pipeline, rules), inputs)
+
+    def _run_batch(self, key, rows):
+        pipeline, rules = key
+        return self._pool.apply_async(_predict_records, (pipeline, rules, rows)).get(self.timeout)
+
+    # ---------------- shutdown ----------------
+    def close(self):
+        if self._scheduler is not None:
+            self._scheduler.close()
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+        for shm in self._segments:
+            shm.unlink()
+            try:
+                shm.close()
+            except BufferError:
+                pass  # still viewed by registered models; unmapped at exit
+        self._segments = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,279 @@
+# src/model_registry.py
+# Single place that knows where the model pickles live. Every artifact is
+# loaded lazily on first use and then kept for the lifetime of the process,
+# so Streamlit reruns (which re-execute app.py but keep imported modules)
+# never hit the disk again.
+import hashlib
+import json
+import os
+import threading
+import time
+
+import joblib
+
+import instrumentation
+
+MODELS_DIR = os.environ.get("FISH_MODELS_DIR") or os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models"))
+
+ARTIFACTS = {
+    "availability": "availability_model.pkl",
+    "quantity": "quantity_model.pkl",
+    "juvenile": "juvenile_model.pkl",
+    "xgb_availability": "xgb_availability_model.pkl",
+    "xgb_quantity": "xgb_quantity_model.pkl",
+    "pca": "pca_transform.pkl",
+    "hybrid_availability": "hybrid_availability_model.pkl",
+    "hybrid_quantity": "hybrid_quantity_model.pkl",
+}
+
+# Artifacts needed by each prediction pipeline (juvenile model is shared)
+PIPELINES = {
+    "default": ("availability", "quantity"),
+    "xgb": ("xgb_availability", "xgb_quantity"),
+    "hybrid": ("pca", "hybrid_availability", "hybrid_quantity"),
+}
+
+# Forest ensembles are the big artifacts; these may be memory-mapped
+FOREST_ARTIFACTS = {"availability", "quantity", "juvenile", "hybrid_availability", "hybrid_quantity"}
+
+# Artifacts that export_flat_models.py can compile to flat arrays
+FLAT_ARTIFACTS = ("availability", "quantity", "juvenile", "pca", "hybrid_availability", "hybrid_quantity")
+FLAT_DIR = os.path.join(MODELS_DIR, "flat")
+FLAT_MANIFEST = os.path.join(FLAT_DIR, "manifest.json")
+
+# Pruned / reduced-precision flat models written by compact_models.py; each
+# is only served if it matches its entry in manifest.json
+COMPACT_DIR = os.path.join(MODELS_DIR, "compact")
+COMPACT_MANIFEST = os.path.join(COMPACT_DIR, "manifest.json")
+
+# Set FISH_MODEL_FORMAT=flat (or compact) to serve the flat-array exports
+# (no sklearn import needed) wherever one exists; other artifacts still
+# load as pickles
+MODEL_FORMAT = os.environ.get("FISH_MODEL_FORMAT", "pickle")
+
+# Set FISH_MODEL_MMAP=r to memory-map the numpy buffers of the forest pickles
+DEFAULT_MMAP_MODE = os.environ.get("FISH_MODEL_MMAP") or None
+
+# Set FISH_SHARED_MODELS to the spec file published by model_host.py to
+# attach to models held in shared memory instead of loading a private copy
+SHARED_SPEC = os.environ.get("FISH_SHARED_MODELS") or None
+
+_lock = threading.Lock()
+_loaded = {}
+_stats = {}
+_rejected = {}
+
+
+def artifact_path(name):
+    return os.path.join(MODELS_DIR, ARTIFACTS[name])
+
+
+def flat_artifact_path(name):
+    return os.path.join(FLAT_DIR, f"{name}.npz")
+
+
+def compact_artifact_path(name):
+    return os.path.join(COMPACT_DIR, f"{name}.npz")
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def source_fingerprint(name):
+    """Name, size and sha256 of an artifact's pickle, recorded by the flat
+    and compact exports so that a retrained pickle invalidates them."""
+    source = artifact_path(name)
+    return {"source": os.path.basename(source), "source_bytes": os.path.getsize(source),
+            "source_sha256": _sha256(source)}
+
+
+def _source_problem(name, entry):
+    # None while the pickle is the one the export was compiled from (or is
+    # absent, as in a flat-only deployment)
+    source = artifact_path(name)
+    if not os.path.exists(source):
+        return None
+    if os.path.getsize(source) != entry.get("source_bytes") or _sha256(source) != entry.get("source_sha256"):
+        return f"stale: {os.path.basename(source)} changed since the export"
+    return None
+
+
+def _manifest_entry(manifest_path, name, path):
+    # (manifest, entry for this file) or (None, problem)
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None, "no readable manifest.json"
+    entry = manifest.get("artifacts", {}).get(name)
+    if entry is None or entry.get("file") != os.path.basename(path):
+        return None, "not listed in manifest.json"
+    return manifest, entry
+
+
+def flat_problem(name):
+    """Why the flat export must not be served (not exported from the current
+    pickle according to manifest.json), or None if it checks out."""
+    if not os.path.exists(artifact_path(name)):
+        return None
+    manifest, entry = _manifest_entry(FLAT_MANIFEST, name, flat_artifact_path(name))
+    if manifest is None:
+        return entry
+    return _source_problem(name, entry)
+
+
+def compact_problem(name):
+    """Why the compact artifact must not be served (stale, partial or out of
+    tolerance according to manifest.json), or None if it checks out."""
+    from flat_forest import FORMAT_VERSION
+
+    path = compact_artifact_path(name)
+    manifest, entry = _manifest_entry(COMPACT_MANIFEST, name, path)
+    if manifest is None:
+        return entry
+    if manifest.get("format_version") != FORMAT_VERSION:
+        return f"format version {manifest.get('format_version')} != {FORMAT_VERSION}"
+    if os.path.getsize(path) != entry.get("bytes") or _sha256(path) != entry.get("sha256"):
+        return "file does not match its manifest sha256"
+    tolerance, error = manifest.get("tolerance"), entry.get("fidelity_error")
+    if tolerance is not None and error is not None and error > tolerance:
+        return f"fidelity error {error:.4g} above tolerance {tolerance}"
+    return _source_problem(name, entry)
+
+
+def _served_flat_path(name):
+    # flat-format file to serve for this artifact, or None for the pickle
+    if MODEL_FORMAT == "compact" and os.path.exists(compact_artifact_path(name)):
+        problem = compact_problem(name)
+        if problem is None:
+            return compact_artifact_path(name)
+        _rejected.setdefault(name, {})["compact"] = problem
+        print(f"⚠️ Not serving compact {name}: {problem}; falling back to flat / pickle")
+    if MODEL_FORMAT in ("flat", "compact") and os.path.exists(flat_artifact_path(name)):
+        problem = flat_problem(name)
+        if problem is None:
+            return flat_artifact_path(name)
+        _rejected.setdefault(name, {})["flat"] = problem
+        print(f"⚠️ Not serving flat {name}: {problem}; falling back to the pickle")
+    return None
+
+
+def _current_rss_bytes():
+    # Resident set size from /proc (Linux); None where unavailable
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def load_model(name, mmap_mode=DEFAULT_MMAP_MODE):
+    """Load one artifact by registry name, at most once per process.
+
+    Raises KeyError for unknown names and the underlying error (e.g.
+    FileNotFoundError) when the pickle cannot be loaded.
+    """
+    if name in _loaded:
+        return _loaded[name]
+    if name not in ARTIFACTS:
+        raise KeyError(f"Unknown model artifact: {name}")
+
+    with _lock:
+        if name in _loaded:
+            return _loaded[name]
+
+        path = artifact_path(name)
+        mode = mmap_mode if name in FOREST_ARTIFACTS else None
+        rss_before = _current_rss_bytes()
+        start = time.perf_counter()
+        model = _attach_shared(name)
+        shared = model is not None
+        flat_path = None if shared else _served_flat_path(name)
+        if flat_path:
+            from flat_forest import load_flat
+            path = flat_path
+            model = load_flat(path)
+        elif not shared:
+            model = joblib.load(path, mmap_mode=mode)
+        elapsed = time.perf_counter() - start
+        instrumentation.record("load", elapsed, model=name)
+        rss_after = _current_rss_bytes()
+
+        if shared:
+            fmt, file_bytes = "shared", 0
+        else:
+            fmt = ("compact" if path.startswith(COMPACT_DIR) else "flat") if flat_path else "pickle"
+            file_bytes = os.path.getsize(path)
+        _stats[name] = {
+            "artifact": name,
+            "file": os.path.basename(path),
+            "format": fmt,
+            "load_seconds": elapsed,
+            "file_bytes": file_bytes,
+            "rss_delta_bytes": (rss_after - rss_before) if rss_before is not None and rss_after is not None else None,
+            "mmap_mode": mode,
+            "rejected": _rejected.get(name),
+        }
+        _loaded[name] = model
+        return model
+
+
+_shared = None
+
+
+def _attach_shared(name):
+    # the model from the FISH_SHARED_MODELS spec, or None when there is no
+    # spec, it lacks this artifact or its host is gone (segments unlinked)
+    global _shared
+    if SHARED_SPEC is None:
+        return None
+    try:
+        if _shared is None:
+            with open(SHARED_SPEC) as f:
+                _shared = json.load(f)["artifacts"]
+        spec = _shared.get(name)
+        if spec is None:
+            return None
+        from model_host import attach_model
+        return attach_model(spec)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ Cannot attach shared {name} ({e}); loading it from disk")
+        return None
+
+
+def register(name, model, fmt="shared"):
+    """Install an already-loaded model under a registry name (used by
+    model_host.py before it forks its workers)."""
+    with _lock:
+        _loaded[name] = model
+        _stats[name] = {"artifact": name, "file": None, "format": fmt, "load_seconds": 0.0,
+                        "file_bytes": 0, "rss_delta_bytes": None, "mmap_mode": None}
+
+
+def load_pipeline(pipeline):
+    """Load (lazily) every artifact a pipeline needs and return them by name."""
+    if pipeline not in PIPELINES:
+        raise KeyError(f"Unknown pipeline: {pipeline}")
+    return {name: load_model(name) for name in PIPELINES[pipeline]}
+
+
+def load_report():
+    """Load time and memory figures for every artifact loaded so far."""
+    return [dict(s) for s in _stats.values()]
+
+
+def clear():
+    """Drop all cached models (mainly for benchmarks and retraining) and the
+    shared-memory spec, so a restarted host's spec is read again."""
+    global _shared
+    with _lock:
+        _loaded.clear()
+        _stats.clear()
+        _rejected.clear()
+        _shared = None
@@ -1,4 +1,3 @@
-import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.decomposition import PCA
@@ -7,14 +6,18 @@ import xgboost as xgb
 from sklearn.metrics import accuracy_score, mean_squared_error
 import joblib
 
+import data_store
+import model_registry
+from features import FEATURES, availability_from_catch
+
 print("📌 Loading final real training dataset...")
-df = pd.read_csv("data/final_training_data_fixed.csv")
+df = data_store.read_table("final_training_data_fixed", columns=FEATURES)
 
 # Create Availability label from Catch
-df["Availability"] = df["Historical_Catch"].apply(lambda x: 1 if x > 300 else 0)
+df["Availability"] = availability_from_catch(df["Historical_Catch"])
 
 # Feature selection
-X = df[["SST", "Salinity", "Dissolved_Oxygen", "Historical_Catch"]]
+X = df[FEATURES]
 y_class = df["Availability"]
 y_reg = df["Historical_Catch"]
 
@@ -25,12 +28,12 @@ X_train, X_test, y_train_class, y_test_class, y_train_reg, y_test_reg = train_te
 
 # ===== RANDOM FOREST MODELS =====
 print("\n🌲 Training Random Forest Models...")
-clf = RandomForestClassifier(n_estimators=50)
+clf = RandomForestClassifier(n_estimators=50, n_jobs=-1)
 clf.fit(X_train, y_train_class)
 pred_class_rf = clf.predict(X_test)
 print("Random Forest Availability Accuracy:", accuracy_score(y_test_class, pred_class_rf))
 
-reg = RandomForestRegressor(n_estimators=50)
+reg = RandomForestRegressor(n_estimators=50, n_jobs=-1)
 reg.fit(X_train, y_train_reg)
 pred_reg_rf = reg.predict(X_test)
 print("Random Forest Quantity RMSE:", mean_squared_error(y_test_reg, pred_reg_rf))
@@ -48,10 +51,10 @@ pred_reg_xgb = xgb_reg.predict(X_test)
 print("XGBoost Quantity RMSE:", mean_squared_error(y_test_reg, pred_reg_xgb))
 
 # Save all models
-joblib.dump(clf, "models/availability_model.pkl")
-joblib.dump(reg, "models/quantity_model.pkl")
-joblib.dump(xgb_clf, "models/xgb_availability_model.pkl")
-joblib.dump(xgb_reg, "models/xgb_quantity_model.pkl")
+joblib.dump(clf, model_registry.artifact_path("availability"))
+joblib.dump(reg, model_registry.artifact_path("quantity"))
+joblib.dump(xgb_clf, model_registry.artifact_path("xgb_availability"))
+joblib.dump(xgb_reg, model_registry.artifact_path("xgb_quantity"))
 
 # ===== HYBRID PCA + RF + SG BOOST (GradientBoosting) =====
 print("\n4️⃣ Hybrid ML — PCA + RF + SG Boost...")
@@ -63,7 +66,7 @@ X_train_pca = pca.fit_transform(X_train)
 X_test_pca = pca.transform(X_test)
 
 # Classification ensemble (Random Forest + Gradient Boosting)
-rf_clf_pca = RandomForestClassifier(n_estimators=50, random_state=42)
+rf_clf_pca = RandomForestClassifier(n_estimators=50, random_state=42, n_jobs=-1)
 gb_clf = GradientBoostingClassifier(n_estimators=100, random_state=42)
 voting_clf = VotingClassifier([('rf', rf_clf_pca), ('gb', gb_clf)], voting='soft')
 voting_clf.fit(X_train_pca, y_train_class)
@@ -71,7 +74,7 @@ pred_class_hybrid = voting_clf.predict(X_test_pca)
 print("Hybrid Availability Accuracy:", accuracy_score(y_test_class, pred_class_hybrid))
 
 # Regression ensemble (Random Forest + Gradient Boosting)
-rf_reg_pca = RandomForestRegressor(n_estimators=50, random_state=42)
+rf_reg_pca = RandomForestRegressor(n_estimators=50, random_state=42, n_jobs=-1)
 gb_reg = GradientBoostingRegressor(n_estimators=100, random_state=42)
 voting_reg = VotingRegressor([('rf', rf_reg_pca), ('gb', gb_reg)])
 voting_reg.fit(X_train_pca, y_train_reg)
@@ -79,8 +82,8 @@ pred_reg_hybrid = voting_reg.predict(X_test_pca)
 print("Hybrid Quantity RMSE:", mean_squared_error(y_test_reg, pred_reg_hybrid))
 
 # Save PCA and hybrid models
-joblib.dump(pca, "models/pca_transform.pkl")
-joblib.dump(voting_clf, "models/hybrid_availability_model.pkl")
-joblib.dump(voting_reg, "models/hybrid_quantity_model.pkl")
+joblib.dump(pca, model_registry.artifact_path("pca"))
+joblib.dump(voting_clf, model_registry.artifact_path("hybrid_availability"))
+joblib.dump(voting_reg, model_registry.artifact_path("hybrid_quantity"))
 print("\n✅ All models saved successfully!")
 print("Models: availability_model.pkl, quantity_model.pkl, xgb_availability_model.pkl, xgb_quantity_model.pkl")
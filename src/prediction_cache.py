@@ -0,0 +1,141 @@
+# src/prediction_cache.py
+# LRU + TTL cache for single-point predictions. Inputs are snapped to a
+# configurable grid before lookup, so repeated queries for the same port or
+# region are answered without touching the models. Misses can go through a
+# BatchScheduler so that concurrent users share one predict call.
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+import instrumentation
+from features import FEATURES
+from prediction_service import apply_rules, predict_models
+
+# Quantization step per feature (SST/Salinity/DO to 0.1, catch to 1 kg)
+DEFAULT_STEPS = {
+    "SST": 0.1,
+    "Salinity": 0.1,
+    "Dissolved_Oxygen": 0.1,
+    "Historical_Catch": 1.0,
+}
+
+
+def _score_rows(pipeline, rows):
+    """Raw (availability, quantity, juvenile_risk) tuples for a list of input dicts."""
+    preds = predict_models(pd.DataFrame(rows), pipeline)
+    return [(int(a), float(q), j) for a, q, j in
+            zip(preds["availability"], preds["quantity"], preds["juvenile_risk"])]
+
+
+def batching_scheduler(max_batch=64, max_wait_ms=5.0):
+    """BatchScheduler that scores cache misses of concurrent callers together."""
+    from batch_scheduler import BatchScheduler
+    return BatchScheduler(_score_rows, max_batch, max_wait_ms, name="prediction_cache")
+
+
+class PredictionCache:
+    def __init__(self, capacity=4096, ttl_seconds=3600, steps=None, scheduler=None):
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self.steps = dict(DEFAULT_STEPS, **(steps or {}))
+        self.hits = 0
+        self.misses = 0
+        # optional BatchScheduler (see batching_scheduler()); concurrent
+        # misses are then scored together instead of one predict each
+        self.scheduler = scheduler
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ---------------- keys ----------------
+    def quantize(self, inputs):
+        """Snap each feature to its step; returns a dict in FEATURES order."""
+        return {f: round(round(float(inputs[f]) / self.steps[f]) * self.steps[f], 6) for f in FEATURES}
+
+    def key(self, pipeline, inputs):
+        q = self.quantize(inputs)
+        return (pipeline,) + tuple(q[f] for f in FEATURES)
+
+    # ---------------- storage ----------------
+    def _lookup(self, key):
+        # caller holds the lock; drops the entry if it has expired
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if self.ttl_seconds is None or time.monotonic() - stored_at <= self.ttl_seconds:
+            self._entries.move_to_end(key)
+            return value
+        del self._entries[key]
+        return None
+
+    def get(self, key):
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self.hits += 1
+                instrumentation.incr("cache_hits")
+                return value
+            self.misses += 1
+            instrumentation.incr("cache_misses")
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+            "capacity": self.capacity,
+        }
+
+    # ---------------- prediction ----------------
+    def warm(self, pipeline, rows):
+        """Precompute model outputs for many rows (e.g. region presets) in one batch."""
+        df = pd.DataFrame([self.quantize(r) for r in rows])
+        keys = [(pipeline,) + tuple(r) for r in df[FEATURES].itertuples(index=False)]
+        # same TTL-aware lookup as get (expired presets are re-warmed), without
+        # counting hits / misses
+        with self._lock:
+            missing = [i for i, k in enumerate(keys) if self._lookup(k) is None]
+        if not missing:
+            return 0
+        raw = _score_rows(pipeline, df.iloc[missing].to_dict(orient="records"))
+        for i, value in zip(missing, raw):
+            self.put(keys[i], value)
+        return len(missing)
+
+    def predict_one(self, pipeline="default", rules=True, **inputs):
+        """Cached equivalent of prediction_service.predict_one."""
+        key = self.key(pipeline, inputs)
+        raw = self.get(key)
+        if raw is None:
+            if self.scheduler is not None:
+                raw = self.scheduler(pipeline, self.quantize(inputs))
+            else:
+                raw = _score_rows(pipeline, [self.quantize(inputs)])[0]
+            self.put(key, raw)
+
+        if not rules:
+            return raw
+        availability, quantity, juvenile_risk = raw
+        df = pd.DataFrame([inputs])
+        preds = pd.DataFrame({"availability": [availability], "quantity": [quantity],
+                              "juvenile_risk": [juvenile_risk]})
+        row = apply_rules(df, preds).iloc[0]
+        return int(row["availability"]), float(row["quantity"]), row["juvenile_risk"]
@@ -0,0 +1,138 @@
+# src/prediction_server.py
+# Small local HTTP service for batch scoring (stdlib only).
+#
+#   python src/prediction_server.py --port 8080
+#   python src/prediction_server.py --workers 4   # shared-memory model host
+#
+#   POST /predict?pipeline=default|hybrid|xgb&rules=1
+#     JSON body: [{"SST": 28, "Salinity": 33, ...}, ...] or {"rows": [...]}
+#     CSV body (Content-Type: text/csv) -> CSV response
+#   GET /health
+import argparse
+import io
+import json
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+import model_registry
+from prediction_service import predict_batch
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    server_version = "FishPrediction/1.0"
+
+    def _send(self, status, body, content_type="application/json"):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, status, obj):
+        self._send(status, json.dumps(obj))
+
+    def _predict(self, df, pipeline, rules):
+        host = self.server.model_host
+        if host is None:
+            return predict_batch(df, pipeline=pipeline, rules=rules)
+        if len(df) == 1:
+            # single rows from concurrent clients are micro-batched by the host
+            # queueing time included; the worker call itself is bounded by host.timeout
+            row = host.submit_one(pipeline, rules, **df.iloc[0].to_dict()).result(timeout=2 * host.timeout)
+            return pd.DataFrame([row], index=df.index)
+        return host.predict_batch(df, pipeline, rules)
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/health":
+            self._send_json(200, {"status": "ok", "loaded": model_registry.load_report()})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/predict":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        query = parse_qs(url.query)
+        pipeline = query.get("pipeline", ["default"])[0]
+        rules = query.get("rules", ["1"])[0] not in ("0", "false")
+        if pipeline not in model_registry.PIPELINES:
+            self._send_json(400, {"error": f"unknown pipeline: {pipeline}"})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length).decode("utf-8")
+        is_csv = self.headers.get("Content-Type", "").startswith("text/csv")
+
+        try:
+            if is_csv:
+                df = pd.read_csv(io.StringIO(raw))
+            else:
+                payload = json.loads(raw)
+                rows = payload["rows"] if isinstance(payload, dict) else payload
+                df = pd.DataFrame(rows)
+            preds = self._predict(df, pipeline, rules)
+        except (ValueError, KeyError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except (TimeoutError, multiprocessing.TimeoutError):
+            self._send_json(503, {"error": "prediction timed out, try again later"})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+
+        if is_csv:
+            self._send(200, preds.to_csv(index=False), "text/csv")
+        else:
+            self._send_json(200, {"pipeline": pipeline, "count": len(preds),
+                                  "predictions": preds.to_dict(orient="records")})
+
+    def log_message(self, format, *args):
+        # keep the console quiet under high request volume
+        pass
+
+
+def make_server(host="127.0.0.1", port=8080, model_host=None):
+    server = ThreadingHTTPServer((host, port), PredictionHandler)
+    server.model_host = model_host
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch fish catch prediction server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="serve from a forked worker pool sharing one copy of the models")
+    parser.add_argument("--pipelines", nargs="+", default=["default"], choices=sorted(model_registry.PIPELINES),
+                        help="pipelines the worker pool loads")
+    parser.add_argument("--max-batch", type=int, default=64, help="max rows per micro-batch")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="max time to wait for a micro-batch")
+    parser.add_argument("--timeout", type=float, default=30.0,
+                        help="seconds a worker call may take before the request fails with 503")
+    parser.add_argument("--publish", help="write the shared-memory spec here (for FISH_SHARED_MODELS)")
+    args = parser.parse_args()
+
+    model_host = None
+    if args.workers:
+        from model_host import ModelHost
+        model_host = ModelHost(args.pipelines, args.workers, args.max_batch, args.max_wait_ms, args.timeout).start()
+        if args.publish:
+            model_host.publish(args.publish)
+        print(f"🧠 Model host: {args.workers} workers, shared artifacts: {', '.join(model_host.spec) or 'none'}")
+
+    server = make_server(args.host, args.port, model_host)
+    print(f"🚀 Prediction server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+    finally:
+        if model_host is not None:
+            model_host.close()
@@ -0,0 +1,69 @@
+# src/prediction_service.py
+# One predict-then-apply-rules core shared by the Streamlit app, the CLI and
+# the batch HTTP server. Everything works on N rows at once.
+import numpy as np
+import pandas as pd
+
+import instrumentation
+import model_registry
+import rules as rules_engine  # "rules" is a predict_batch argument
+from features import FEATURES, check_columns, model_input
+
+
+def predict_models(df, pipeline="default"):
+    """Raw model outputs (no decision rules) for every row of df."""
+    check_columns(df, FEATURES)
+    models = model_registry.load_pipeline(pipeline)
+    j_model = model_registry.load_model("juvenile")
+
+    with instrumentation.span("featurize", pipeline=pipeline):
+        features = model_input(df, "availability")
+        juvenile_features = model_input(df, "juvenile")
+    with instrumentation.span("predict", model="juvenile"):
+        juvenile_risk = j_model.predict(juvenile_features)
+
+    if pipeline == "hybrid":
+        with instrumentation.span("predict", model="pca"):
+            features_pca = models["pca"].transform(features)
+        with instrumentation.span("predict", model="hybrid_availability"):
+            availability = models["hybrid_availability"].predict(features_pca)
+        with instrumentation.span("predict", model="hybrid_quantity"):
+            quantity = models["hybrid_quantity"].predict(features_pca)
+    else:
+        prefix = "xgb_" if pipeline == "xgb" else ""
+        with instrumentation.span("predict", model=prefix + "availability"):
+            availability = models[prefix + "availability"].predict(features)
+        with instrumentation.span("predict", model=prefix + "quantity"):
+            quantity = models[prefix + "quantity"].predict(features)
+    instrumentation.incr("predictions", len(df), pipeline=pipeline)
+
+    return pd.DataFrame({
+        "availability": np.asarray(availability).astype(int),
+        "quantity": np.asarray(quantity).astype(float),
+        "juvenile_risk": np.asarray(juvenile_risk).astype(str),
+    }, index=df.index)
+
+
+def apply_rules(df, preds):
+    """Hybrid decision rules (rules.py), applied to a whole batch with boolean masks."""
+    with instrumentation.span("rules"):
+        return rules_engine.default_engine().apply(df, preds)
+
+
+def predict_batch(df, pipeline="default", rules=True):
+    """Availability, quantity and juvenile risk for every row of df.
+
+    df needs the SST, Salinity, Dissolved_Oxygen and Historical_Catch
+    columns; an optional Location column enables the fishing-hub override.
+    pipeline is one of "default", "hybrid" or "xgb".
+    """
+    preds = predict_models(df, pipeline)
+    if rules:
+        preds = apply_rules(df, preds)
+    return preds
+
+
+def predict_one(pipeline="default", rules=True, **inputs):
+    """Convenience wrapper: predict a single row given as keyword arguments."""
+    row = predict_batch(pd.DataFrame([inputs]), pipeline, rules).iloc[0]
+    return int(row["availability"]), float(row["quantity"]), row["juvenile_risk"]
@@ -1,34 +1,38 @@
-import pandas as pd
+import sys
 
-print("Preparing cleaned SST dataset...")
-
-# Load Indian SST real dataset
-df = pd.read_csv("data/indian_sst.csv")
-
-# Keep only necessary columns
-df = df[["time", "lat", "lon", "sst"]]
-
-# Drop missing values
-df = df.dropna()
+import climatology
+import data_store
 
-# Convert date column to datetime format
-df["time"] = pd.to_datetime(df["time"])
-
-# Monthly average SST for stable prediction features
-df = df.groupby([df["time"].dt.to_period("M"), "lat", "lon"])["sst"].mean().reset_index()
-
-# Rename columns
-df.rename(columns={
-    "time": "Month",
-    "lat": "Latitude",
-    "lon": "Longitude",
-    "sst": "SST"
-}, inplace=True)
+print("Preparing cleaned SST dataset...")
 
-df["Month"] = df["Month"].astype(str)
+# Only months that are new since the last run are recomputed (the latest
+# stored month is redone in case it was incomplete); --full rebuilds all
+source_months = data_store.months("indian_sst")
+done_months = [] if "--full" in sys.argv else data_store.months("clean_sst")
+todo_months = [m for m in source_months if m not in done_months or m == done_months[-1]]
+print(f"Months to process: {len(todo_months)} of {len(source_months)}")
+if not todo_months:
+    print("clean_sst is up to date.")
+    sys.exit(0)
+
+# Monthly average SST for stable prediction features, kept as running
+# sums/counts in the climatology cube (climatology.py). New months are
+# folded in one at a time; without a stored cube the whole history is folded
+full = "--full" in sys.argv or not climatology.SSTClimatology.available()
+clim = (climatology.SSTClimatology.empty(climatology.grid_for("indian_sst")) if full
+        else climatology.SSTClimatology.load())
+for month in source_months if full else todo_months:
+    # Load Indian SST real dataset (only the columns and the month we need)
+    month_df = data_store.read_table("indian_sst", columns=["time", "lat", "lon", "sst"],
+                                     filters=data_store.bbox_filter(months=[month]))
+    # missing values are skipped; a re-processed month replaces its old sums
+    clim.fold_frame(month_df, replace=True)
+clim.save()
+
+df = clim.to_frame(todo_months)
 
 # Save
-df.to_csv("data/clean_sst.csv", index=False)
+data_store.write_table(df, "clean_sst", mode="append" if done_months else "overwrite")
 
-print("Cleaning complete. File saved as data/clean_sst.csv")
+print("Cleaning complete. Dataset saved as data/clean_sst/ (climatology: data/sst_climatology.npz)")
 print(df.head())
@@ -1,19 +1,29 @@
-import xarray as xr
-import pandas as pd
+import argparse
 
-print("Downloading & Extracting SST dataset...")
+import data_store
+from regions import INDIAN_LAT_RANGE, INDIAN_LON_RANGE
+from sst_ingest import NOAA_SST_URL, ingest_sst
 
-url = "https://psl.noaa.gov/thredds/dodsC/Datasets/noaa.oisst.v2/sst.mnmean.nc"
-data = xr.open_dataset(url)
+parser = argparse.ArgumentParser(description="Extract Indian Ocean SST from NOAA OISST")
+parser.add_argument("source", nargs="?", default=NOAA_SST_URL,
+                    help="local NetCDF file to use instead of the NOAA server")
+parser.add_argument("--full", action="store_true", help="re-ingest every month instead of only new ones")
+args = parser.parse_args()
 
-subset = data.sel(
-    lat=slice(25, 5),     # 25°N to 5°N
-    lon=slice(65, 90)     # 65°E to 90°E
-)
+print("Downloading & Extracting SST dataset...")
 
-sst_df = subset['sst'].to_dataframe().reset_index()
+if args.full:
+    data_store.delete("indian_sst")
 
-sst_df.to_csv("data/indian_sst.csv", index=False)
+# Only months newer than what is already stored are downloaded
+rows = ingest_sst(
+    args.source,
+    dataset="indian_sst",
+    chunk_size=24,
+    lat_range=INDIAN_LAT_RANGE,   # 25°N to 5°N
+    lon_range=INDIAN_LON_RANGE,   # 65°E to 90°E
+    incremental=True,
+)
 
-print("Completed. File saved: data/indian_sst.csv")
-print(sst_df.head())
+print("Completed. Dataset saved: data/indian_sst/")
+print("Rows:", rows)
@@ -0,0 +1,138 @@
+# src/raster_overlay.py
+# Server-side heatmap rendering. A scored grid (compute_scores or
+# TileStore.window output) is placed on its regular lat/lon grid, resampled
+# to a fixed-size image, colormapped through a 256-entry lookup table and
+# encoded as a PNG with zlib + struct, all in NumPy. The map then carries
+# one small image (folium ImageOverlay with the grid's bounds) instead of a
+# point list the browser has to run kernel density on, so payload size and
+# render time do not depend on the number of points.
+#
+# NaN cells (land, no data) are transparent.
+#
+#   python src/heatmap.py --value juv_prob --out heatmap.png
+import base64
+import functools
+import struct
+import zlib
+
+import numpy as np
+
+from spatial_index import GridIndex
+
+# Output image side in pixels (rows and columns)
+IMAGE_SIZE = 256
+
+# ColorBrewer anchor colors, interpolated to 256 entries
+COLORMAPS = {
+    "YlOrRd": [(255, 255, 204), (254, 217, 118), (253, 141, 60), (227, 26, 28), (128, 0, 38)],
+    "YlGnBu": [(255, 255, 217), (199, 233, 180), (65, 182, 196), (34, 94, 168), (8, 29, 88)],
+    "Greens": [(247, 252, 245), (199, 233, 192), (116, 196, 118), (35, 139, 69), (0, 68, 27)],
+    "RdBu_r": [(5, 48, 97), (67, 147, 195), (247, 247, 247), (214, 96, 77), (103, 0, 31)],
+}
+
+
+@functools.lru_cache(maxsize=None)
+def colormap_lut(name):
+    """(256, 3) uint8 lookup table for a named colormap."""
+    anchors = np.array(COLORMAPS[name], dtype=float)
+    pos = np.linspace(0, 1, len(anchors))
+    x = np.linspace(0, 1, 256)
+    return np.column_stack([np.interp(x, pos, anchors[:, c]) for c in range(3)]).round().astype(np.uint8)
+
+
+# ======================= GRID =======================
+def grid_values(df, column):
+    """(values, bounds) of a scored DataFrame on its regular grid.
+
+    values has shape (nlat, nlon) with NaN for cells without a row; bounds
+    are [[south, west], [north, east]] of the cell edges (ImageOverlay
+    order).
+    """
+    lats, lons = df["lat"].to_numpy(float), df["lon"].to_numpy(float)
+    grid = GridIndex.from_points(lats, lons, df[column].to_numpy(float))
+    south, west = grid.lat0 - grid.dlat / 2, grid.lon0 - grid.dlon / 2
+    north = grid.lat0 + grid.dlat * (grid.nlat - 0.5)
+    east = grid.lon0 + grid.dlon * (grid.nlon - 0.5)
+    return grid.values, [[south, west], [north, east]]
+
+
+def _axis(n_cells, n_pixels):
+    # cell-space position of each pixel center, so the image spans the cell edges
+    pos = np.clip((np.arange(n_pixels) + 0.5) * n_cells / n_pixels - 0.5, 0, n_cells - 1)
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.minimum(lo + 1, n_cells - 1)
+    return lo, hi, pos - lo
+
+
+def resample(values, size=IMAGE_SIZE, smooth=True):
+    """Bilinear (or nearest-cell) resampling of a 2-D grid to size x size."""
+    i0, i1, fi = _axis(values.shape[0], size)
+    j0, j1, fj = _axis(values.shape[1], size)
+    if not smooth:
+        return values[np.where(fi < 0.5, i0, i1)][:, np.where(fj < 0.5, j0, j1)]
+    fi, fj = fi[:, None], fj[None, :]
+    top = values[i0][:, j0] * (1 - fj) + values[i0][:, j1] * fj
+    bottom = values[i1][:, j0] * (1 - fj) + values[i1][:, j1] * fj
+    return top * (1 - fi) + bottom * fi
+
+
+# ======================= IMAGE =======================
+def colorize(values, cmap="YlOrRd", vmin=None, vmax=None, opacity=0.7):
+    """RGBA uint8 image of a 2-D array, north up (row 0 = highest latitude)."""
+    finite = np.isfinite(values)
+    if vmin is None:
+        vmin = float(np.min(values[finite])) if finite.any() else 0.0
+    if vmax is None:
+        vmax = float(np.max(values[finite])) if finite.any() else 1.0
+    scaled = (np.where(finite, values, vmin) - vmin) / max(vmax - vmin, 1e-12)
+    index = np.clip(scaled * 255, 0, 255).round().astype(np.uint8)
+    rgba = np.empty(values.shape + (4,), dtype=np.uint8)
+    rgba[..., :3] = colormap_lut(cmap)[index]
+    rgba[..., 3] = np.where(finite, round(opacity * 255), 0)
+    return rgba[::-1]
+
+
+def _png_chunk(tag, data):
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+
+def encode_png(rgba, level=6):
+    """PNG bytes of an (h, w, 4) uint8 image (8-bit RGBA, no filtering)."""
+    h, w, _ = rgba.shape
+    raw = np.zeros((h, w * 4 + 1), dtype=np.uint8)  # leading 0 = filter type "none" per row
+    raw[:, 1:] = rgba.reshape(h, w * 4)
+    header = struct.pack(">IIBBBBB", w, h, 8, 6, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", header)
+            + _png_chunk(b"IDAT", zlib.compress(raw.tobytes(), level)) + _png_chunk(b"IEND", b""))
+
+
+def data_url(png):
+    return "data:image/png;base64," + base64.b64encode(png).decode("ascii")
+
+
+def render(df, column, cmap="YlOrRd", vmin=None, vmax=None, opacity=0.7, size=IMAGE_SIZE, smooth=True):
+    """(PNG bytes, bounds) for one column of a scored grid."""
+    values, bounds = grid_values(df, column)
+    rgba = colorize(resample(values, size, smooth), cmap, vmin, vmax, opacity)
+    return encode_png(rgba), bounds
+
+
+def add_overlay(m, df, column, cmap="YlOrRd", vmin=None, vmax=None, opacity=0.7, name=None, **kwargs):
+    """Add the rendered column to a folium map as an ImageOverlay; returns it."""
+    import folium
+
+    png, bounds = render(df, column, cmap, vmin, vmax, opacity, **kwargs)
+    overlay = folium.raster_layers.ImageOverlay(image=data_url(png), bounds=bounds, name=name or column,
+                                                interactive=False, zindex=1)
+    overlay.add_to(m)
+    return overlay
+
+
+# ======================= LEGEND =======================
+@functools.lru_cache(maxsize=64)
+def legend_png(cmap="YlOrRd", width=256, height=14):
+    """Horizontal color bar (low values left) as PNG bytes, built once per colormap."""
+    rgba = np.empty((height, width, 4), dtype=np.uint8)
+    rgba[..., :3] = colormap_lut(cmap)[np.linspace(0, 255, width).round().astype(np.uint8)]
+    rgba[..., 3] = 255
+    return encode_png(rgba)
@@ -0,0 +1,8 @@
+# src/regions.py
+# Geographic constants shared by the data, ingestion and map scripts. Kept
+# free of heavy imports so light scripts (e.g. generate_dataset.py) can use
+# them without pulling in xarray / pyarrow.
+
+# Indian EEZ window (OISST latitude runs north -> south)
+INDIAN_LAT_RANGE = (25, 5)
+INDIAN_LON_RANGE = (65, 90)
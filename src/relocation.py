@@ -0,0 +1,255 @@
+# src/relocation.py
+# Nearest-safe-zone search behind the "move N km" advice.
+#
+# Works on a regular grid of precomputed scores (a zoom level of the risk
+# tiles, or a compute_scores grid). A cell is "safe" when its juvenile risk
+# is low and fish are predicted available. Two queries, both answered in
+# milliseconds so they can run for every boat of a fleet on each update:
+#
+#   nearest(lat, lon, k, max_km)  the k closest safe cells: best-first over
+#       rings of cells around the boat's cell (GridIndex arithmetic), with a
+#       bounded heap of the k best; stops as soon as no further ring can be
+#       closer than the k-th best found.
+#   best(lat, lon, k, max_km)     the k safe cells with the highest expected
+#       quantity within max_km: only the bounding box of the travel radius
+#       is sliced out of the grid.
+#
+#   python src/relocation.py --lat 15.2 --lon 83.1 --max-km 25
+import argparse
+import heapq
+import math
+
+import numpy as np
+import pandas as pd
+
+from spatial_index import GridIndex, haversine_km
+
+# Thresholds of the map app's "recommended safe points"
+MAX_JUVENILE_PROB = 0.4
+MIN_AVAILABILITY_PROB = 0.5
+KM_PER_DEG_LAT = 111.32
+# advise_move never suggests a spot closer than this
+MIN_MOVE_KM = 1.0
+
+# Coordinates of the fishing hubs named in the apps
+PORT_COORDS = {
+    "Vizag": (17.69, 83.22),
+    "Kakinada": (16.99, 82.25),
+    "Machilipatnam": (16.17, 81.13),
+    "Chennai": (13.08, 80.27),
+    "Nellore": (14.44, 79.99),
+    "Goa": (15.40, 73.80),
+    "Mangalore": (12.87, 74.84),
+    "Kochi": (9.97, 76.24),
+}
+
+COMPASS = ["N", "NE", "E", "SE", "S", "SW", "W", "NW"]
+
+
+def bearing_deg(lat1, lon1, lat2, lon2):
+    """Initial great-circle bearing from point 1 to point 2 (0 = north)."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    x = np.sin(lon2 - lon1) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(lon2 - lon1)
+    return (np.degrees(np.arctan2(x, y)) + 360) % 360
+
+
+def compass(bearing):
+    return COMPASS[int((bearing + 22.5) // 45) % 8]
+
+
+class SafeZoneIndex:
+    """Safe-cell search over one regular grid of avail_prob / juv_prob / qty.
+
+    available (optional) overrides avail_prob >= min_avail, e.g. with the
+    post-rule availability column of compute_scores. confidence (optional,
+    the compute_scores column of the same name) excludes cells whose
+    prediction is less certain than min_confidence.
+    """
+
+    def __init__(self, grid, avail_prob, juv_prob, qty, available=None,
+                 max_juv=MAX_JUVENILE_PROB, min_avail=MIN_AVAILABILITY_PROB,
+                 confidence=None, min_confidence=0.0):
+        self.grid = grid
+        self.avail_prob = avail_prob
+        self.juv_prob = juv_prob
+        self.qty = qty
+        self.confidence = confidence
+        if available is None:
+            available = avail_prob >= min_avail
+        self.safe = (juv_prob < max_juv) & available
+        if confidence is not None:
+            self.safe &= confidence >= min_confidence
+        self._lat_axis = grid.lats
+        self._lon_axis = grid.lons
+
+    @classmethod
+    def from_scores(cls, df, **thresholds):
+        """From a compute_scores / TileStore.window DataFrame on a regular grid."""
+        grid = GridIndex.from_points(df["lat"].to_numpy(), df["lon"].to_numpy())
+        i, j = grid.cell(df["lat"].to_numpy(), df["lon"].to_numpy())
+
+        def place(values, fill=np.nan):
+            out = np.full((grid.nlat, grid.nlon), fill, dtype=np.asarray(values).dtype)
+            out[i, j] = values
+            return out
+
+        available = place(df["availability"].to_numpy() == 1, False) if "availability" in df.columns else None
+        if "confidence" in df.columns:
+            thresholds.setdefault("confidence", place(df["confidence"].to_numpy(float)))
+        return cls(grid, place(df["avail_prob"].to_numpy(float)), place(df["juv_prob"].to_numpy(float)),
+                   place(df["qty"].to_numpy(float)), available, **thresholds)
+
+    @classmethod
+    def from_tiles(cls, store, zoom=None, **thresholds):
+        """From one zoom level of a risk_tiles.TileStore (the finest by default)."""
+        if zoom is None:
+            zoom = min(store.index["zooms"], key=lambda z: store.index["zooms"][z]["step"])
+        layers, meta = store.grid(zoom)
+        grid = GridIndex(meta["lat0"], meta["lon0"], meta["step"], meta["step"], meta["nlat"], meta["nlon"])
+        by_name = dict(zip(store.layers, layers))
+        return cls(grid, by_name["avail_prob"], by_name["juv_prob"], by_name["qty"], **thresholds)
+
+    # ---------------- geometry ----------------
+    def _cell_km(self, lat, max_km):
+        # smallest cell side (km) anywhere within max_km of lat
+        worst_lat = min(abs(lat) + max_km / KM_PER_DEG_LAT, 89.0)
+        return min(self.grid.dlat * KM_PER_DEG_LAT,
+                   self.grid.dlon * KM_PER_DEG_LAT * math.cos(math.radians(worst_lat)))
+
+    def _rows(self, i, j, distance, lat, lon):
+        lats, lons = self._lat_axis[i], self._lon_axis[j]
+        bearing = bearing_deg(lat, lon, lats, lons)
+        rows = pd.DataFrame({
+            "lat": lats, "lon": lons, "distance_km": distance,
+            "bearing_deg": bearing, "direction": [compass(b) for b in bearing],
+            "avail_prob": self.avail_prob[i, j].astype(float),
+            "juv_prob": self.juv_prob[i, j].astype(float),
+            "qty": self.qty[i, j].astype(float),
+        })
+        if self.confidence is not None:
+            rows["confidence"] = self.confidence[i, j].astype(float)
+        return rows
+
+    def _ring(self, ci, cj, r):
+        """Row/column indices of the cells at Chebyshev distance r from (ci, cj)."""
+        if r == 0:
+            return np.array([ci]), np.array([cj])
+        side = np.arange(-r, r + 1)
+        i = np.concatenate([np.full(side.size, ci - r), np.full(side.size, ci + r),
+                            ci + side[1:-1], ci + side[1:-1]])
+        j = np.concatenate([cj + side, cj + side, np.full(side.size - 2, cj - r), np.full(side.size - 2, cj + r)])
+        inside = (i >= 0) & (i < self.grid.nlat) & (j >= 0) & (j < self.grid.nlon)
+        return i[inside], j[inside]
+
+    # ---------------- queries ----------------
+    def is_safe(self, lat, lon):
+        """Whether the cell containing (lat, lon) is safe (False off the grid)."""
+        i, j = self.grid.cell([lat], [lon], clip=False)
+        return bool(i[0] >= 0 and self.safe[i[0], j[0]])
+
+    def nearest(self, lat, lon, k=3, max_km=25.0, min_km=0.0, exclude_own_cell=False):
+        """The k closest safe cells between min_km and max_km, closest first.
+
+        exclude_own_cell leaves out the cell containing (lat, lon), e.g. when
+        the current spot has just been judged unsafe.
+        """
+        ci, cj = (int(v[0]) for v in self.grid.cell([lat], [lon]))
+        cell_km = self._cell_km(lat, max_km)
+        max_ring = int(math.ceil(max_km / cell_km)) + 1
+        heap = []  # bounded max-heap of (-distance, i, j)
+        for r in range(max_ring + 1):
+            # no cell of ring r (or beyond) can be closer than this
+            lower = max(r - 1, 0) * cell_km
+            if lower > max_km or (len(heap) == k and lower > -heap[0][0]):
+                break
+            if r == 0 and exclude_own_cell:
+                continue
+            i, j = self._ring(ci, cj, r)
+            keep = self.safe[i, j]
+            if not keep.any():
+                continue
+            i, j = i[keep], j[keep]
+            dist = haversine_km(lat, lon, self._lat_axis[i], self._lon_axis[j])
+            for d, ii, jj in zip(dist, i, j):
+                if d > max_km or d < min_km:
+                    continue
+                if len(heap) < k:
+                    heapq.heappush(heap, (-d, ii, jj))
+                elif d < -heap[0][0]:
+                    heapq.heapreplace(heap, (-d, ii, jj))
+        found = sorted((-d, ii, jj) for d, ii, jj in heap)
+        return self._rows(np.array([f[1] for f in found], dtype=np.intp),
+                          np.array([f[2] for f in found], dtype=np.intp),
+                          np.array([f[0] for f in found]), lat, lon)
+
+    def best(self, lat, lon, k=3, max_km=25.0):
+        """The k safe cells with the highest expected quantity within max_km
+        (ties go to the closer cell)."""
+        dlat = max_km / KM_PER_DEG_LAT
+        dlon = max_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(min(abs(lat) + dlat, 89.0))), 1e-6))
+        i0, j0 = (int(v[0]) for v in self.grid.cell([lat - dlat], [lon - dlon]))
+        i1, j1 = (int(v[0]) for v in self.grid.cell([lat + dlat], [lon + dlon]))
+        ii, jj = np.nonzero(self.safe[i0:i1 + 1, j0:j1 + 1])
+        ii, jj = ii + i0, jj + j0
+        dist = haversine_km(lat, lon, self._lat_axis[ii], self._lon_axis[jj])
+        within = dist <= max_km
+        ii, jj, dist = ii[within], jj[within], dist[within]
+        if len(ii) > k:
+            top = np.argpartition(-self.qty[ii, jj], k - 1)[:k]
+            ii, jj, dist = ii[top], jj[top], dist[top]
+        order = np.lexsort((dist, -self.qty[ii, jj]))
+        return self._rows(ii[order], jj[order], dist[order], lat, lon)
+
+    def search_fleet(self, lats, lons, k=1, max_km=25.0, rank="nearest"):
+        """One query per boat; returns the rows of all boats with a boat column."""
+        query = self.nearest if rank == "nearest" else self.best
+        parts = []
+        for boat, (lat, lon) in enumerate(zip(lats, lons)):
+            rows = query(lat, lon, k, max_km)
+            rows.insert(0, "boat", boat)
+            parts.append(rows)
+        return pd.concat(parts, ignore_index=True)
+
+
+def advise_move(index, lat, lon, max_km=25.0, min_km=MIN_MOVE_KM):
+    """Advice for a boat whose current spot was just judged not recommended
+    from its own inputs: the boat's cell is never suggested, and the advice
+    is marked when the index's precomputed scores rate that cell safe (they
+    disagree with the decision, so treat them with care)."""
+    found = index.nearest(lat, lon, k=1, max_km=max_km, min_km=min_km, exclude_own_cell=True)
+    text = advice(found, max_km)
+    if len(found) and index.is_safe(lat, lon):
+        text += (" Note: the precomputed map rates your current spot as safe, unlike your readings,"
+                 " so check conditions there before moving.")
+    return text
+
+
+def advice(suggestions, max_km):
+    """One-line relocation advice for the top suggestion."""
+    if not len(suggestions):
+        return f"No low-risk zone with predicted fish within {max_km:.0f} km — stay in port or try later."
+    top = suggestions.iloc[0]
+    return (f"Move {top.distance_km:.1f} km {top.direction} to ({top.lat:.2f}, {top.lon:.2f}): "
+            f"juvenile risk {top.juv_prob:.2f}, availability {top.avail_prob:.2f}, ~{top.qty:.0f} kg expected.")
+
+
+if __name__ == "__main__":
+    from risk_tiles import TileStore
+
+    parser = argparse.ArgumentParser(description="Nearest safe fishing zones from the precomputed risk tiles")
+    parser.add_argument("--lat", type=float, required=True)
+    parser.add_argument("--lon", type=float, required=True)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--max-km", type=float, default=25.0)
+    parser.add_argument("--rank", choices=["nearest", "best"], default="nearest")
+    parser.add_argument("--zoom", help="tile zoom level (default: finest built)")
+    args = parser.parse_args()
+
+    if not TileStore.available():
+        raise SystemExit("❌ No risk tiles found; build them with risk_tiles.py first")
+    index = SafeZoneIndex.from_tiles(TileStore(), args.zoom)
+    query = index.nearest if args.rank == "nearest" else index.best
+    found = query(args.lat, args.lon, args.k, args.max_km)
+    print(found.to_string(index=False) if len(found) else "No safe zone found")
+    print("➡", advice(found, args.max_km))
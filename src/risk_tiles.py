@@ -0,0 +1,191 @@
+# src/risk_tiles.py
+# Precomputed risk tiles for the map heatmap.
+#
+# The whole Indian EEZ window is scored offline at a few zoom levels (grid
+# steps). Each zoom level is cut into TILE_SIZE x TILE_SIZE tiles, stored as
+# float16 .npy arrays of shape (layers, rows, cols) next to a JSON index.
+# map_app then only slices the tiles covering the requested window, so the
+# heatmap no longer depends on model speed or grid resolution.
+#
+#   python src/risk_tiles.py              # build zoom levels 0-2
+#   python src/risk_tiles.py --zooms 0 1  # coarse levels only
+import argparse
+import json
+import math
+import os
+import shutil
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+import data_store
+import model_registry
+from grid_scoring import compute_scores
+from regions import INDIAN_LAT_RANGE, INDIAN_LON_RANGE
+from sst_raster import SSTRaster
+
+TILES_DIR = os.path.join(data_store.DATA_DIR, "risk_tiles")
+INDEX_FILE = "index.json"
+
+LAT_RANGE = (min(INDIAN_LAT_RANGE), max(INDIAN_LAT_RANGE))
+LON_RANGE = (min(INDIAN_LON_RANGE), max(INDIAN_LON_RANGE))
+
+# zoom level -> grid step in degrees (0.25 deg ~ 28 km, 0.02 deg ~ 2 km)
+ZOOM_STEPS = {0: 0.25, 1: 0.1, 2: 0.05, 3: 0.02}
+TILE_SIZE = 256
+
+# Stored layers, named like the compute_scores columns
+LAYERS = ("avail_prob", "qty", "juv_prob")
+
+
+# ======================= BUILD =======================
+def _axis(lo, hi, step):
+    return lo + step * np.arange(int(round((hi - lo) / step)) + 1)
+
+
+def _latest_sst_lookup():
+    # Score with the latest month of real SST when the raster has been built
+    if not SSTRaster.available():
+        return None
+    return SSTRaster().bilinear
+
+
+def build_zoom(zoom, out_dir, models, sst_lookup=None, chunk_size=65536):
+    """Score one zoom level and write its tiles; returns the index entry."""
+    step = ZOOM_STEPS[zoom]
+    lats = _axis(*LAT_RANGE, step)
+    lons = _axis(*LON_RANGE, step)
+    zoom_dir = os.path.join(out_dir, str(zoom))
+    os.makedirs(zoom_dir, exist_ok=True)
+
+    tiles = []
+    # one band of tile rows at a time keeps memory bounded on fine zooms
+    for ti, r0 in enumerate(range(0, len(lats), TILE_SIZE)):
+        band_lats = lats[r0:r0 + TILE_SIZE]
+        lat_grid, lon_grid = np.meshgrid(band_lats, lons, indexing="ij")
+        scores = compute_scores(models["availability"], models["quantity"], models["juvenile"],
+                                lat_grid.ravel(), lon_grid.ravel(),
+                                chunk_size=chunk_size, sst_lookup=sst_lookup)
+        band = np.stack([scores[layer].to_numpy().reshape(lat_grid.shape) for layer in LAYERS])
+        for tj, c0 in enumerate(range(0, len(lons), TILE_SIZE)):
+            tile = band[:, :, c0:c0 + TILE_SIZE].astype(np.float16)
+            np.save(os.path.join(zoom_dir, f"{ti}_{tj}.npy"), tile)
+            tiles.append([ti, tj])
+
+    return {"step": step, "lat0": float(lats[0]), "lon0": float(lons[0]),
+            "nlat": len(lats), "nlon": len(lons), "tiles": tiles}
+
+
+def build_tiles(zooms=(0, 1, 2), out_dir=TILES_DIR, use_real_sst=True):
+    """Build every zoom level into a fresh directory and swap it in."""
+    models = {name: model_registry.load_model(name) for name in ("availability", "quantity", "juvenile")}
+    sst_lookup = _latest_sst_lookup() if use_real_sst else None
+
+    tmp_dir = out_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    index = {
+        "lat_range": LAT_RANGE, "lon_range": LON_RANGE,
+        "tile_size": TILE_SIZE, "layers": list(LAYERS), "dtype": "float16",
+        "real_sst": sst_lookup is not None,
+        "built": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "zooms": {},
+    }
+    for zoom in zooms:
+        start = time.perf_counter()
+        index["zooms"][str(zoom)] = build_zoom(zoom, tmp_dir, models, sst_lookup)
+        z = index["zooms"][str(zoom)]
+        print(f"🧱 zoom {zoom}: {z['nlat']}x{z['nlon']} cells, {len(z['tiles'])} tiles "
+              f"in {time.perf_counter() - start:.1f}s")
+    with open(os.path.join(tmp_dir, INDEX_FILE), "w") as f:
+        json.dump(index, f, indent=1)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return index
+
+
+# ======================= READ =======================
+class TileStore:
+    """Read side of the tile store: picks a zoom level and slices windows."""
+
+    def __init__(self, tiles_dir=TILES_DIR):
+        self.tiles_dir = tiles_dir
+        with open(os.path.join(tiles_dir, INDEX_FILE)) as f:
+            self.index = json.load(f)
+        self.tile_size = self.index["tile_size"]
+        self.layers = self.index["layers"]
+        self._load_tile = lru_cache(maxsize=256)(self._read_tile)
+
+    @staticmethod
+    def available(tiles_dir=TILES_DIR):
+        return os.path.exists(os.path.join(tiles_dir, INDEX_FILE))
+
+    def covers(self, lat_min, lat_max, lon_min, lon_max):
+        (la0, la1), (lo0, lo1) = self.index["lat_range"], self.index["lon_range"]
+        return la0 <= lat_min and lat_max <= la1 and lo0 <= lon_min and lon_max <= lo1
+
+    def pick_zoom(self, spacing_deg):
+        """Coarsest zoom level that is at least as fine as the requested spacing,
+        or None when every level built is coarser (score on the fly instead)."""
+        zooms = sorted(self.index["zooms"].items(), key=lambda kv: -kv[1]["step"])
+        for zoom, meta in zooms:
+            # small tolerance: 0.05 must match a requested 0.05 despite rounding
+            if meta["step"] <= spacing_deg * (1 + 1e-6):
+                return zoom
+        return None
+
+    def _read_tile(self, zoom, ti, tj):
+        return np.load(os.path.join(self.tiles_dir, zoom, f"{ti}_{tj}.npy"), mmap_mode="r")
+
+    def grid(self, zoom):
+        """Whole zoom level as one float32 array (layers, nlat, nlon) plus its
+        index entry (lat0, lon0, step, nlat, nlon)."""
+        meta = self.index["zooms"][str(zoom)]
+        T = self.tile_size
+        out = np.empty((len(self.layers), meta["nlat"], meta["nlon"]), dtype=np.float32)
+        for ti, tj in meta["tiles"]:
+            tile = self._load_tile(str(zoom), ti, tj)
+            out[:, ti * T:ti * T + tile.shape[1], tj * T:tj * T + tile.shape[2]] = tile
+        return out, meta
+
+    def window(self, lat_min, lat_max, lon_min, lon_max, zoom):
+        """Cells of one zoom level inside the window as a compute_scores-style
+        DataFrame (lat, lon, avail_prob, juv_prob, qty)."""
+        meta = self.index["zooms"][str(zoom)]
+        step, T = meta["step"], self.tile_size
+        i0 = max(math.ceil((lat_min - meta["lat0"]) / step - 1e-9), 0)
+        i1 = min(math.floor((lat_max - meta["lat0"]) / step + 1e-9), meta["nlat"] - 1)
+        j0 = max(math.ceil((lon_min - meta["lon0"]) / step - 1e-9), 0)
+        j1 = min(math.floor((lon_max - meta["lon0"]) / step + 1e-9), meta["nlon"] - 1)
+        if i1 < i0 or j1 < j0:
+            return pd.DataFrame(columns=["lat", "lon"] + self.layers)
+
+        out = np.empty((len(self.layers), i1 - i0 + 1, j1 - j0 + 1), dtype=np.float32)
+        for ti in range(i0 // T, i1 // T + 1):
+            for tj in range(j0 // T, j1 // T + 1):
+                tile = self._load_tile(str(zoom), ti, tj)
+                r0, r1 = max(i0, ti * T), min(i1, ti * T + T - 1)
+                c0, c1 = max(j0, tj * T), min(j1, tj * T + T - 1)
+                out[:, r0 - i0:r1 - i0 + 1, c0 - j0:c1 - j0 + 1] = \
+                    tile[:, r0 - ti * T:r1 - ti * T + 1, c0 - tj * T:c1 - tj * T + 1]
+
+        lat_grid, lon_grid = np.meshgrid(meta["lat0"] + step * np.arange(i0, i1 + 1),
+                                         meta["lon0"] + step * np.arange(j0, j1 + 1), indexing="ij")
+        df = pd.DataFrame({"lat": lat_grid.ravel(), "lon": lon_grid.ravel()})
+        for k, layer in enumerate(self.layers):
+            df[layer] = out[k].ravel().astype(np.float64)
+        return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute heatmap risk tiles for the Indian EEZ")
+    parser.add_argument("--zooms", nargs="+", type=int, default=[0, 1, 2], choices=sorted(ZOOM_STEPS))
+    parser.add_argument("--synthetic-sst", action="store_true", help="ignore clean_sst and use the synthetic field")
+    args = parser.parse_args()
+
+    print("🗺️ Building risk tiles...")
+    build_tiles(args.zooms, use_real_sst=not args.synthetic_sst)
+    print(f"✅ Tiles written to {TILES_DIR}")
@@ -0,0 +1,156 @@
+# src/rules.py
+# Declarative hybrid decision rules. Each rule is plain data: conditions on
+# input or prediction columns and actions on the predictions. Rules are
+# compiled once into functions that build NumPy boolean masks, so a batch of
+# any size (one Streamlit click, an HTTP batch, a heatmap grid) is decided
+# with a handful of vectorized operations.
+#
+# Rule keys:
+#   name       label used in firing counts
+#   all        {column: [low, high]} - every range must hold (None = open end)
+#   score      {column: [low, high]} with min_score - at least min_score of
+#              the ranges must hold ("conditions are mostly good")
+#   match      {column: [values]}    - every column value must be in its set
+#   unless     {column: [values]}    - the rule is skipped where any matches
+#   set        {column: value}       - assign where the rule fires
+#   at_least   {column: value}       - raise to at least value where it fires
+#
+# Columns are looked up in the predictions first, then in the inputs; a
+# rule that needs a column the batch does not have never fires. Rules run in
+# order, each seeing the previous rules' actions. Set FISH_RULES_FILE to a
+# JSON list of rules to replace the defaults.
+import json
+import os
+
+import numpy as np
+
+import instrumentation
+
+PRIME_LOCATIONS = ["Vizag", "Kakinada", "Chennai", "Goa", "Kochi", "Nellore", "Mangalore"]
+
+DEFAULT_RULES = [
+    # Rule 1: If environment conditions are mostly good -> force YES
+    {
+        "name": "good_conditions",
+        "score": {"SST": [22, 30], "Salinity": [30, 36], "Dissolved_Oxygen": [5, 8],
+                  "Historical_Catch": [150, None]},
+        "min_score": 3,
+        "unless": {"juvenile_risk": ["High"]},
+        "set": {"availability": 1},
+        "at_least": {"quantity": 200},
+    },
+    # Rule 2: Override for major fishing hubs
+    {
+        "name": "prime_location",
+        "match": {"Location": PRIME_LOCATIONS, "availability": [0]},
+        "set": {"availability": 1},
+        "at_least": {"quantity": 220},
+    },
+]
+
+RULES_FILE = os.environ.get("FISH_RULES_FILE")
+
+_KEYS = {"name", "all", "score", "min_score", "match", "unless", "set", "at_least"}
+
+
+class _Missing(Exception):
+    pass
+
+
+def _column(frames, name):
+    for frame in frames:
+        if name in frame.columns:
+            return frame[name].to_numpy()
+    raise _Missing(name)
+
+
+def _in_range(values, bounds):
+    low, high = bounds
+    values = values.astype(float)
+    mask = np.ones(len(values), dtype=bool)
+    if low is not None:
+        mask &= values >= low
+    if high is not None:
+        mask &= values <= high
+    return mask
+
+
+def _in_set(values, allowed):
+    return np.isin(values.astype(object), list(allowed))
+
+
+def compile_rule(rule):
+    """Turn a rule dict into mask(frames) -> bool array."""
+    unknown = set(rule) - _KEYS
+    if unknown:
+        raise ValueError(f"Unknown rule keys in {rule.get('name', rule)}: {', '.join(sorted(unknown))}")
+    if "score" in rule and "min_score" not in rule:
+        raise ValueError(f"Rule {rule['name']}: score needs min_score")
+
+    def mask(frames, n):
+        fires = np.ones(n, dtype=bool)
+        for name, bounds in rule.get("all", {}).items():
+            fires &= _in_range(_column(frames, name), bounds)
+        if "score" in rule:
+            score = sum(_in_range(_column(frames, name), bounds).astype(int)
+                        for name, bounds in rule["score"].items())
+            fires &= score >= rule["min_score"]
+        for name, allowed in rule.get("match", {}).items():
+            fires &= _in_set(_column(frames, name), allowed)
+        for name, blocked in rule.get("unless", {}).items():
+            fires &= ~_in_set(_column(frames, name), blocked)
+        return fires
+
+    return mask
+
+
+def load_rules(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+class RuleEngine:
+    def __init__(self, rules=None):
+        self.rules = list(rules if rules is not None else DEFAULT_RULES)
+        self._masks = [compile_rule(rule) for rule in self.rules]
+
+    def evaluate(self, inputs, preds):
+        """Apply every rule to a batch.
+
+        inputs holds the feature columns (and optionally Location), preds
+        the model outputs with the same index. Returns (new preds, {rule
+        name: rows it fired on in this batch}). Totals across calls go to
+        instrumentation (rule_fired), so one engine can be shared by
+        concurrent sessions and threads.
+        """
+        out = preds.copy()
+        fired = {}
+        for rule, mask in zip(self.rules, self._masks):
+            try:
+                fires = mask((out, inputs), len(out))
+            except _Missing:
+                fires = np.zeros(len(out), dtype=bool)
+            for name, value in rule.get("set", {}).items():
+                out[name] = np.where(fires, value, out[name].to_numpy())
+            for name, value in rule.get("at_least", {}).items():
+                current = out[name].to_numpy()
+                out[name] = np.where(fires, np.maximum(current, value), current)
+            count = int(fires.sum())
+            fired[rule["name"]] = count
+            if count:
+                instrumentation.incr("rule_fired", count, rule=rule["name"])
+        return out, fired
+
+    def apply(self, inputs, preds):
+        return self.evaluate(inputs, preds)[0]
+
+
+_default = None
+
+
+def default_engine():
+    """Engine for the default rules (or FISH_RULES_FILE), built once."""
+    global _default
+    if _default is None:
+        _default = RuleEngine(load_rules(RULES_FILE) if RULES_FILE else None)
+    return _default
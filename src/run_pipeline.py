@@ -0,0 +1,246 @@
+# src/run_pipeline.py
+# Incremental runner for the data + training scripts. Each stage declares
+# the datasets / model files it reads and writes; inputs are content-hashed
+# and a stage is skipped when its script and inputs are unchanged since its
+# last successful run. Stages whose inputs are ready run in parallel.
+#
+#   python src/run_pipeline.py                 # run what is out of date
+#   python src/run_pipeline.py --source sst.nc # ingest from a local NetCDF
+#   python src/run_pipeline.py --force --only train
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import climatology
+import data_store
+import model_registry
+import sst_raster
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+STATE_FILE = os.path.join(data_store.DATA_DIR, ".pipeline_state.json")
+
+
+class Stage:
+    def __init__(self, name, script, inputs, outputs, args=(), always_run=False):
+        self.name = name
+        self.script = script
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.args = list(args)
+        # stages reading external sources (NOAA server) cannot be hashed;
+        # they always run and rely on incremental loading instead
+        self.always_run = always_run
+
+
+def dataset(name):
+    return data_store.dataset_path(name)
+
+
+def model(name):
+    return model_registry.artifact_path(name)
+
+
+TRAINED_MODELS = ["availability", "quantity", "xgb_availability", "xgb_quantity",
+                  "pca", "hybrid_availability", "hybrid_quantity"]
+
+
+def build_stages(source=None, out_of_core=False):
+    return [
+        Stage("ingest", "process_noaa_data.py", [], [dataset("indian_sst")],
+              args=[os.path.abspath(source)] if source else [], always_run=True),
+        Stage("prepare", "prepare_real_dataset.py", [dataset("indian_sst")],
+              [dataset("clean_sst"), climatology.CLIMATOLOGY_PATH]),
+        Stage("merge", "merge_real_data.py", [dataset("indian_sst"), dataset("clean_sst")],
+              [dataset("final_training_data")]),
+        Stage("fix", "fix_dataset.py", [dataset("final_training_data")], [dataset("final_training_data_fixed")]),
+        Stage("train", "train_out_of_core.py" if out_of_core else "model_training.py",
+              [dataset("final_training_data_fixed")],
+              [model(n) for n in TRAINED_MODELS]),
+        Stage("juvenile", "juvenile_risk_model.py", [], [model("juvenile")]),
+        Stage("export_flat", "export_flat_models.py",
+              [model(n) for n in model_registry.FLAT_ARTIFACTS], [model_registry.FLAT_DIR]),
+        Stage("compact", "compact_models.py",
+              [model(n) for n in model_registry.FLAT_ARTIFACTS], [model_registry.COMPACT_DIR]),
+        Stage("raster", "sst_raster.py", [dataset("clean_sst")], [sst_raster.RASTER_PATH]),
+        Stage("tiles", "risk_tiles.py",
+              [sst_raster.RASTER_PATH] + [model(n) for n in ("availability", "quantity", "juvenile")],
+              [dataset("risk_tiles")]),
+    ]
+
+
+# ======================= HASHING =======================
+class Hasher:
+    """sha256 of files and directories, memoized on (size, mtime) per file."""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.lock = threading.Lock()
+
+    def file_hash(self, path):
+        st = os.stat(path)
+        with self.lock:
+            cached = self.cache.get(path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        with self.lock:
+            self.cache[path] = [st.st_size, st.st_mtime_ns, digest]
+        return digest
+
+    def path_hash(self, path):
+        if os.path.isfile(path):
+            return self.file_hash(path)
+        if not os.path.isdir(path):
+            return None
+        h = hashlib.sha256()
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for fn in sorted(filenames):
+                if fn.startswith("."):
+                    continue
+                full = os.path.join(dirpath, fn)
+                h.update(os.path.relpath(full, path).encode())
+                h.update(self.file_hash(full).encode())
+        return h.hexdigest()
+
+    def signature(self, stage):
+        h = hashlib.sha256(self.file_hash(os.path.join(SRC_DIR, stage.script)).encode())
+        h.update(json.dumps(stage.args).encode())
+        for path in stage.inputs:
+            h.update(path.encode())
+            h.update(str(self.path_hash(path)).encode())
+        return h.hexdigest()
+
+    def outputs(self, stage):
+        return {path: self.path_hash(path) for path in stage.outputs}
+
+
+# ======================= STATE =======================
+def load_state():
+    try:
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"stages": {}, "files": {}}
+
+
+def save_state(state, lock):
+    with lock:
+        text = json.dumps(state, indent=1)
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, STATE_FILE)
+
+
+# ======================= RUNNER =======================
+def is_up_to_date(stage, hasher, record):
+    if stage.always_run or record is None:
+        return False
+    if record.get("signature") != hasher.signature(stage):
+        return False
+    # outputs must still be the ones this stage produced
+    return record.get("outputs") == hasher.outputs(stage)
+
+
+def run_stage(stage, hasher, state, force, dry_run):
+    record = state["stages"].get(stage.name)
+    if not force and is_up_to_date(stage, hasher, record):
+        return "skipped", ""
+    if dry_run:
+        return "would run", ""
+
+    for path in stage.outputs:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, os.path.join(SRC_DIR, stage.script)] + stage.args,
+                          cwd=ROOT_DIR, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    log = proc.stdout + proc.stderr
+    if proc.returncode != 0:
+        return "failed", log
+
+    record = {
+        "signature": hasher.signature(stage),
+        "outputs": hasher.outputs(stage),
+        "seconds": round(elapsed, 2),
+        "finished": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    with hasher.lock:
+        state["stages"][stage.name] = record
+    return f"ran in {elapsed:.1f}s", log
+
+
+def run_pipeline(stages, jobs=None, force=False, only=None, dry_run=False, verbose=False):
+    state = load_state()
+    hasher = Hasher(state.setdefault("files", {}))
+    state.setdefault("stages", {})
+
+    selected = {s.name for s in stages} if not only else set(only)
+    producers = {out: s.name for s in stages for out in s.outputs}
+    deps = {s.name: {producers[i] for i in s.inputs if i in producers} for s in stages}
+    by_name = {s.name: s for s in stages}
+
+    pending = [s.name for s in stages]
+    finished, failed, results = set(), set(), {}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        while pending or running:
+            for name in list(pending):
+                if deps[name] & failed:
+                    pending.remove(name)
+                    failed.add(name)
+                    results[name] = "blocked"
+                elif deps[name] <= finished:
+                    pending.remove(name)
+                    if name in selected:
+                        running[pool.submit(run_stage, by_name[name], hasher, state, force, dry_run)] = name
+                    else:
+                        finished.add(name)
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                status, log = fut.result()
+                results[name] = status
+                (failed if status == "failed" else finished).add(name)
+                print(f"[{name}] {status}")
+                if log and (verbose or status == "failed"):
+                    print(log.rstrip())
+                if not dry_run:
+                    save_state(state, hasher.lock)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the SST preprocessing and training pipeline")
+    parser.add_argument("--source", help="local NetCDF file for the ingest stage")
+    parser.add_argument("--out-of-core", action="store_true",
+                        help="train with train_out_of_core.py (streams the training table in chunks)")
+    parser.add_argument("--only", nargs="+", help="run only these stages")
+    parser.add_argument("--force", action="store_true", help="run stages even if up to date")
+    parser.add_argument("--jobs", type=int, help="parallel stages (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="show what would run")
+    parser.add_argument("--verbose", action="store_true", help="print stage output")
+    args = parser.parse_args()
+
+    print("🔁 Running pipeline...")
+    results = run_pipeline(build_stages(args.source, args.out_of_core), args.jobs, args.force, args.only,
+                           args.dry_run, args.verbose)
+    if any(r in ("failed", "blocked") for r in results.values()):
+        sys.exit(1)
+    print("✅ Pipeline complete")
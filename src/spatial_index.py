@@ -0,0 +1,165 @@
+# src/spatial_index.py
+# Spatial lookups shared by the merge scripts and the map app.
+#
+# GridIndex: direct index arithmetic on a regular lat/lon grid (the OISST
+#   1° grid). Nearest-cell and bilinear lookups are O(1) per point and fully
+#   vectorized, so millions of points take milliseconds.
+# HaversineIndex: BallTree on great-circle distance for scattered points,
+#   with k-nearest and radius queries.
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km (vectorized)."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+# ======================= REGULAR GRID =======================
+def _grid_axis(coords):
+    """Origin, step and size of a regular axis given the coordinates on it."""
+    axis = np.unique(np.asarray(coords, dtype=np.float64))
+    if len(axis) == 1:
+        return axis[0], 1.0, 1
+    step = np.min(np.diff(axis))
+    n = int(round((axis[-1] - axis[0]) / step)) + 1
+    if not np.allclose((axis - axis[0]) / step, np.round((axis - axis[0]) / step), atol=1e-3):
+        raise ValueError("Coordinates are not on a regular grid")
+    return axis[0], step, n
+
+
+class GridIndex:
+    """Regular lat/lon grid with direct index lookup.
+
+    values (optional) has shape (nlat, nlon); NaN marks missing cells
+    (e.g. land in OISST).
+    """
+
+    def __init__(self, lat0, lon0, dlat, dlon, nlat, nlon, values=None):
+        self.lat0, self.lon0 = float(lat0), float(lon0)
+        self.dlat, self.dlon = float(dlat), float(dlon)
+        self.nlat, self.nlon = int(nlat), int(nlon)
+        self.values = values
+        self._nearest_valid = None
+
+    @classmethod
+    def from_points(cls, lats, lons, values=None):
+        """Infer the grid from points lying on it and (optionally) place values."""
+        lat0, dlat, nlat = _grid_axis(lats)
+        lon0, dlon, nlon = _grid_axis(lons)
+        index = cls(lat0, lon0, dlat, dlon, nlat, nlon)
+        if values is not None:
+            grid = np.full((nlat, nlon), np.nan)
+            i, j = index.cell(lats, lons)
+            grid[i, j] = values
+            index.values = grid
+        return index
+
+    @property
+    def lats(self):
+        return self.lat0 + self.dlat * np.arange(self.nlat)
+
+    @property
+    def lons(self):
+        return self.lon0 + self.dlon * np.arange(self.nlon)
+
+    def contains(self, lats, lons, margin=0.5):
+        """True for points within margin cells of the outermost cell centres
+        (0.5 = the grid's outer cell edges)."""
+        fi = (np.asarray(lats, dtype=np.float64) - self.lat0) / self.dlat
+        fj = (np.asarray(lons, dtype=np.float64) - self.lon0) / self.dlon
+        return (fi >= -margin) & (fi <= self.nlat - 1 + margin) & (fj >= -margin) & (fj <= self.nlon - 1 + margin)
+
+    def cell(self, lats, lons, clip=True):
+        """Row/column of the nearest grid cell (clipped to the grid; with
+        clip=False points off the grid get -1 for both)."""
+        i = np.rint((np.asarray(lats, dtype=np.float64) - self.lat0) / self.dlat).astype(np.intp)
+        j = np.rint((np.asarray(lons, dtype=np.float64) - self.lon0) / self.dlon).astype(np.intp)
+        if not clip:
+            off = ~self.contains(lats, lons)
+            return np.where(off, -1, i), np.where(off, -1, j)
+        return np.clip(i, 0, self.nlat - 1), np.clip(j, 0, self.nlon - 1)
+
+    def _mask_outside(self, values, lats, lons, outside, margin):
+        if outside is None:
+            return values
+        return np.where(self.contains(lats, lons, margin), values, outside)
+
+    def nearest(self, lats, lons, outside=np.nan, margin=0.5):
+        """Value of the nearest cell (NaN where that cell is missing).
+
+        Points more than margin cells beyond the grid get outside (None
+        clamps them to the edge cells instead).
+        """
+        i, j = self.cell(lats, lons)
+        return self._mask_outside(self.values[i, j], lats, lons, outside, margin)
+
+    def nearest_valid_cell(self, lats, lons):
+        """Row/column of the nearest cell that has a value.
+
+        A lookup table mapping every cell to its nearest valid cell is built
+        once (haversine BallTree over valid cells), so queries stay O(1).
+        """
+        if self._nearest_valid is None:
+            lat_grid, lon_grid = np.meshgrid(self.lats, self.lons, indexing="ij")
+            valid = ~np.isnan(self.values)
+            tree = HaversineIndex(lat_grid[valid], lon_grid[valid])
+            _, idx = tree.query(lat_grid.ravel(), lon_grid.ravel(), k=1)
+            self._nearest_valid = np.flatnonzero(valid.ravel())[idx[:, 0]]
+        i, j = self.cell(lats, lons)
+        flat = self._nearest_valid[i * self.nlon + j]
+        return np.divmod(flat, self.nlon)
+
+    def nearest_valid(self, lats, lons):
+        i, j = self.nearest_valid_cell(lats, lons)
+        return self.values[i, j]
+
+    def bilinear(self, lats, lons, outside=np.nan, margin=0.5):
+        """Bilinear interpolation of values; missing corners are left out
+        and the remaining weights renormalized. Points off the grid are
+        handled as in nearest."""
+        fi = np.clip((np.asarray(lats, dtype=np.float64) - self.lat0) / self.dlat, 0, self.nlat - 1)
+        fj = np.clip((np.asarray(lons, dtype=np.float64) - self.lon0) / self.dlon, 0, self.nlon - 1)
+        i0 = np.minimum(np.floor(fi).astype(np.intp), max(self.nlat - 2, 0))
+        j0 = np.minimum(np.floor(fj).astype(np.intp), max(self.nlon - 2, 0))
+        i1 = np.minimum(i0 + 1, self.nlat - 1)
+        j1 = np.minimum(j0 + 1, self.nlon - 1)
+        ti, tj = fi - i0, fj - j0
+
+        total = np.zeros_like(fi)
+        weight = np.zeros_like(fi)
+        for ii, jj, w in ((i0, j0, (1 - ti) * (1 - tj)), (i0, j1, (1 - ti) * tj),
+                          (i1, j0, ti * (1 - tj)), (i1, j1, ti * tj)):
+            v = self.values[ii, jj]
+            ok = ~np.isnan(v)
+            total += np.where(ok, v, 0.0) * w
+            weight += np.where(ok, w, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            values = np.where(weight > 0, total / weight, np.nan)
+        return self._mask_outside(values, lats, lons, outside, margin)
+
+
+# ======================= SCATTERED POINTS =======================
+class HaversineIndex:
+    """BallTree over (lat, lon) points using great-circle distance."""
+
+    def __init__(self, lats, lons):
+        from sklearn.neighbors import BallTree
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.tree = BallTree(np.radians(np.column_stack([self.lats, self.lons])), metric="haversine")
+
+    def query(self, lats, lons, k=1):
+        """Distances (km) and indices of the k nearest points, shape (n, k)."""
+        X = np.radians(np.column_stack([np.atleast_1d(lats), np.atleast_1d(lons)]))
+        dist, idx = self.tree.query(X, k=k)
+        return dist * EARTH_RADIUS_KM, idx
+
+    def query_radius(self, lats, lons, radius_km):
+        """Indices (and distances in km) of all points within radius_km."""
+        X = np.radians(np.column_stack([np.atleast_1d(lats), np.atleast_1d(lons)]))
+        idx, dist = self.tree.query_radius(X, r=radius_km / EARTH_RADIUS_KM, return_distance=True)
+        return idx, [d * EARTH_RADIUS_KM for d in dist]
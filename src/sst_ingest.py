@@ -0,0 +1,93 @@
+# src/sst_ingest.py
+# Streaming ingestion of the NOAA OISST monthly SST cube. The dataset is read
+# a few time steps at a time (isel windows, no dask), subset and cleaned per
+# chunk, and appended to the output file, so peak memory depends on the chunk
+# size rather than on the size of the dataset.
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xarray as xr
+
+import data_store
+
+NOAA_SST_URL = "https://psl.noaa.gov/thredds/dodsC/Datasets/noaa.oisst.v2/sst.mnmean.nc"
+
+
+def open_sst(source=NOAA_SST_URL):
+    """Open the SST dataset lazily from an OPeNDAP URL or a local NetCDF file."""
+    return xr.open_dataset(source)
+
+
+def iter_sst_chunks(data, chunk_size=12, lat_range=None, lon_range=None, var="sst", start_time=None):
+    """Yield long-format DataFrames (time, lat, lon, sst) one time window at a time."""
+    sst = data[var]
+    if start_time is not None:
+        sst = sst.sel(time=slice(start_time, None))
+    if lat_range is not None:
+        sst = sst.sel(lat=slice(*lat_range))
+    if lon_range is not None:
+        sst = sst.sel(lon=slice(*lon_range))
+
+    for start in range(0, sst.sizes["time"], chunk_size):
+        block = sst.isel(time=slice(start, start + chunk_size)).load()
+        df = block.to_dataframe().reset_index()
+        df = df[["time", "lat", "lon", var]].dropna(subset=[var])
+        if len(df):
+            yield df
+
+
+def _append_csv(df, out_path, first):
+    df.to_csv(out_path, mode="w" if first else "a", header=first, index=False)
+
+
+def ingest_sst(source, out_path=None, dataset=None, chunk_size=12, lat_range=None, lon_range=None,
+               incremental=False):
+    """Stream SST from source into out_path (.csv / .parquet) or a data_store dataset.
+
+    When writing to a dataset, each chunk replaces only the month
+    partitions it contains. With incremental=True only months from the
+    latest stored month onwards are read (the latest one is re-read in case
+    it was incomplete). Returns the number of rows written.
+    """
+    if (out_path is None) == (dataset is None):
+        raise ValueError("Pass exactly one of out_path or dataset")
+    start_time = None
+    if incremental and dataset is not None:
+        stored = data_store.months(dataset)
+        start_time = stored[-1] if stored else None
+    if out_path is not None:
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+        # never leave a previous run's file behind (e.g. when no rows are written)
+        if os.path.exists(out_path):
+            os.remove(out_path)
+    parquet = out_path is not None and out_path.endswith(".parquet")
+    writer = None
+    rows = 0
+
+    try:
+        with open_sst(source) as data:
+            for df in iter_sst_chunks(data, chunk_size, lat_range, lon_range, start_time=start_time):
+                if dataset is not None:
+                    data_store.write_table(df, dataset, mode="append")
+                elif parquet:
+                    table = pa.Table.from_pandas(df, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(out_path, table.schema)
+                    writer.write_table(table)
+                else:
+                    _append_csv(df, out_path, first=rows == 0)
+                rows += len(df)
+                print(f"  ... {rows} rows written (up to {df['time'].max()})")
+    except BaseException:
+        # a file cut off mid-stream must not pass for a complete one
+        if writer is not None:
+            writer.close()
+            writer = None
+        if out_path is not None and os.path.exists(out_path):
+            os.remove(out_path)
+        raise
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
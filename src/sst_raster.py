@@ -0,0 +1,132 @@
+# src/sst_raster.py
+# Binary SST raster: one month x lat x lon float32 cube on disk, opened with
+# np.memmap. A small fixed header stores the grid origin/step and the month
+# labels, so a lookup is index arithmetic on the mapped file: nearest cell is
+# O(1) per point and bilinear interpolation is vectorized, and only the pages
+# that are touched are ever read.
+#
+#   python src/sst_raster.py        # rebuild data/sst_raster.bin from clean_sst
+import os
+import struct
+
+import numpy as np
+
+import data_store
+from spatial_index import GridIndex
+
+RASTER_PATH = os.path.join(data_store.DATA_DIR, "sst_raster.bin")
+
+MAGIC = b"SSTR"
+VERSION = 1
+# magic, version, months, nlat, nlon, lat0, lon0, dlat, dlon
+_HEADER = struct.Struct("<4sIIIIdddd")
+_MONTH_BYTES = 7  # "YYYY-MM"
+_ALIGN = 64
+# lookup() answers points up to this many cells beyond the outermost cell centres
+LOOKUP_MARGIN_CELLS = 1.0
+
+
+def _header_size(n_months):
+    size = _HEADER.size + n_months * _MONTH_BYTES
+    return -(-size // _ALIGN) * _ALIGN
+
+
+# ======================= BUILD =======================
+def build_raster(out_path=RASTER_PATH, source="clean_sst"):
+    """Write the raster from the long-format clean_sst dataset, month by month."""
+    months = data_store.months(source)
+    if not months:
+        raise ValueError(f"Dataset '{source}' has no months")
+    coords = data_store.read_table(source, columns=["Latitude", "Longitude"]).drop_duplicates()
+    grid = GridIndex.from_points(coords["Latitude"], coords["Longitude"])
+
+    offset = _header_size(len(months))
+    header = _HEADER.pack(MAGIC, VERSION, len(months), grid.nlat, grid.nlon,
+                          grid.lat0, grid.lon0, grid.dlat, grid.dlon)
+    header += "".join(months).encode("ascii")
+
+    tmp = out_path + ".tmp"
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(tmp, "wb") as f:
+        f.write(header.ljust(offset, b"\0"))
+    cube = np.memmap(tmp, dtype=np.float32, mode="r+", offset=offset,
+                     shape=(len(months), grid.nlat, grid.nlon))
+    for k, month in enumerate(months):
+        df = data_store.read_table(source, columns=["Latitude", "Longitude", "SST"],
+                                   filters=data_store.bbox_filter(months=[month]))
+        layer = np.full((grid.nlat, grid.nlon), np.nan, dtype=np.float32)
+        i, j = grid.cell(df["Latitude"], df["Longitude"])
+        layer[i, j] = df["SST"].to_numpy(dtype=np.float32)
+        cube[k] = layer
+    cube.flush()
+    del cube
+    os.replace(tmp, out_path)
+    return out_path
+
+
+# ======================= READ =======================
+class SSTRaster:
+    """Read-only, memory-mapped view of the SST raster."""
+
+    def __init__(self, path=RASTER_PATH):
+        with open(path, "rb") as f:
+            head = f.read(_HEADER.size)
+            magic, version, n_months, nlat, nlon, lat0, lon0, dlat, dlon = _HEADER.unpack(head)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} SST raster")
+            labels = f.read(n_months * _MONTH_BYTES).decode("ascii")
+        self.path = path
+        self.months = [labels[k:k + _MONTH_BYTES] for k in range(0, len(labels), _MONTH_BYTES)]
+        self.grid = GridIndex(lat0, lon0, dlat, dlon, nlat, nlon)
+        self.data = np.memmap(path, dtype=np.float32, mode="r", offset=_header_size(n_months),
+                              shape=(n_months, nlat, nlon))
+        self._layers = {}
+
+    @staticmethod
+    def available(path=RASTER_PATH):
+        return os.path.exists(path)
+
+    def month_index(self, month=None):
+        """Index of a "YYYY-MM" month (None = latest month)."""
+        if month is None:
+            return len(self.months) - 1
+        try:
+            return self.months.index(str(month)[:7])
+        except ValueError:
+            raise KeyError(f"Month {month} not in SST raster") from None
+
+    def layer(self, month=None):
+        """GridIndex over one month of the mapped cube (no copy)."""
+        k = self.month_index(month)
+        if k not in self._layers:
+            g = self.grid
+            self._layers[k] = GridIndex(g.lat0, g.lon0, g.dlat, g.dlon, g.nlat, g.nlon, values=self.data[k])
+        return self._layers[k]
+
+    def nearest(self, lats, lons, month=None):
+        return self.layer(month).nearest(lats, lons).astype(np.float64)
+
+    def bilinear(self, lats, lons, month=None):
+        return self.layer(month).bilinear(lats, lons)
+
+    def lookup(self, lats, lons, month=None, margin=LOOKUP_MARGIN_CELLS):
+        """Bilinear SST, falling back to the nearest sea cell (coast/land
+        points). NaN for points outside the raster extent (plus margin
+        cells)."""
+        layer = self.layer(month)
+        values = layer.bilinear(lats, lons, outside=None)
+        missing = np.isnan(values)
+        inside = layer.contains(lats, lons, margin)
+        values[~inside] = np.nan
+        missing &= inside
+        if missing.any():
+            values[missing] = layer.nearest_valid(np.asarray(lats, dtype=float)[missing],
+                                                  np.asarray(lons, dtype=float)[missing])
+        return values
+
+
+if __name__ == "__main__":
+    print("🧊 Building SST raster from clean_sst...")
+    path = build_raster()
+    raster = SSTRaster(path)
+    print(f"✅ {len(raster.months)} months x {raster.grid.nlat} x {raster.grid.nlon} cells -> {path}")
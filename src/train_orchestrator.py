@@ -0,0 +1,205 @@
+# src/train_orchestrator.py
+# Parallel, reproducible training with a hyperparameter sweep.
+#
+# Every (task, model family, hyperparameters) candidate is cross-validated
+# and fitted in its own worker process on one shared train/test split. For
+# each candidate we record CV score, test accuracy / RMSE, fit time,
+# single-row inference latency and pickled model size, then pick the best
+# model per task that fits the latency budget.
+#
+#   python src/train_orchestrator.py --latency-budget-ms 5 --save
+import argparse
+import itertools
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import joblib
+import numpy as np
+from sklearn.ensemble import (GradientBoostingClassifier, GradientBoostingRegressor,
+                              RandomForestClassifier, RandomForestRegressor)
+from sklearn.metrics import accuracy_score, mean_squared_error
+from sklearn.model_selection import KFold, cross_val_score, train_test_split
+
+import data_store
+import model_registry
+from features import FEATURES, availability_from_catch, model_input
+
+RANDOM_STATE = 42
+
+SEARCH_SPACE = {
+    "rf": {"n_estimators": [50, 100, 200], "max_depth": [None, 8, 16]},
+    "gb": {"n_estimators": [100, 200], "max_depth": [3, 5], "learning_rate": [0.05, 0.1]},
+    "xgb": {"n_estimators": [100, 300], "max_depth": [4, 6], "learning_rate": [0.05, 0.1]},
+}
+
+# Artifact each task's winner is saved as (served by the "default" pipeline)
+TASK_ARTIFACTS = {"availability": "availability", "quantity": "quantity"}
+
+
+def make_model(family, task, params):
+    classify = task == "availability"
+    if family == "rf":
+        cls = RandomForestClassifier if classify else RandomForestRegressor
+        return cls(random_state=RANDOM_STATE, n_jobs=1, **params)
+    if family == "gb":
+        cls = GradientBoostingClassifier if classify else GradientBoostingRegressor
+        return cls(random_state=RANDOM_STATE, **params)
+    if family == "xgb":
+        import xgboost as xgb
+        cls = xgb.XGBClassifier if classify else xgb.XGBRegressor
+        return cls(random_state=RANDOM_STATE, n_jobs=1, **params)
+    raise ValueError(f"Unknown model family: {family}")
+
+
+def candidates(families=None):
+    for family, space in SEARCH_SPACE.items():
+        if families and family not in families:
+            continue
+        keys = list(space)
+        for values in itertools.product(*(space[k] for k in keys)):
+            params = dict(zip(keys, values))
+            for task in TASK_ARTIFACTS:
+                yield task, family, params
+
+
+# ======================= WORKER =======================
+_split = None
+
+
+def _init_worker(split):
+    # the split is sent once per worker instead of once per candidate
+    global _split
+    _split = split
+
+
+def single_row_latency_ms(model, X, repeats=50):
+    row = X.iloc[:1]
+    model.predict(row)  # warm-up
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(row)
+        times.append(time.perf_counter() - start)
+    return float(np.percentile(times, 50) * 1000), float(np.percentile(times, 99) * 1000)
+
+
+def evaluate(task, family, params, cv_folds, model_path):
+    X_train, X_test, y_train, y_test = _split[task]
+    model = make_model(family, task, params)
+    scoring = "accuracy" if task == "availability" else "neg_root_mean_squared_error"
+    cv = KFold(n_splits=cv_folds, shuffle=True, random_state=RANDOM_STATE)
+    cv_scores = cross_val_score(model, X_train, y_train, cv=cv, scoring=scoring)
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    pred = model.predict(X_test)
+    p50, p99 = single_row_latency_ms(model, X_test)
+    record = {
+        "task": task,
+        "family": family,
+        "params": params,
+        "cv_score": float(np.mean(cv_scores)),
+        "fit_seconds": fit_seconds,
+        "latency_p50_ms": p50,
+        "latency_p99_ms": p99,
+        "model_bytes": len(pickle.dumps(model)),
+    }
+    if task == "availability":
+        record["accuracy"] = float(accuracy_score(y_test, pred))
+    else:
+        record["rmse"] = float(np.sqrt(mean_squared_error(y_test, pred)))
+    # fitted models stay on disk; only the winners are ever loaded back
+    joblib.dump(model, model_path)
+    return record
+
+
+# ======================= ORCHESTRATION =======================
+def load_split():
+    """One shared, seeded train/test split (same split as model_training.py)."""
+    df = data_store.read_table("final_training_data_fixed", columns=FEATURES)
+    # kept as a DataFrame so the saved models carry feature names, like model_training.py
+    X = model_input(df, "availability")
+    y_class = availability_from_catch(df["Historical_Catch"])
+    y_reg = df["Historical_Catch"].to_numpy(dtype=np.float64)
+    X_train, X_test, yc_train, yc_test, yr_train, yr_test = train_test_split(
+        X, y_class, y_reg, test_size=0.2, random_state=RANDOM_STATE)
+    return {
+        "availability": (X_train, X_test, yc_train, yc_test),
+        "quantity": (X_train, X_test, yr_train, yr_test),
+    }
+
+
+def select(records, task, latency_budget_ms):
+    """Best candidate for a task within the latency budget (p99, single row)."""
+    pool = [r for r in records if r["task"] == task and r["latency_p99_ms"] <= latency_budget_ms]
+    if not pool:
+        return None
+    if task == "availability":
+        return max(pool, key=lambda r: (r["accuracy"], r["cv_score"], -r["latency_p99_ms"]))
+    return min(pool, key=lambda r: (r["rmse"], -r["cv_score"], r["latency_p99_ms"]))
+
+
+def run_sweep(workers=None, cv_folds=3, families=None, latency_budget_ms=10.0, save=False):
+    """Evaluate every candidate in parallel; optionally save the winners.
+
+    Returns (records, chosen) where chosen maps task -> selected record.
+    """
+    split = load_split()
+    records = []
+    jobs = list(candidates(families))
+    print(f"🔬 Evaluating {len(jobs)} candidates on {workers or os.cpu_count()} workers...")
+    tmp_dir = tempfile.mkdtemp(prefix="fish_sweep_")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(split,)) as pool:
+        futures = {pool.submit(evaluate, task, family, params, cv_folds, os.path.join(tmp_dir, f"{i}.pkl")): i
+                   for i, (task, family, params) in enumerate(jobs)}
+        for fut in as_completed(futures):
+            record = fut.result()
+            record["id"] = futures[fut]
+            records.append(record)
+            metric = f"acc={record['accuracy']:.3f}" if "accuracy" in record else f"rmse={record['rmse']:.2f}"
+            print(f"  {record['task']:<12} {record['family']:<4} {record['params']} {metric} "
+                  f"fit={record['fit_seconds']:.1f}s p99={record['latency_p99_ms']:.2f}ms")
+
+    records.sort(key=lambda r: r["id"])
+    chosen = {task: select(records, task, latency_budget_ms) for task in TASK_ARTIFACTS}
+    if save:
+        for task, record in chosen.items():
+            if record is not None:
+                shutil.copyfile(os.path.join(tmp_dir, f"{record['id']}.pkl"),
+                                model_registry.artifact_path(TASK_ARTIFACTS[task]))
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    return records, chosen
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter sweep for the catch models")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--cv", type=int, default=3, help="cross-validation folds")
+    parser.add_argument("--families", nargs="+", choices=list(SEARCH_SPACE), help="model families to sweep")
+    parser.add_argument("--latency-budget-ms", type=float, default=10.0,
+                        help="max single-row p99 latency for the selected model")
+    parser.add_argument("--save", action="store_true", help="save the selected models as the default pipeline")
+    args = parser.parse_args()
+
+    records, chosen = run_sweep(args.workers, args.cv, args.families, args.latency_budget_ms, args.save)
+
+    report_path = os.path.join(model_registry.MODELS_DIR, "training_report.json")
+    with open(report_path, "w") as f:
+        json.dump({"latency_budget_ms": args.latency_budget_ms, "candidates": records,
+                   "selected": {t: (r["id"] if r else None) for t, r in chosen.items()}}, f, indent=1)
+    print(f"\n📄 Report written to {report_path}")
+
+    for task, record in chosen.items():
+        if record is None:
+            print(f"⚠ {task}: no candidate meets the {args.latency_budget_ms} ms budget")
+            continue
+        saved = f" -> {model_registry.artifact_path(TASK_ARTIFACTS[task])}" if args.save else ""
+        print(f"✅ {task}: {record['family']} {record['params']}{saved}")
@@ -0,0 +1,279 @@
+# src/train_out_of_core.py
+# Out-of-core counterpart of model_training.py for training sets that do not
+# fit in memory (e.g. the full OISST record since 1981 over the Indian
+# Ocean). The table is streamed from the Parquet store in fixed-size row
+# chunks and no step ever holds more than one chunk:
+#
+#   pass 1  StandardScaler + IncrementalPCA      partial_fit per chunk
+#   pass 2  SGD / naive Bayes baselines          partial_fit per chunk
+#           random forests (default pipeline)    warm start, new trees per chunk
+#           RF + gradient boosting on the PCA    warm start, new trees / stages
+#           features (hybrid pipeline)           per chunk
+#   pass 3+ XGBoost                              external-memory DMatrix
+#
+# Each chunk is split into train/test rows with a seed derived from its
+# position, so every pass sees the same split; a bounded sample of the test
+# rows is kept for the metrics. The artifacts replace those of
+# model_training.py (same names, same serving pipelines).
+#
+#   python src/train_out_of_core.py --chunk-rows 1000000 --trees 50
+import argparse
+import math
+import os
+import shutil
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import IncrementalPCA
+from sklearn.ensemble import (GradientBoostingClassifier, GradientBoostingRegressor, RandomForestClassifier,
+                              RandomForestRegressor, VotingClassifier, VotingRegressor)
+from sklearn.linear_model import SGDClassifier, SGDRegressor
+from sklearn.metrics import accuracy_score, mean_squared_error
+from sklearn.naive_bayes import GaussianNB
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.utils import Bunch
+
+import data_store
+import model_registry
+from features import FEATURES, availability_from_catch
+
+DATASET = "final_training_data_fixed"
+RANDOM_STATE = 42
+CLASSES = np.array([0, 1])
+
+
+# ======================= CHUNKS =======================
+def labels(df):
+    # same targets as model_training.py
+    y_reg = df["Historical_Catch"].to_numpy(dtype=float)
+    return availability_from_catch(y_reg), y_reg
+
+
+def chunks(chunk_rows, test_size):
+    """(index, train frame, test frame) for every chunk of the training table."""
+    for i, df in enumerate(data_store.iter_batches(DATASET, columns=FEATURES, batch_size=chunk_rows)):
+        test = np.random.default_rng([RANDOM_STATE, i]).random(len(df)) < test_size
+        yield i, df[~test], df[test]
+
+
+def subsample(df, n, seed):
+    if n is None or len(df) <= n:
+        return df
+    return df.sample(n=n, random_state=seed)
+
+
+def trees_for_chunk(total, i, n_chunks):
+    """Trees to add on chunk i so that `total` trees are spread over all chunks."""
+    return math.floor(total * (i + 1) / n_chunks) - math.floor(total * i / n_chunks)
+
+
+# ======================= PASS 1: SCALER + PCA =======================
+def fit_transforms(chunk_rows, test_size):
+    scaler = StandardScaler()
+    pca = IncrementalPCA(n_components=min(3, len(FEATURES)))
+    for _, train, _ in chunks(chunk_rows, test_size):
+        X = train[FEATURES]
+        scaler.partial_fit(X)
+        # IncrementalPCA needs at least n_components rows per call
+        if len(X) >= pca.n_components:
+            pca.partial_fit(X)
+    return scaler, pca
+
+
+# ======================= PASS 2: INCREMENTAL MODELS =======================
+def assemble_voting(cls, members, **params):
+    """A fitted Voting ensemble from members that were already fitted chunk by
+    chunk (VotingClassifier.fit would refit them on one in-memory array)."""
+    est = cls(list(members.items()), **params)
+    est.estimators_ = list(members.values())
+    est.named_estimators_ = Bunch(**members)
+    if cls is VotingClassifier:
+        est.le_ = LabelEncoder().fit(CLASSES)
+        est.classes_ = est.le_.classes_
+    return est
+
+
+def _grow(est, added, X, y):
+    est.n_estimators += added
+    est.fit(X, y)
+
+
+def fit_incremental(chunk_rows, test_size, scaler, pca, n_chunks, trees, boost_stages, forest_rows,
+                    max_test_rows):
+    models = {
+        "sgd_availability": SGDClassifier(loss="log_loss", random_state=RANDOM_STATE),
+        "nb_availability": GaussianNB(),
+        "sgd_quantity": SGDRegressor(random_state=RANDOM_STATE),
+        # warm_start keeps the trees grown on earlier chunks and only fits the new ones
+        "availability": RandomForestClassifier(n_estimators=0, warm_start=True, n_jobs=-1,
+                                               random_state=RANDOM_STATE),
+        "quantity": RandomForestRegressor(n_estimators=0, warm_start=True, n_jobs=-1,
+                                          random_state=RANDOM_STATE),
+        "hybrid_rf_clf": RandomForestClassifier(n_estimators=0, warm_start=True, n_jobs=-1,
+                                                random_state=RANDOM_STATE),
+        "hybrid_gb_clf": GradientBoostingClassifier(n_estimators=0, warm_start=True, random_state=RANDOM_STATE),
+        "hybrid_rf_reg": RandomForestRegressor(n_estimators=0, warm_start=True, n_jobs=-1,
+                                               random_state=RANDOM_STATE),
+        "hybrid_gb_reg": GradientBoostingRegressor(n_estimators=0, warm_start=True, random_state=RANDOM_STATE),
+    }
+    test_parts = []
+    test_per_chunk = max(1, max_test_rows // n_chunks)
+    # classifier trees / stages owed by chunks whose sample lacked a class
+    owed_trees = owed_stages = 0
+
+    for i, train, test in chunks(chunk_rows, test_size):
+        test_parts.append(subsample(test, test_per_chunk, i))
+        if not len(train):
+            continue
+        X = train[FEATURES]
+        y_class, y_reg = labels(train)
+
+        X_scaled = scaler.transform(X)
+        models["sgd_availability"].partial_fit(X_scaled, y_class, classes=CLASSES)
+        models["nb_availability"].partial_fit(X, y_class, classes=CLASSES)
+        models["sgd_quantity"].partial_fit(X_scaled, y_reg)
+
+        # forests: a few new trees per chunk, each grown on a bounded sample
+        n_trees = trees_for_chunk(trees, i, n_chunks)
+        n_stages = trees_for_chunk(boost_stages, i, n_chunks)
+        sample = subsample(train, forest_rows, i)
+        Xs = sample[FEATURES]
+        ys_class, ys_reg = labels(sample)
+        Xs_pca = pca.transform(Xs)
+        # a classifier chunk must hold both classes or its trees would not line up
+        both_classes = len(np.unique(ys_class)) == 2
+        if n_trees:
+            _grow(models["quantity"], n_trees, Xs, ys_reg)
+            _grow(models["hybrid_rf_reg"], n_trees, Xs_pca, ys_reg)
+        if n_stages:
+            # new boosting stages are fitted to the residuals on this chunk
+            _grow(models["hybrid_gb_reg"], n_stages, Xs_pca, ys_reg)
+        # classifier trees skipped on a one-class chunk are grown on the next
+        # chunk that has both classes
+        if not both_classes:
+            owed_trees += n_trees
+            owed_stages += n_stages
+        else:
+            n_trees, n_stages = n_trees + owed_trees, n_stages + owed_stages
+            owed_trees = owed_stages = 0
+            if n_trees:
+                _grow(models["availability"], n_trees, Xs, ys_class)
+                _grow(models["hybrid_rf_clf"], n_trees, Xs_pca, ys_class)
+            if n_stages:
+                _grow(models["hybrid_gb_clf"], n_stages, Xs_pca, ys_class)
+        print(f"   chunk {i + 1}/{n_chunks}: {len(train)} rows, "
+              f"{models['quantity'].n_estimators} trees, {models['hybrid_gb_reg'].n_estimators} stages")
+
+    if owed_trees or owed_stages:
+        print(f"⚠️ The last chunks held a single class: the classifiers have {owed_trees} trees and "
+              f"{owed_stages} boosting stages fewer than requested")
+    models["hybrid_availability"] = assemble_voting(
+        VotingClassifier, {"rf": models.pop("hybrid_rf_clf"), "gb": models.pop("hybrid_gb_clf")}, voting="soft")
+    models["hybrid_quantity"] = assemble_voting(
+        VotingRegressor, {"rf": models.pop("hybrid_rf_reg"), "gb": models.pop("hybrid_gb_reg")})
+    return models, pd.concat(test_parts, ignore_index=True)
+
+
+# ======================= PASS 3: XGBOOST EXTERNAL MEMORY =======================
+def fit_xgboost(chunk_rows, test_size, task, rounds, cache_dir):
+    import xgboost as xgb
+
+    class ChunkIter(xgb.DataIter):
+        # XGBoost pages each chunk to cache_dir and iterates again as needed
+        def __init__(self):
+            self._it = None
+            super().__init__(cache_prefix=os.path.join(cache_dir, task))
+
+        def reset(self):
+            self._it = chunks(chunk_rows, test_size)
+
+        def next(self, input_data):
+            if self._it is None:
+                self.reset()
+            for _, train, _ in self._it:
+                if len(train):
+                    y_class, y_reg = labels(train)
+                    input_data(data=train[FEATURES], label=y_class if task == "availability" else y_reg)
+                    return True
+            return False
+
+    it = ChunkIter()
+    if hasattr(xgb, "ExtMemQuantileDMatrix"):
+        dtrain = xgb.ExtMemQuantileDMatrix(it)
+    else:
+        dtrain = xgb.DMatrix(it)
+    objective = "binary:logistic" if task == "availability" else "reg:squarederror"
+    booster = xgb.train({"objective": objective, "max_depth": 6, "eta": 0.1, "tree_method": "hist",
+                         "seed": RANDOM_STATE}, dtrain, num_boost_round=rounds)
+
+    # hand the booster to the sklearn wrapper the serving code expects
+    path = os.path.join(cache_dir, f"{task}.json")
+    booster.save_model(path)
+    model = xgb.XGBClassifier() if task == "availability" else xgb.XGBRegressor()
+    model.load_model(path)
+    return model
+
+
+# ======================= MAIN =======================
+def report(models, test, scaler, pca):
+    X = test[FEATURES]
+    y_class, y_reg = labels(test)
+    for name, model in models.items():
+        if name in ("sgd_availability", "sgd_quantity"):
+            pred = model.predict(scaler.transform(X))
+        elif name.startswith("hybrid_"):
+            pred = model.predict(pca.transform(X))
+        else:
+            pred = model.predict(X)
+        if name.endswith("availability"):
+            print(f"{name} accuracy:", accuracy_score(y_class, pred))
+        else:
+            print(f"{name} RMSE:", mean_squared_error(y_reg, pred))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the models by streaming the training table in chunks")
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000, help="rows per streamed chunk")
+    parser.add_argument("--trees", type=int, default=50, help="trees per forest, spread over all chunks")
+    parser.add_argument("--boost-stages", type=int, default=100,
+                        help="gradient boosting stages (hybrid), spread over all chunks")
+    parser.add_argument("--forest-rows", type=int, default=200_000,
+                        help="max rows per chunk the new trees are grown on")
+    parser.add_argument("--xgb-rounds", type=int, default=100)
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--max-test-rows", type=int, default=200_000, help="held-out rows kept for the metrics")
+    parser.add_argument("--skip-xgb", action="store_true")
+    args = parser.parse_args()
+
+    total_rows = data_store.count_rows(DATASET)
+    n_chunks = max(1, math.ceil(total_rows / args.chunk_rows))
+    print(f"📌 Streaming {total_rows} rows of {DATASET} in {n_chunks} chunks of {args.chunk_rows}...")
+
+    print("\n1️⃣ Scaler + IncrementalPCA...")
+    scaler, pca = fit_transforms(args.chunk_rows, args.test_size)
+
+    print("\n2️⃣ Incremental baselines, warm-start forests and hybrid ensembles...")
+    models, test = fit_incremental(args.chunk_rows, args.test_size, scaler, pca, n_chunks, args.trees,
+                                   args.boost_stages, args.forest_rows, args.max_test_rows)
+
+    if not args.skip_xgb:
+        print("\n🚀 XGBoost (external memory)...")
+        cache_dir = tempfile.mkdtemp(prefix="xgb_cache_")
+        try:
+            for task in ("availability", "quantity"):
+                models[f"xgb_{task}"] = fit_xgboost(args.chunk_rows, args.test_size, task,
+                                                    args.xgb_rounds, cache_dir)
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(f"\n📊 Held-out sample: {len(test)} rows")
+    report(models, test, scaler, pca)
+
+    for name in ("availability", "quantity", "hybrid_availability", "hybrid_quantity",
+                 "xgb_availability", "xgb_quantity"):
+        if name in models:
+            joblib.dump(models[name], model_registry.artifact_path(name))
+    joblib.dump(pca, model_registry.artifact_path("pca"))
+    print("\n✅ Models saved to", model_registry.MODELS_DIR)
@@ -0,0 +1,106 @@
+# src/uncertainty.py
+# Per-tree uncertainty for the random-forest models. Every tree of a forest
+# is an independent prediction, so the spread of the trees gives quantity
+# intervals and the share of trees agreeing with the forest gives a
+# confidence, at no extra model cost.
+#
+# All trees are scored in one vectorized pass with the flat-array engine
+# (FlatEnsemble.tree_values -> one (rows, trees, outputs) array) instead of
+# calling each estimator in a Python loop. sklearn forests are compiled to
+# flat arrays once per model object; FlatModels (FISH_MODEL_FORMAT=flat or
+# compact) are used as they are. Class probabilities are keyed by the
+# model's classes_, never by column position.
+#
+# Only pure forests have independent trees. Any other model, including a
+# voting ensemble with a boosting member, raises ValueError so callers fall
+# back to the plain predictions.
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from flat_forest import FlatModel, _as_float_matrix
+
+DEFAULT_QUANTILES = (0.05, 0.95)
+
+# sklearn estimator -> FlatModel, compiled on first use
+_compiled = weakref.WeakKeyDictionary()
+
+
+def _flat(model):
+    if isinstance(model, FlatModel):
+        return model
+    if model not in _compiled:
+        from export_flat_models import compile_model
+        _compiled[model] = compile_model(model)
+    return _compiled[model]
+
+
+def _forests(model):
+    flat = _flat(model)
+    if not flat.ensembles or any(ens.combine != "mean" for ens in flat.ensembles):
+        raise ValueError(f"{flat.kind} is not a pure forest; its trees are not independent predictions")
+    return flat, flat.ensembles
+
+
+def tree_outputs(model, X):
+    """Outputs of every tree for every row, shape (n_rows, n_trees, n_outputs)
+    (class probabilities for classifiers)."""
+    _, forests = _forests(model)
+    X = _as_float_matrix(X)
+    values = [ens.tree_values(X).astype(np.float64, copy=False) for ens in forests]
+    return values[0] if len(values) == 1 else np.concatenate(values, axis=1)
+
+
+def _chunks(flat, X):
+    X = _as_float_matrix(X)
+    for i in range(0, len(X), flat.chunk_size):
+        yield X[i:i + flat.chunk_size]
+
+
+# ======================= REGRESSION =======================
+def quantity_interval(reg, X, quantiles=DEFAULT_QUANTILES):
+    """Mean, standard deviation and quantile interval of the per-tree
+    predictions: DataFrame with columns mean, std, lower, upper."""
+    flat, _ = _forests(reg)
+    parts = []
+    for chunk in _chunks(flat, X):
+        values = tree_outputs(flat, chunk)[:, :, 0]
+        lower, upper = np.quantile(values, quantiles, axis=1)
+        parts.append(np.column_stack([values.mean(axis=1), values.std(axis=1), lower, upper]))
+    out = np.concatenate(parts) if parts else np.empty((0, 4))
+    return pd.DataFrame(out, columns=["mean", "std", "lower", "upper"])
+
+
+# ======================= CLASSIFICATION =======================
+def class_probabilities(clf, X):
+    """Forest class probabilities with one column per classes_ name, plus
+
+    label       the predicted class
+    confidence  its probability
+    agreement   share of trees whose own vote is that class
+    """
+    flat, _ = _forests(clf)
+    classes = np.asarray(flat.classes_)
+    probs, agreement = [], []
+    for chunk in _chunks(flat, X):
+        values = tree_outputs(flat, chunk)
+        mean = values.mean(axis=1)
+        winner = np.argmax(mean, axis=1)
+        probs.append(mean)
+        agreement.append((np.argmax(values, axis=2) == winner[:, None]).mean(axis=1))
+    probs = np.concatenate(probs) if probs else np.empty((0, len(classes)))
+    out = pd.DataFrame(probs, columns=[str(c) for c in classes])
+    winner = np.argmax(probs, axis=1)
+    out["label"] = classes[winner]
+    out["confidence"] = probs[np.arange(len(probs)), winner]
+    out["agreement"] = np.concatenate(agreement) if agreement else np.empty(0)
+    return out
+
+
+def class_column(model, probs, label):
+    """Column of a predict_proba result that belongs to class label."""
+    classes = [str(c) for c in model.classes_]
+    if str(label) not in classes:
+        raise ValueError(f"{label!r} is not one of the model classes {classes}")
+    return np.asarray(probs)[:, classes.index(str(label))]
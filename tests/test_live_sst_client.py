@@ -0,0 +1,122 @@
+# tests/test_live_sst_client.py
+# LiveSSTClient against a local stand-in for the Open-Meteo marine API.
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pytest
+
+from grid_scoring import make_latlon_grid
+from live_sst_client import LiveSSTClient, RequestsTransport, SSTDiskCache
+
+
+def expected_sst(lat, lon):
+    """Value FakeMarineServer returns for a snapped cell."""
+    return 20 + 0.3 * abs(lat) + 0.01 * lon
+
+
+class FakeMarineServer:
+    """Local marine API: SST = expected_sst(lat, lon) for each requested
+    location. Counts requests and answers the first fail_first with 503."""
+
+    def __init__(self, fail_first=0):
+        owner = self
+        self.requests = 0
+        self.locations = []
+        self.fail_first = fail_first
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                owner.requests += 1
+                if owner.requests <= owner.fail_first:
+                    self.send_response(503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                query = parse_qs(urlparse(self.path).query)
+                lats = [float(v) for v in query["latitude"][0].split(",")]
+                lons = [float(v) for v in query["longitude"][0].split(",")]
+                owner.locations.append(len(lats))
+                items = [{"latitude": la, "longitude": lo,
+                          "daily": {"sea_surface_temperature_mean": [expected_sst(la, lo)]}}
+                         for la, lo in zip(lats, lons)]
+                body = json.dumps(items if len(items) > 1 else items[0]).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/v1/marine"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def server():
+    with FakeMarineServer() as s:
+        yield s
+
+
+def test_points_in_one_cell_are_coalesced(server):
+    client = LiveSSTClient(url=server.url, grid_step=0.25)
+    # three points snap to (15.0, 83.0), one to (15.25, 83.0)
+    values = client.get_sst([15.01, 14.99, 15.1, 15.2], [83.0, 83.02, 82.9, 83.0])
+    assert server.requests == 1
+    assert server.locations == [2]
+    np.testing.assert_allclose(values, [expected_sst(15.0, 83.0)] * 3 + [expected_sst(15.25, 83.0)])
+
+
+def test_grid_takes_a_handful_of_calls(server):
+    lats, lons = make_latlon_grid(15.0, 83.0, 25, 30)
+    client = LiveSSTClient(url=server.url, grid_step=0.25, locations_per_request=4)
+    values = client.get_sst(lats, lons)
+    n_cells = len(set(zip(*client.snap(lats, lons))))
+    assert n_cells < 20
+    assert server.requests == client.http_calls == -(-n_cells // 4)
+    assert sum(server.locations) == n_cells
+    assert not np.isnan(values).any()
+
+
+def test_cache_serves_until_ttl_expires(server, tmp_path):
+    cache = SSTDiskCache(str(tmp_path / "cache.sqlite"), ttl_seconds=0.5)
+    client = LiveSSTClient(url=server.url, cache=cache)
+    first = client.get_sst([15.0, 16.0], [83.0, 83.0])
+    second = client.get_sst([15.0, 16.0], [83.0, 83.0])
+    assert server.requests == 1
+    np.testing.assert_array_equal(first, second)
+
+    time.sleep(0.6)
+    client.get_sst([15.0, 16.0], [83.0, 83.0])
+    assert server.requests == 2
+    cache.close()
+
+
+def test_transient_errors_are_retried():
+    with FakeMarineServer(fail_first=1) as server:
+        client = LiveSSTClient(transport=RequestsTransport(retries=2), url=server.url)
+        values = client.get_sst([15.0], [83.0])
+    assert server.requests == 2
+    np.testing.assert_allclose(values, [expected_sst(15.0, 83.0)])
+
+
+def test_failed_batches_stay_nan_and_are_retried_next_call():
+    with FakeMarineServer(fail_first=10) as server:
+        client = LiveSSTClient(transport=RequestsTransport(retries=0), url=server.url)
+        assert np.isnan(client.get_sst([15.0], [83.0])).all()
+        server.fail_first = 0
+        np.testing.assert_allclose(client.get_sst([15.0], [83.0]), [expected_sst(15.0, 83.0)])